@@ -0,0 +1,306 @@
+import json
+import sqlite3
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from estoque import CAMPOS_ESTOQUE, EstoqueColunar
+from ordens import OrdemPlanejada, CustoLeadtime, OrdemControle, OrdensControle
+from quadro import QuadroPlanejamento, dia_ordinal
+
+
+# Tabelas de registros: tabela -> classe do registro (as colunas são os atributos da classe)
+TABELAS_REGISTROS = {
+    'ordens_planejamento': OrdemPlanejada,
+    'fc_lt_esperados': CustoLeadtime,
+    'ordens_controle': OrdemControle,
+}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS metadados (chave TEXT PRIMARY KEY, valor TEXT);
+CREATE TABLE IF NOT EXISTS estoque (
+    material TEXT PRIMARY KEY, posicao INTEGER, {colunas_estoque});
+CREATE TABLE IF NOT EXISTS ordens_planejamento (
+    material TEXT PRIMARY KEY, posicao INTEGER, producao REAL, aquisicao REAL);
+CREATE TABLE IF NOT EXISTS fc_lt_esperados (
+    material TEXT PRIMARY KEY, posicao INTEGER, leadtime REAL, custo REAL);
+CREATE TABLE IF NOT EXISTS ordens_controle (
+    material TEXT PRIMARY KEY, posicao INTEGER, estoque_atual REAL, status TEXT, producao REAL, aquisicao REAL);
+CREATE INDEX IF NOT EXISTS ordens_controle_status ON ordens_controle (status);
+CREATE TABLE IF NOT EXISTS quadro_materiais (
+    material TEXT PRIMARY KEY, posicao INTEGER, estoque_atual REAL);
+CREATE TABLE IF NOT EXISTS quadro_entregas (
+    material TEXT, dia INTEGER, quantidade REAL, PRIMARY KEY (material, dia)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS quadro_entregas_dia ON quadro_entregas (dia);
+""".format(colunas_estoque=", ".join(f"{campo} REAL" for campo in CAMPOS_ESTOQUE))
+
+
+def _escalar(valor):
+    """
+    Converte escalares numpy (quantidades vindas dos cálculos vetorizados) em valores
+    Python, que o sqlite3 sabe gravar; os demais valores são devolvidos sem alteração.
+    """
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+
+def _inteiro(valor):
+    """
+    Devolve valores REAL inteiros do SQLite como int (como nas planilhas de entrada).
+    """
+    return int(valor) if isinstance(valor, float) and valor.is_integer() else valor
+
+
+class ArmazenamentoSQLite:
+    """
+    Armazenamento local do estado do MRP em um banco SQLite em modo WAL.
+
+    Cada estrutura (estoque, ordens de planejamento, custos e lead times esperados,
+    ordens de controle e quadro de planejamento) fica em uma tabela indexada pelo
+    material, gravada com upserts em lote. As leituras podem ser restritas a um
+    conjunto de materiais (ou, nas ordens de controle, a um status), de modo que o
+    estado não precisa ser carregado por inteiro. Em modo WAL, vários processos
+    podem ler um estado consistente enquanto outro grava.
+    """
+
+    def __init__(self, caminho_arquivo, timeout=30.0):
+        """
+        Args:
+            caminho_arquivo (str): Caminho do banco SQLite (criado se não existir).
+            timeout (float): Tempo máximo, em segundos, de espera por um bloqueio de escrita.
+        """
+        self.caminho_arquivo = caminho_arquivo
+        # Transações controladas explicitamente (BEGIN/COMMIT) em transacao()
+        self.conexao = sqlite3.connect(caminho_arquivo, timeout=timeout, isolation_level=None)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.conexao.executescript(ESQUEMA)
+        self._profundidade = 0
+
+    @contextmanager
+    def transacao(self, escrita=False):
+        """
+        Agrupa operações em uma única transação.
+
+        Leituras feitas dentro da mesma transação enxergam um único estado consistente,
+        mesmo que outro processo grave no banco ao mesmo tempo. Transações aninhadas
+        são incorporadas à mais externa.
+
+        Args:
+            escrita (bool): Se True, reserva o bloqueio de escrita já no início (BEGIN IMMEDIATE).
+        """
+        if self._profundidade:
+            self._profundidade += 1
+            try:
+                yield self
+            finally:
+                self._profundidade -= 1
+            return
+
+        self.conexao.execute("BEGIN IMMEDIATE" if escrita else "BEGIN")
+        self._profundidade = 1
+        try:
+            yield self
+        except BaseException:
+            self.conexao.execute("ROLLBACK")
+            raise
+        else:
+            self.conexao.execute("COMMIT")
+        finally:
+            self._profundidade = 0
+
+    def _gravar(self, tabela, colunas, linhas, substituir=False, chave=('material',), posicao=True):
+        """
+        Grava linhas em uma tabela com um upsert em lote.
+
+        Args:
+            tabela (str): Nome da tabela.
+            colunas (list): Colunas de cada linha (incluindo a chave).
+            linhas (iterable): Tuplas de valores, na ordem das colunas.
+            substituir (bool): Se True, remove antes as linhas existentes da tabela.
+            chave (tuple): Colunas da chave primária.
+            posicao (bool): Se True, grava também a coluna 'posicao' (ordem de inclusão dos
+                            materiais): as linhas novas vão para o final e as existentes
+                            mantêm a sua posição.
+        """
+        if posicao:
+            colunas = ['posicao'] + list(colunas)
+        atualizacoes = ", ".join(f"{coluna} = excluded.{coluna}" for coluna in colunas
+                                 if coluna not in chave and coluna != 'posicao')
+        sql = (f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))}) "
+               f"ON CONFLICT ({', '.join(chave)}) DO UPDATE SET {atualizacoes}")
+        with self.transacao(escrita=True):
+            if substituir:
+                self.conexao.execute(f"DELETE FROM {tabela}")
+            if posicao:
+                inicio = self.conexao.execute(f"SELECT COALESCE(MAX(posicao) + 1, 0) FROM {tabela}").fetchone()[0]
+                linhas = ((i,) + tuple(linha) for i, linha in enumerate(linhas, inicio))
+            self.conexao.executemany(sql, (tuple(map(_escalar, linha)) for linha in linhas))
+
+    def _filtro_materiais(self, materiais, condicoes, parametros):
+        """
+        Acrescenta a uma consulta o filtro por uma lista de materiais (passada como um
+        único parâmetro JSON, sem limite de tamanho).
+        """
+        if materiais is not None:
+            condicoes.append("material IN (SELECT value FROM json_each(?))")
+            parametros.append(json.dumps(list(materiais), default=_escalar))
+
+    def _consultar(self, sql, condicoes, parametros, ordem="posicao"):
+        """
+        Executa uma consulta com as condições indicadas.
+        """
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        return self.conexao.execute(f"{sql} ORDER BY {ordem}", parametros)
+
+    def gravar_estoque(self, estoque, substituir=False):
+        """
+        Grava o estoque colunar.
+
+        Args:
+            estoque (EstoqueColunar): Estoque a gravar.
+            substituir (bool): Se True, remove antes os materiais que não estão no estoque.
+        """
+        colunas = [estoque.colunas[campo].tolist() for campo in CAMPOS_ESTOQUE]
+        self._gravar('estoque', ['material'] + list(CAMPOS_ESTOQUE), zip(estoque.codigos, *colunas), substituir)
+
+    def ler_estoque(self, materiais=None):
+        """
+        Lê o estoque, por inteiro ou apenas de alguns materiais.
+
+        Args:
+            materiais (list, opcional): Materiais a ler. Se não fornecido, lê todos.
+
+        Returns:
+            EstoqueColunar: Estoque lido.
+        """
+        condicoes, parametros = [], []
+        self._filtro_materiais(materiais, condicoes, parametros)
+        cursor = self._consultar(f"SELECT material, {', '.join(CAMPOS_ESTOQUE)} FROM estoque",
+                                 condicoes, parametros)
+        df = pd.DataFrame.from_records(cursor.fetchall(),
+                                       columns=['Material'] + list(CAMPOS_ESTOQUE.values()))
+        return EstoqueColunar.de_dataframe(df)
+
+    def gravar_registros(self, tabela, registros, substituir=False):
+        """
+        Grava registros de ordens (material -> registro) em uma das TABELAS_REGISTROS.
+        Campos não atribuídos são gravados como NULL.
+
+        Args:
+            tabela (str): 'ordens_planejamento', 'fc_lt_esperados' ou 'ordens_controle'.
+            registros (dict): Registros por material (registros de ordens.py ou dicionários
+                              com as mesmas chaves).
+            substituir (bool): Se True, remove antes os materiais que não estão em registros.
+        """
+        classe = TABELAS_REGISTROS[tabela]
+        chaves = list(classe.CAMPOS)
+        linhas = ((material,) + tuple(registro.get(chave) for chave in chaves)
+                  for material, registro in registros.items())
+        self._gravar(tabela, ['material'] + list(classe.CAMPOS.values()), linhas, substituir)
+
+    def ler_registros(self, tabela, materiais=None, status=None):
+        """
+        Lê registros de ordens de uma das TABELAS_REGISTROS.
+
+        Args:
+            tabela (str): 'ordens_planejamento', 'fc_lt_esperados' ou 'ordens_controle'.
+            materiais (list, opcional): Materiais a ler. Se não fornecido, lê todos.
+            status (str | list, opcional): Apenas para 'ordens_controle': lê somente as
+                                           ordens com este(s) status (consulta indexada).
+
+        Returns:
+            dict: Registros por material (OrdensControle para 'ordens_controle').
+        """
+        classe = TABELAS_REGISTROS[tabela]
+        atributos = list(classe.CAMPOS.values())
+        condicoes, parametros = [], []
+        self._filtro_materiais(materiais, condicoes, parametros)
+        if status is not None:
+            status = [status] if isinstance(status, str) else list(status)
+            # Com a lista de materiais, a busca pela chave primária é mais seletiva que o
+            # índice de status ('+' impede o uso do índice)
+            coluna = "+status" if materiais is not None else "status"
+            condicoes.append(f"{coluna} IN ({', '.join('?' * len(status))})")
+            parametros.extend(status)
+        cursor = self._consultar(f"SELECT material, {', '.join(atributos)} FROM {tabela}", condicoes, parametros)
+
+        registros = {}
+        for material, *valores in cursor:
+            registros[material] = classe(**{atributo: _inteiro(valor) for atributo, valor in zip(atributos, valores)
+                                            if valor is not None})
+        return OrdensControle(registros) if classe is OrdemControle else registros
+
+    def gravar_planejamento(self, quadro, substituir=True):
+        """
+        Grava o quadro de planejamento (uma linha por material e uma por entrega).
+
+        Args:
+            quadro (QuadroPlanejamento): Quadro a gravar.
+            substituir (bool): Se True, o quadro gravado substitui o anterior por inteiro;
+                               se False, materiais e entregas são acrescentados ou atualizados.
+        """
+        linhas, colunas = np.nonzero(~np.isnan(quadro.quantidades))
+        materiais = quadro.materiais
+        with self.transacao(escrita=True):
+            self._gravar('quadro_materiais', ['material', 'estoque_atual'],
+                         zip(materiais, quadro.estoque_atual.tolist()), substituir)
+            self._gravar('quadro_entregas', ['material', 'dia', 'quantidade'],
+                         zip([materiais[linha] for linha in linhas.tolist()], quadro.dias[colunas].tolist(),
+                             quadro.quantidades[linhas, colunas].tolist()),
+                         substituir, chave=('material', 'dia'), posicao=False)
+
+    def ler_planejamento(self, materiais=None, data_inicio=None, data_fim=None):
+        """
+        Lê o quadro de planejamento, por inteiro ou restrito a materiais e a um período.
+
+        Args:
+            materiais (list, opcional): Materiais a ler. Se não fornecido, lê todos.
+            data_inicio (str | date, opcional): Primeira data de entrega a ler.
+            data_fim (str | date, opcional): Última data de entrega a ler.
+
+        Returns:
+            QuadroPlanejamento: Quadro lido.
+        """
+        condicoes, parametros = [], []
+        self._filtro_materiais(materiais, condicoes, parametros)
+        with self.transacao():
+            quadro_materiais = self._consultar("SELECT material, estoque_atual FROM quadro_materiais",
+                                               condicoes, parametros).fetchall()
+            if data_inicio is not None:
+                condicoes.append("dia >= ?")
+                parametros.append(dia_ordinal(data_inicio))
+            if data_fim is not None:
+                condicoes.append("dia <= ?")
+                parametros.append(dia_ordinal(data_fim))
+            entregas = self._consultar("SELECT material, dia, quantidade FROM quadro_entregas",
+                                       condicoes, parametros, ordem="material, dia").fetchall()
+
+        quadro = QuadroPlanejamento()
+        quadro._garantir_materiais([material for material, _ in quadro_materiais], dict(quadro_materiais))
+        if entregas:
+            materiais_entregas, dias, quantidades = zip(*entregas)
+            quadro.lancar(list(materiais_entregas), np.array(dias, dtype=np.int64), np.array(quantidades))
+        return quadro
+
+    def gravar_metadados(self, **valores):
+        """
+        Grava valores de controle (por exemplo, o estado do MRP) como texto.
+        """
+        self._gravar('metadados', ['chave', 'valor'],
+                     ((chave, None if valor is None else str(valor)) for chave, valor in valores.items()),
+                     chave=('chave',), posicao=False)
+
+    def ler_metadados(self):
+        """
+        Lê os valores de controle gravados com gravar_metadados.
+
+        Returns:
+            dict: Valores por chave.
+        """
+        return dict(self.conexao.execute("SELECT chave, valor FROM metadados"))
+
+    def fechar(self):
+        """
+        Fecha a conexão com o banco.
+        """
+        self.conexao.close()
@@ -0,0 +1,388 @@
+import numpy as np
+from collections import deque
+
+
+def calcular_codigos_nivel(boms):
+    """
+    Calcula o código de nível mais baixo (low-level code) de cada material das BOMs.
+
+    O nível de um material é o maior número de arestas entre ele e um produto que
+    não é componente de nenhum outro; assim, todo material tem nível maior que o de
+    qualquer material que o utilize. O cálculo é uma ordenação topológica, linear
+    no número de linhas das BOMs.
+
+    Args:
+        boms (dict): Dicionário produto -> {componente: quantidade}.
+
+    Returns:
+        dict: Código de nível de cada material (produtos e componentes).
+
+    Raises:
+        ValueError: Se as BOMs contiverem um ciclo (um material que, direta ou
+                    indiretamente, é componente de si mesmo).
+    """
+    # Conta quantas vezes cada material aparece como componente
+    entradas = {}
+    for produto, bom in boms.items():
+        entradas.setdefault(produto, 0)
+        for componente in bom:
+            entradas[componente] = entradas.get(componente, 0) + 1
+
+    niveis = {material: 0 for material, quantidade in entradas.items() if quantidade == 0}
+    fila = deque(niveis)
+    while fila:
+        material = fila.popleft()
+        for componente in boms.get(material, ()):
+            niveis[componente] = max(niveis.get(componente, 0), niveis[material] + 1)
+            entradas[componente] -= 1
+            if entradas[componente] == 0:
+                fila.append(componente)
+
+    # Materiais que nunca foram liberados estão em um ciclo ou abaixo dele
+    em_ciclo = sorted(str(material) for material, quantidade in entradas.items() if quantidade > 0)
+    if em_ciclo:
+        raise ValueError(f"Ciclo detectado nas BOMs envolvendo os materiais: {', '.join(em_ciclo)}")
+
+    return niveis
+
+
+class IndiceOndeUsado:
+    """
+    Índice onde-usado (BOM reversa): para cada componente, os produtos que o usam
+    diretamente e a quantidade por unidade do produto.
+
+    O índice é mantido incrementalmente: ao recarregar a BOM de um produto, apenas
+    as entradas desse produto são trocadas. As consultas percorrem somente os
+    produtos que usam o material, sem varrer as BOMs.
+    """
+
+    def __init__(self, boms=None):
+        """
+        Monta o índice.
+
+        Args:
+            boms (dict, opcional): Dicionário produto -> {componente: quantidade}.
+        """
+        self._pais = {}  # componente -> {produto: quantidade}
+        self._boms = {}  # produto -> {componente: quantidade} (cópia usada nas atualizações)
+        for produto, bom in (boms or {}).items():
+            self.definir_bom(produto, bom)
+
+    def definir_bom(self, produto, bom):
+        """
+        Inclui ou substitui a BOM de um produto no índice.
+
+        Args:
+            produto (str): Código do produto.
+            bom (dict): Dicionário componente -> quantidade.
+        """
+        self.remover_bom(produto)
+        self._boms[produto] = dict(bom)
+        for componente, quantidade in bom.items():
+            self._pais.setdefault(componente, {})[produto] = quantidade
+
+    def remover_bom(self, produto):
+        """
+        Remove do índice a BOM de um produto (se houver).
+        """
+        for componente in self._boms.pop(produto, {}):
+            pais = self._pais[componente]
+            del pais[produto]
+            if not pais:
+                del self._pais[componente]
+
+    def pais(self, material):
+        """
+        Devolve os produtos que usam o material diretamente.
+
+        Args:
+            material (str): Código do material.
+
+        Returns:
+            dict: Produto -> quantidade do material por unidade do produto.
+        """
+        return dict(self._pais.get(material, {}))
+
+    def ancestrais(self, material):
+        """
+        Devolve todos os produtos que usam o material, direta ou indiretamente.
+
+        A quantidade por unidade soma todos os caminhos entre o produto e o material
+        (por exemplo, um componente usado em duas submontagens do mesmo produto).
+        O custo é proporcional ao número de produtos e linhas de BOM encontrados.
+
+        Args:
+            material (str): Código do material.
+
+        Returns:
+            dict: Produto -> quantidade total do material por unidade do produto.
+        """
+        # Busca em profundidade pelos pais; a pós-ordem invertida coloca cada
+        # material antes de todos os produtos que o usam
+        pos_ordem = []
+        visitados = {material}
+        pilha = [(material, iter(self._pais.get(material, ())))]
+        while pilha:
+            atual, pais = pilha[-1]
+            for pai in pais:
+                if pai not in visitados:
+                    visitados.add(pai)
+                    pilha.append((pai, iter(self._pais.get(pai, ()))))
+                    break
+            else:
+                pilha.pop()
+                pos_ordem.append(atual)
+
+        quantidades = {material: 1}
+        for atual in reversed(pos_ordem):
+            for pai, quantidade in self._pais.get(atual, {}).items():
+                quantidades[pai] = quantidades.get(pai, 0) + quantidades[atual] * quantidade
+        del quantidades[material]
+        return quantidades
+
+    def produtos_finais(self, material):
+        """
+        Devolve os produtos finais (que não são componentes de nenhum outro) que usam o material.
+
+        Args:
+            material (str): Código do material.
+
+        Returns:
+            dict: Produto final -> quantidade total do material por unidade do produto.
+        """
+        return {produto: quantidade for produto, quantidade in self.ancestrais(material).items()
+                if produto not in self._pais}
+
+    def __contains__(self, material):
+        return material in self._pais
+
+
+class RollupBOM:
+    """
+    Lead time acumulado (caminho crítico) de cada material, calculado uma única
+    vez e memorizado.
+
+    O lead time acumulado de um material com BOM é o seu lead time somado ao maior
+    lead time acumulado entre seus componentes; o de um material sem BOM é o seu
+    próprio lead time. Cada material é calculado uma vez, mesmo quando aparece em
+    várias BOMs; quando os dados de um material mudam, apenas ele e os produtos
+    que o usam (direta ou indiretamente) são descartados da memória.
+    """
+
+    def __init__(self, boms, indice_onde_usado, leadtime_material):
+        """
+        Args:
+            boms (dict): Dicionário produto -> {componente: quantidade}.
+            indice_onde_usado (IndiceOndeUsado): Índice usado na invalidação.
+            leadtime_material (callable): Função material -> lead time do próprio material.
+        """
+        self.boms = boms
+        self.indice_onde_usado = indice_onde_usado
+        self.leadtime_material = leadtime_material
+        self._memoria = {}  # material -> leadtime_acumulado
+
+    def leadtime_acumulado(self, material):
+        """
+        Devolve o lead time acumulado (caminho crítico) de um material.
+
+        Args:
+            material (str): Código do material.
+
+        Returns:
+            Lead time acumulado do material.
+
+        Raises:
+            ValueError: Se as BOMs contiverem um ciclo a partir do material.
+        """
+        if material in self._memoria:
+            return self._memoria[material]
+
+        # Pós-ordem iterativa sobre os componentes ainda não calculados
+        em_andamento = {material}
+        pilha = [(material, iter(self.boms.get(material, ())))]
+        while pilha:
+            atual, componentes = pilha[-1]
+            for componente in componentes:
+                if componente in self._memoria:
+                    continue
+                if componente in em_andamento:
+                    raise ValueError(f"Ciclo detectado nas BOMs envolvendo o material: {componente}")
+                em_andamento.add(componente)
+                pilha.append((componente, iter(self.boms.get(componente, ()))))
+                break
+            else:
+                pilha.pop()
+                em_andamento.discard(atual)
+                leadtime = self.leadtime_material(atual)
+                bom = self.boms.get(atual)
+                if bom:
+                    leadtime += max(self._memoria[componente] for componente in bom)
+                self._memoria[atual] = leadtime
+
+        return self._memoria[material]
+
+    def invalidar(self, materiais):
+        """
+        Descarta da memória os materiais informados e os produtos que os usam.
+
+        Args:
+            materiais (iterable): Materiais cujos dados ou BOMs mudaram.
+        """
+        for material in materiais:
+            # Um produto só é memorizado depois de todos os seus componentes: se o
+            # material não está na memória, nenhum produto que o usa está
+            if self._memoria.pop(material, None) is None:
+                continue
+            for produto in self.indice_onde_usado.ancestrais(material):
+                self._memoria.pop(produto, None)
+
+    def limpar(self):
+        """
+        Descarta toda a memória.
+        """
+        self._memoria.clear()
+
+
+class MatrizBOM:
+    """
+    BOMs compiladas em uma matriz esparsa produto × componente.
+
+    Os materiais recebem um índice único, ordenado pelo código de nível, de modo
+    que os materiais de um mesmo nível ocupam uma faixa contígua. As linhas das
+    BOMs são guardadas como triplas (produto, componente, quantidade), agrupadas
+    por nível do produto e ordenadas por componente, o que permite calcular as
+    necessidades brutas dos componentes como um produto matriz-vetor vetorizado.
+    A matriz pode ser reaproveitada entre planejamentos enquanto as BOMs não mudarem.
+    """
+
+    def __init__(self, boms, codigos_nivel):
+        """
+        Compila as BOMs.
+
+        Args:
+            boms (dict): Dicionário produto -> {componente: quantidade}.
+            codigos_nivel (dict): Código de nível de cada material (calcular_codigos_nivel).
+        """
+        # Índice dos materiais, na ordem dos níveis (e de aparição nas BOMs dentro do nível)
+        materiais = list(dict.fromkeys(
+            material for produto, bom in boms.items() for material in (produto, *bom)
+        ))
+        materiais.sort(key=lambda material: codigos_nivel.get(material, 0))
+        self.materiais = materiais
+        self.indice = {material: i for i, material in enumerate(materiais)}
+        self.niveis = np.array([codigos_nivel.get(material, 0) for material in materiais], dtype=np.int64)
+        self.num_niveis = int(self.niveis.max()) + 1 if len(materiais) else 0
+        self._inicios_nivel = np.searchsorted(self.niveis, np.arange(self.num_niveis + 1))
+
+        self.tem_bom = np.zeros(len(materiais), dtype=bool)
+        self.tem_bom[[self.indice[produto] for produto in boms]] = True
+
+        # Triplas da matriz esparsa
+        produtos = np.array([self.indice[produto] for produto, bom in boms.items() for _ in bom], dtype=np.int64)
+        componentes = np.array([self.indice[componente] for bom in boms.values() for componente in bom],
+                               dtype=np.int64)
+        quantidades = np.array([quantidade for bom in boms.values() for quantidade in bom.values()])
+        if quantidades.dtype.kind not in 'iuf':
+            quantidades = quantidades.astype(np.float64)
+        self.quantidades_dtype = quantidades.dtype
+
+        # Agrupa as triplas por nível do produto e, dentro do nível, por componente
+        ordem = np.lexsort((componentes, self.niveis[produtos]))
+        self.produtos = produtos[ordem]
+        self.componentes = componentes[ordem]
+        self.quantidades = quantidades[ordem]
+        self._inicios_arestas = np.searchsorted(self.niveis[self.produtos], np.arange(self.num_niveis + 1))
+        # Ordem das triplas por componente, para o produto com todas as BOMs de uma vez
+        self._ordem_componentes = np.argsort(self.componentes, kind='stable')
+
+    def __len__(self):
+        return len(self.materiais)
+
+    def faixa_nivel(self, nivel):
+        """
+        Devolve a faixa de índices (slice) dos materiais de um nível.
+        """
+        return slice(self._inicios_nivel[nivel], self._inicios_nivel[nivel + 1])
+
+    def _arestas(self, nivel):
+        """
+        Devolve as triplas cujos produtos pertencem ao nível (ou todas, se nivel for None),
+        ordenadas por componente.
+        """
+        if nivel is None:
+            return self._ordem_componentes
+        return slice(self._inicios_arestas[nivel], self._inicios_arestas[nivel + 1])
+
+    def multiplicar(self, producao, nivel=None):
+        """
+        Calcula as necessidades brutas dos componentes geradas por um vetor de
+        produção (produto matriz-vetor Mᵀ·p).
+
+        Args:
+            producao (ndarray): Quantidades a produzir por material, com forma (n,)
+                                ou (k, n) para k vetores de uma só vez.
+            nivel (int, opcional): Se fornecido, considera apenas as BOMs dos
+                                   produtos desse nível.
+
+        Returns:
+            ndarray: Necessidades brutas por material, com a mesma forma de producao.
+        """
+        producao = np.asarray(producao)
+        faixa = self._arestas(nivel)
+        contribuicoes = producao[..., self.produtos[faixa]] * self.quantidades[faixa]
+        return self._somar_por_componente(contribuicoes, self.componentes[faixa], producao.shape)
+
+    def alcancaveis(self, mascara, nivel=None):
+        """
+        Indica os componentes usados pelos materiais marcados na máscara.
+
+        Args:
+            mascara (ndarray): Máscara booleana dos materiais de origem, com forma (n,) ou (k, n).
+            nivel (int, opcional): Se fornecido, considera apenas as BOMs dos produtos desse nível.
+
+        Returns:
+            ndarray: Máscara booleana dos componentes alcançados, com a mesma forma de mascara.
+        """
+        mascara = np.asarray(mascara)
+        faixa = self._arestas(nivel)
+        usos = mascara[..., self.produtos[faixa]].astype(np.int64)
+        return self._somar_por_componente(usos, self.componentes[faixa], mascara.shape) > 0
+
+    def maximo_componentes(self, valores, nivel):
+        """
+        Calcula, para cada produto de um nível, o maior valor entre os seus componentes
+        (por exemplo, o maior lead time acumulado).
+
+        Args:
+            valores (ndarray): Valores por material, com forma (n,) ou (k, n).
+            nivel (int): Nível dos produtos.
+
+        Returns:
+            ndarray: Maior valor dos componentes de cada produto do nível (0 para os demais
+                     materiais), com a mesma forma de valores.
+        """
+        valores = np.asarray(valores)
+        faixa = self._arestas(nivel)
+        produtos = self.produtos[faixa]
+        resultado = np.zeros(valores.shape, dtype=valores.dtype)
+        if len(produtos) == 0:
+            return resultado
+        # As triplas do nível estão ordenadas por componente: reagrupa por produto
+        ordem = np.argsort(produtos, kind='stable')
+        produtos = produtos[ordem]
+        inicios = np.flatnonzero(np.r_[True, produtos[1:] != produtos[:-1]])
+        contribuicoes = valores[..., self.componentes[faixa][ordem]]
+        resultado[..., produtos[inicios]] = np.maximum.reduceat(contribuicoes, inicios, axis=-1)
+        return resultado
+
+    @staticmethod
+    def _somar_por_componente(contribuicoes, componentes, forma):
+        """
+        Soma as contribuições das triplas por componente (as triplas estão ordenadas por componente).
+        """
+        resultado = np.zeros(forma, dtype=contribuicoes.dtype)
+        if len(componentes) == 0:
+            return resultado
+        inicios = np.flatnonzero(np.r_[True, componentes[1:] != componentes[:-1]])
+        resultado[..., componentes[inicios]] = np.add.reduceat(contribuicoes, inicios, axis=-1)
+        return resultado
@@ -1,6 +1,8 @@
 import os
 import pandas as pd
 from datetime import datetime
+from leitores import ler_tabela
+from quadro import QuadroPlanejamento, colunas_datas
 
 
 class CRP:
@@ -11,14 +13,18 @@ class CRP:
     as restrições de capacidade dos recursos produtivos.
     """
 
-    def __init__(self, pasta_arquivos):
+    def __init__(self, pasta_arquivos, formato_entrada=None):
         """
         Inicializa o CRP.
 
         Args:
             pasta_arquivos (str): Caminho para a pasta onde os arquivos serão lidos/salvos.
+            formato_entrada (str, opcional): Formato dos arquivos de entrada ('xlsx', 'csv',
+                                             'parquet' ou 'sqlite'), usado quando a extensão
+                                             do arquivo não é reconhecida.
         """
         self.pasta_arquivos = pasta_arquivos
+        self.formato_entrada = formato_entrada
         self.estado = "Não Inicializado"
         self.planejamento_mrp = {}
         self.datas_entrega = []
@@ -29,7 +35,7 @@ class CRP:
         Carrega o planejamento do MRP a partir de uma planilha Excel.
 
         Args:
-            nome_arquivo (str): Nome do arquivo Excel contendo o planejamento do MRP.
+            nome_arquivo (str): Nome do arquivo contendo o planejamento do MRP (XLSX, CSV, Parquet ou SQLite).
 
         Returns:
             bool: True se o planejamento foi carregado com sucesso, False caso contrário.
@@ -38,28 +44,17 @@ class CRP:
             # Constrói o caminho completo do arquivo
             caminho_arquivo = os.path.join(self.pasta_arquivos, nome_arquivo)
 
-            # Lê a planilha Excel
-            df = pd.read_excel(caminho_arquivo)
+            # Lê o arquivo de planejamento
+            df = ler_tabela(caminho_arquivo, self.formato_entrada)
 
-            # Inicializa o dicionário de planejamento
-            self.planejamento_mrp = {}
-
-            # Extrai as datas de entrega (todas as colunas exceto 'Material' e 'Estoque Atual')
-            self.datas_entrega = [col for col in df.columns if col not in ['Material', 'Estoque Atual']]
+            # Extrai as datas de entrega (colunas que são datas, exceto 'Material' e 'Estoque Atual')
+            self.datas_entrega = colunas_datas(df.columns)
 
             # Extrai os produtos (todos os valores da coluna 'Material')
             self.produtos = df['Material'].tolist()
 
-            # Itera sobre as linhas do DataFrame
-            for _, row in df.iterrows():
-                material = row['Material']
-                self.planejamento_mrp[material] = {'Estoque Atual': row['Estoque Atual']}
-
-                # Adiciona as datas e quantidades ao dicionário
-                for data in self.datas_entrega:
-                    quantidade = row[data]
-                    if pd.notna(quantidade) and quantidade > 0:
-                        self.planejamento_mrp[material][data] = quantidade
+            # Monta o quadro de planejamento, mantendo apenas as quantidades positivas
+            self.planejamento_mrp = QuadroPlanejamento.de_dataframe(df, apenas_positivos=True)
 
             # Atualiza o estado para "Inicializado"
             self.estado = "Inicializado"
@@ -76,14 +71,14 @@ class CRP:
         Carrega a planilha de demanda por recursos.
 
         Args:
-            nome_arquivo (str): Nome do arquivo Excel contendo a demanda por recursos.
+            nome_arquivo (str): Nome do arquivo contendo a demanda por recursos (XLSX, CSV, Parquet ou SQLite).
 
         Returns:
             bool: True se a demanda foi carregada com sucesso, False caso contrário.
         """
         try:
             caminho_arquivo = os.path.join(self.pasta_arquivos, nome_arquivo)
-            df = pd.read_excel(caminho_arquivo)
+            df = ler_tabela(caminho_arquivo, self.formato_entrada)
 
             self.demanda_recursos = {}
             for _, row in df.iterrows():
@@ -134,14 +129,14 @@ class CRP:
         Carrega a planilha de capacidade de produção nominal por recurso e operação.
 
         Args:
-            nome_arquivo (str): Nome do arquivo Excel contendo a capacidade dos recursos.
+            nome_arquivo (str): Nome do arquivo contendo a capacidade dos recursos (XLSX, CSV, Parquet ou SQLite).
 
         Returns:
             bool: True se a capacidade foi carregada com sucesso, False caso contrário.
         """
         try:
             caminho_arquivo = os.path.join(self.pasta_arquivos, nome_arquivo)
-            df = pd.read_excel(caminho_arquivo)
+            df = ler_tabela(caminho_arquivo, self.formato_entrada)
 
             # Inicializa o dicionário de capacidade de recursos
             self.capacidade_recursos = {}
@@ -172,14 +167,14 @@ class CRP:
         nominal dos recursos em datas específicas.
 
         Args:
-            nome_arquivo (str): Nome do arquivo Excel contendo as exceções de capacidade.
+            nome_arquivo (str): Nome do arquivo contendo as exceções de capacidade (XLSX, CSV, Parquet ou SQLite).
 
         Returns:
             bool: True se as exceções foram carregadas com sucesso, False caso contrário.
         """
         try:
             caminho_arquivo = os.path.join(self.pasta_arquivos, nome_arquivo)
-            df = pd.read_excel(caminho_arquivo, header=None, parse_dates=False)
+            df = ler_tabela(caminho_arquivo, self.formato_entrada, cabecalho=False)
 
             self.excecoes_capacidade = {}
             recurso_atual = None
@@ -216,6 +211,33 @@ class CRP:
             print(f"Erro ao carregar as exceções de capacidade: {str(e)}")
             return False
 
+    def capacidade_disponivel(self, data=None):
+        """
+        Calcula a capacidade disponível por operação, somada entre os recursos.
+
+        Args:
+            data (str, opcional): Data (formato YYYY-MM-DD) cujas exceções de capacidade são
+                                  descontadas da capacidade nominal. Se não fornecida, usa
+                                  apenas a capacidade nominal.
+
+        Returns:
+            dict: Capacidade disponível (minutos) por operação, ou None se a capacidade
+                  dos recursos não foi carregada.
+        """
+        if not hasattr(self, 'capacidade_recursos'):
+            print("Erro: Capacidade de recursos não foi carregada.")
+            return None
+
+        excecoes = getattr(self, 'excecoes_capacidade', {})
+        capacidade = {}
+        for recurso, operacoes in self.capacidade_recursos.items():
+            for operacao, capacidade_nominal in operacoes.items():
+                if not capacidade_nominal > 0:
+                    continue
+                excecao = excecoes.get(recurso, {}).get(operacao, {}).get(data, 0) if data else 0
+                capacidade[operacao] = capacidade.get(operacao, 0) + max(0, capacidade_nominal - excecao)
+        return capacidade
+
     def criar_planilha_crp(self, nome_arquivo, data_planejamento, numero_dias):
         """
         Cria uma planilha para o CRP com base nos dados de capacidade e demanda calculados anteriormente.
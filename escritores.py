@@ -0,0 +1,170 @@
+from itertools import islice
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, Font, Alignment, Border, Side, PatternFill
+from openpyxl.utils import get_column_letter
+
+
+def _estilos_padrao():
+    """
+    Cria os estilos nomeados usados nas planilhas exportadas pelo MRP.
+
+    Os estilos são registrados uma única vez no workbook e compartilhados por
+    todas as células, em vez de um objeto de borda/alinhamento por célula.
+    """
+    borda = Border(left=Side(style='thin'), right=Side(style='thin'),
+                   top=Side(style='thin'), bottom=Side(style='thin'))
+    azul = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+    cinza = PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid")
+    centro = Alignment(horizontal='center', vertical='center', wrap_text=True)
+    direita = Alignment(horizontal='right')
+
+    return [
+        NamedStyle(name='mrp_cabecalho', font=Font(bold=True, color="FFFFFF"), fill=azul,
+                   alignment=centro, border=borda),
+        NamedStyle(name='mrp_cabecalho_simples', font=Font(bold=True), alignment=centro, border=borda),
+        NamedStyle(name='mrp_texto', border=borda),
+        NamedStyle(name='mrp_numero', border=borda, alignment=direita),
+        NamedStyle(name='mrp_moeda', border=borda, alignment=direita, number_format='#,##0.00'),
+        NamedStyle(name='mrp_total', font=Font(bold=True), fill=cinza, border=borda),
+        NamedStyle(name='mrp_total_moeda', font=Font(bold=True), fill=cinza, border=borda,
+                   number_format='#,##0.00'),
+    ]
+
+
+def escrever_planilha(caminho_arquivo, titulo, cabecalhos, linhas, estilos_colunas=None,
+                      estilo_cabecalho='mrp_cabecalho', larguras=None, congelar=None,
+                      linha_total=None, estilos_total=None):
+    """
+    Grava uma planilha XLSX em modo streaming (worksheet somente escrita).
+
+    As linhas são consumidas uma a uma de um iterável e gravadas diretamente no
+    arquivo, com memória constante por linha; a formatação usa estilos nomeados
+    compartilhados.
+
+    Args:
+        caminho_arquivo (str): Caminho do arquivo XLSX a ser criado.
+        titulo (str): Nome da aba.
+        cabecalhos (list): Cabeçalhos das colunas.
+        linhas (iterable): Linhas de dados (sequências com um valor por coluna; None deixa a
+                           célula vazia).
+        estilos_colunas (list, opcional): Estilo nomeado de cada coluna de dados.
+                                          Se não fornecido, usa 'mrp_texto'.
+        estilo_cabecalho (str): Estilo nomeado dos cabeçalhos.
+        larguras (dict | list, opcional): Largura das colunas, pela letra (por exemplo, {'A': 25})
+                                          ou em uma lista, uma por coluna.
+        congelar (str, opcional): Célula para congelar painéis (por exemplo, 'B2').
+        linha_total (list | callable, opcional): Linha gravada ao final, após os dados. Pode ser
+                                                 uma função, chamada depois de consumidas as
+                                                 linhas (por exemplo, para gravar totais).
+        estilos_total (list, opcional): Estilo nomeado de cada coluna da linha de total.
+
+    Returns:
+        int: Número de linhas de dados gravadas.
+    """
+    wb = Workbook(write_only=True)
+    for estilo in _estilos_padrao():
+        wb.add_named_style(estilo)
+    ws = wb.create_sheet(titulo)
+
+    # Larguras e painéis precisam ser definidos antes da primeira linha
+    if isinstance(larguras, (list, tuple)):
+        larguras = {get_column_letter(i): largura for i, largura in enumerate(larguras, 1)}
+    for letra, largura in (larguras or {}).items():
+        ws.column_dimensions[letra].width = largura
+    if congelar:
+        ws.freeze_panes = congelar
+
+    def celulas(estilos):
+        # Uma célula por coluna, com o estilo nomeado resolvido uma única vez
+        linha = []
+        for estilo in estilos:
+            celula = WriteOnlyCell(ws)
+            celula.style = estilo
+            linha.append(celula)
+        return linha
+
+    def gravar(celulas_linha, valores):
+        # Cada linha é serializada no append, então as mesmas células são reaproveitadas
+        for celula, valor in zip(celulas_linha, valores):
+            celula.value = valor
+        ws.append(celulas_linha)
+
+    gravar(celulas([estilo_cabecalho] * len(cabecalhos)), cabecalhos)
+
+    celulas_dados = celulas(estilos_colunas or ['mrp_texto'] * len(cabecalhos))
+    total_linhas = 0
+    for valores in linhas:
+        gravar(celulas_dados, valores)
+        total_linhas += 1
+
+    if callable(linha_total):
+        linha_total = linha_total()
+    if linha_total is not None:
+        gravar(celulas(estilos_total or ['mrp_total'] * len(linha_total)), linha_total)
+
+    wb.save(caminho_arquivo)
+    return total_linhas
+
+
+def imprimir_tabela(cabecalhos, linhas, colunas=None, pagina=None, tamanho_pagina=50,
+                    linha_total=None, tablefmt="grid"):
+    """
+    Imprime uma tabela no console, inteira ou apenas uma página.
+
+    Com uma página informada, as linhas são consumidas sob demanda e apenas as
+    linhas dessa página são formatadas, de modo que ela aparece imediatamente,
+    qualquer que seja o total de linhas.
+
+    Args:
+        cabecalhos (list): Cabeçalhos das colunas.
+        linhas (iterable): Linhas de dados (sequências com um valor por coluna).
+        colunas (list, opcional): Cabeçalhos das colunas a exibir, na ordem desejada.
+                                  Se não fornecido, exibe todas as colunas.
+        pagina (int, opcional): Número da página a imprimir (a partir de 1). Se não
+                                fornecido, imprime todas as linhas em uma única tabela.
+        tamanho_pagina (int): Número de linhas por página.
+        linha_total (list | callable, opcional): Linha impressa ao final da tabela (ou da
+                                                 última página). Pode ser uma função,
+                                                 chamada depois de consumidas as linhas.
+        tablefmt (str): Formato da tabela (tabulate).
+
+    Returns:
+        int: Número de linhas de dados impressas.
+    """
+    from tabulate import tabulate
+
+    selecionar = None
+    if colunas is not None:
+        indices = [cabecalhos.index(coluna) for coluna in colunas]
+        cabecalhos = list(colunas)
+
+        def selecionar(linha):
+            return [linha[i] for i in indices]
+
+        linhas = map(selecionar, linhas)
+
+    linhas = iter(linhas)
+    if pagina is None:
+        tabela = list(linhas)
+        ultima = True
+    else:
+        # Descarta as linhas das páginas anteriores sem formatá-las
+        pagina = max(pagina, 1)
+        for _ in islice(linhas, (pagina - 1) * tamanho_pagina):
+            pass
+        # Lê uma linha a mais para saber se esta é a última página
+        tabela = list(islice(linhas, tamanho_pagina + 1))
+        ultima = len(tabela) <= tamanho_pagina
+        del tabela[tamanho_pagina:]
+
+    dados = len(tabela)
+    if ultima and linha_total is not None:
+        total = linha_total() if callable(linha_total) else linha_total
+        tabela.append(selecionar(total) if selecionar else total)
+    print(tabulate(tabela, headers=cabecalhos, tablefmt=tablefmt))
+    if pagina is not None:
+        inicio = (pagina - 1) * tamanho_pagina
+        print(f"Página {pagina} (linhas {inicio + 1} a {inicio + dados})"
+              + ("" if ultima else " - há mais linhas"))
+    return dados
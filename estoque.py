@@ -0,0 +1,364 @@
+import sys
+import numpy as np
+import pandas as pd
+from collections.abc import MutableMapping
+from contextlib import nullcontext
+
+
+# Correspondência entre os campos internos do estoque e as colunas da planilha de Estoque
+CAMPOS_ESTOQUE = {
+    'em_estoque': 'Em Estoque',
+    'minimo': 'Minimo',
+    'custo_medio_unitario': 'Custo Medio Unitario',
+    'imposto_medio_unitario': 'Imposto Medio Unitario',
+    'frete_medio_lote': 'Frete Medio Lote',
+    'leadtime_medio_lote': 'Leadtime Medio Lote'
+}
+
+
+def _converter_coluna(serie):
+    """
+    Converte uma coluna do DataFrame em um array numérico tipado.
+
+    Colunas sem valores faltantes e com todos os valores inteiros viram int64,
+    as demais viram float64 (valores faltantes são representados por NaN).
+    """
+    valores = np.array(pd.to_numeric(serie, errors='coerce'), dtype=np.float64)
+    if len(valores) and not np.isnan(valores).any() and np.array_equal(valores, np.floor(valores)):
+        return valores.astype(np.int64)
+    return valores
+
+
+def internar_codigo(codigo):
+    """
+    Interna o código de um material, para que todas as estruturas (estoque, BOMs,
+    ordens) compartilhem uma única cópia de cada código.
+    """
+    return sys.intern(codigo) if isinstance(codigo, str) else codigo
+
+
+def _valor_inteiro(valor):
+    """
+    Indica se o valor pode ser guardado em uma coluna inteira sem perda.
+    """
+    if isinstance(valor, (int, np.integer)):
+        return True
+    return isinstance(valor, (float, np.floating)) and np.isfinite(valor) and float(valor).is_integer()
+
+
+class RegistroEstoque(MutableMapping):
+    """
+    Visão de um material do estoque colunar, acessada como um dicionário.
+
+    Leituras e escritas são feitas diretamente nos arrays do EstoqueColunar,
+    de modo que self.estoque[codigo]['em_estoque'] continua funcionando.
+    """
+
+    __slots__ = ('_estoque', '_linha')
+
+    def __init__(self, estoque, linha):
+        self._estoque = estoque
+        self._linha = linha
+
+    def __getitem__(self, campo):
+        return self._estoque.colunas[campo][self._linha].item()
+
+    def __setitem__(self, campo, valor):
+        self._estoque.definir(self._linha, campo, valor)
+
+    def __delitem__(self, campo):
+        raise TypeError("Não é possível remover campos de um registro de estoque.")
+
+    def __iter__(self):
+        return iter(self._estoque.colunas)
+
+    def __len__(self):
+        return len(self._estoque.colunas)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class EstoqueColunar(MutableMapping):
+    """
+    Estoque armazenado em colunas (um array tipado por campo), com um mapa
+    código do material -> linha.
+
+    Comporta-se como o antigo dicionário de dicionários: self.estoque[codigo]
+    devolve um RegistroEstoque, que é uma visão sobre os arrays.
+    """
+
+    trava = nullcontext()  # Protege as escritas; substituída por uma trava real no modo concorrente
+
+    def __init__(self, codigos=None, colunas=None):
+        """
+        Inicializa o estoque colunar.
+
+        Args:
+            codigos (list, opcional): Códigos dos materiais, na ordem das linhas.
+            colunas (dict, opcional): Arrays por campo (chaves de CAMPOS_ESTOQUE).
+        """
+        self.codigos = list(codigos) if codigos is not None else []
+        self.indice = {codigo: linha for linha, codigo in enumerate(self.codigos)}
+        if colunas is None:
+            colunas = {campo: np.zeros(len(self.codigos), dtype=np.int64) for campo in CAMPOS_ESTOQUE}
+        self.colunas = colunas
+        self._reservas = {}  # Arrays com capacidade de reserva dos quais as colunas são visões
+
+    @classmethod
+    def de_dataframe(cls, df_estoque):
+        """
+        Cria o estoque colunar a partir de um DataFrame da planilha de Estoque,
+        convertendo cada coluna de uma só vez.
+
+        Args:
+            df_estoque (DataFrame): DataFrame com as colunas de CAMPOS_ESTOQUE e 'Material'.
+
+        Returns:
+            EstoqueColunar: Estoque com os dados do DataFrame.
+        """
+        # Em caso de códigos repetidos, prevalece a última linha (como no carregamento linha a linha)
+        duplicados = df_estoque['Material'].duplicated(keep='last').to_numpy()
+        if duplicados.any():
+            df_estoque = df_estoque[~duplicados]
+
+        codigos = [internar_codigo(codigo) for codigo in df_estoque['Material'].tolist()]
+        colunas = {campo: _converter_coluna(df_estoque[coluna]) for campo, coluna in CAMPOS_ESTOQUE.items()}
+        return cls(codigos, colunas)
+
+    def __getitem__(self, codigo):
+        return RegistroEstoque(self, self.indice[codigo])
+
+    def __setitem__(self, codigo, registro):
+        with self.trava:
+            if codigo not in self.indice:
+                # Adiciona uma nova linha zerada ao final de cada coluna
+                codigo = internar_codigo(codigo)
+                self._acrescentar_linhas(1)
+                self.indice[codigo] = len(self.codigos)
+                self.codigos.append(codigo)
+            linha = self.indice[codigo]
+            for campo, valor in registro.items():
+                self.definir(linha, campo, valor)
+
+    def __delitem__(self, codigo):
+        linha = self.indice[codigo]
+        mascara = np.ones(len(self.codigos), dtype=bool)
+        mascara[linha] = False
+        del self.codigos[linha]
+        self.indice = {codigo: linha for linha, codigo in enumerate(self.codigos)}
+        for campo, coluna in self.colunas.items():
+            self.colunas[campo] = coluna[mascara]
+
+    def __iter__(self):
+        return iter(self.codigos)
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def __contains__(self, codigo):
+        return codigo in self.indice
+
+    def __repr__(self):
+        return f"EstoqueColunar({len(self.codigos)} materiais)"
+
+    def _acrescentar_linhas(self, quantidade):
+        """
+        Acrescenta linhas zeradas ao final de todas as colunas.
+
+        Cada coluna é uma visão de um array com capacidade de reserva, que dobra quando
+        se esgota, de modo que incluir materiais um a um custa tempo constante amortizado.
+        Colunas substituídas por outras operações (promoção para float, remoção de
+        materiais) ganham uma nova reserva na inclusão seguinte.
+        """
+        for campo, coluna in self.colunas.items():
+            n = len(coluna)
+            reserva = self._reservas.get(campo)
+            if reserva is None or coluna.base is not reserva or n + quantidade > len(reserva):
+                reserva = np.empty(max(n + quantidade, 2 * n), dtype=coluna.dtype)
+                reserva[:n] = coluna
+                self._reservas[campo] = reserva
+            reserva[n:n + quantidade] = 0
+            self.colunas[campo] = reserva[:n + quantidade]
+
+    def linhas(self, codigos):
+        """
+        Devolve as linhas de uma lista de materiais.
+
+        Args:
+            codigos (list): Códigos dos materiais.
+
+        Returns:
+            ndarray: Linha de cada material (-1 para materiais fora do estoque).
+        """
+        return np.fromiter((self.indice.get(codigo, -1) for codigo in codigos), dtype=np.int64, count=len(codigos))
+
+    def valores(self, campo, linhas, padrao=0):
+        """
+        Devolve os valores de um campo para um conjunto de linhas.
+
+        Args:
+            campo (str): Campo do estoque (chave de CAMPOS_ESTOQUE).
+            linhas (ndarray): Linhas obtidas com linhas(); -1 indica material ausente.
+            padrao (int | float): Valor usado para os materiais ausentes.
+
+        Returns:
+            ndarray: Valores do campo, na ordem das linhas.
+        """
+        coluna = self.colunas[campo]
+        if len(coluna) == 0:
+            return np.full(len(linhas), padrao, dtype=np.result_type(coluna.dtype, type(padrao)))
+        return np.where(linhas >= 0, coluna[linhas], padrao)
+
+    def definir(self, linha, campo, valor):
+        """
+        Altera o valor de um campo em uma linha, promovendo a coluna para float
+        quando o novo valor não for inteiro.
+        """
+        if valor is None:
+            valor = np.nan
+        with self.trava:
+            coluna = self.colunas[campo]
+            if coluna.dtype.kind == 'i' and not _valor_inteiro(valor):
+                coluna = coluna.astype(np.float64)
+                self.colunas[campo] = coluna
+            coluna[linha] = valor
+
+    def somar(self, campo, linhas, valores):
+        """
+        Soma valores a um campo em várias linhas de uma só vez (linhas repetidas acumulam).
+
+        Args:
+            campo (str): Campo do estoque (chave de CAMPOS_ESTOQUE).
+            linhas (ndarray): Linhas obtidas com linhas(); não podem conter -1.
+            valores (ndarray): Valor a somar em cada linha.
+        """
+        valores = np.asarray(valores)
+        with self.trava:
+            coluna = self.colunas[campo]
+            if coluna.dtype.kind == 'i' and valores.dtype.kind not in 'iub' and \
+                    not np.array_equal(valores, np.floor(valores)):
+                coluna = coluna.astype(np.float64)
+                self.colunas[campo] = coluna
+            np.add.at(coluna, linhas, valores.astype(coluna.dtype))
+
+    def atribuir(self, campo, linhas, valores):
+        """
+        Atribui valores a um campo em várias linhas de uma só vez, promovendo a coluna
+        para float quando algum valor não for inteiro.
+
+        Args:
+            campo (str): Campo do estoque (chave de CAMPOS_ESTOQUE).
+            linhas (ndarray): Linhas obtidas com linhas(); não podem conter -1.
+            valores (ndarray): Novo valor de cada linha.
+        """
+        valores = np.asarray(valores)
+        with self.trava:
+            coluna = self.colunas[campo]
+            if coluna.dtype.kind == 'i' and valores.dtype.kind not in 'iub' and \
+                    not np.array_equal(valores, np.floor(valores)):
+                coluna = coluna.astype(np.float64)
+                self.colunas[campo] = coluna
+            coluna[linhas] = valores
+
+    def mesclar(self, outro):
+        """
+        Incorpora outro estoque colunar: materiais existentes são sobrescritos
+        e materiais novos são adicionados ao final.
+
+        Args:
+            outro (EstoqueColunar): Estoque a ser incorporado.
+        """
+        linhas_outro = np.array([self.indice.get(codigo, -1) for codigo in outro.codigos], dtype=np.int64)
+        existentes = linhas_outro >= 0
+        novos = [codigo for codigo, linha in zip(outro.codigos, linhas_outro) if linha < 0]
+
+        # Os materiais novos são acrescentados de uma vez, nas linhas de reserva
+        inicio = len(self.codigos)
+        self._acrescentar_linhas(len(novos))
+        for codigo in novos:
+            self.indice[codigo] = len(self.codigos)
+            self.codigos.append(codigo)
+
+        for campo in CAMPOS_ESTOQUE:
+            coluna = self.colunas[campo]
+            coluna_outro = outro.colunas[campo]
+            if coluna.dtype != coluna_outro.dtype:
+                coluna = coluna.astype(np.float64)
+                coluna_outro = coluna_outro.astype(np.float64)
+                self.colunas[campo] = coluna
+            coluna[linhas_outro[existentes]] = coluna_outro[existentes]
+            coluna[inicio:] = coluna_outro[~existentes]
+
+
+# Rótulos dos campos do estoque nos alertas de alteração
+ROTULOS_ALTERACAO = {
+    'custo_medio_unitario': 'Custo',
+    'imposto_medio_unitario': 'Imposto',
+    'frete_medio_lote': 'Frete',
+    'leadtime_medio_lote': 'Leadtime',
+}
+
+
+class AlteracoesEstoque:
+    """
+    Conjunto de alterações aplicadas aos campos do estoque, em colunas paralelas.
+
+    Cada alteração é a tupla (material, campo, antigo, novo); os alertas em texto são
+    gerados apenas quando solicitados, com alertas().
+    """
+
+    __slots__ = ('materiais', 'campos', 'antigos', 'novos')
+
+    def __init__(self, materiais=(), campos=(), antigos=(), novos=()):
+        """
+        Args:
+            materiais (list): Material de cada alteração.
+            campos (list): Campo do estoque (chave de CAMPOS_ESTOQUE) de cada alteração.
+            antigos (list): Valor anterior de cada alteração.
+            novos (list): Valor aplicado em cada alteração.
+        """
+        self.materiais = list(materiais)
+        self.campos = list(campos)
+        self.antigos = list(antigos)
+        self.novos = list(novos)
+
+    def __len__(self):
+        return len(self.materiais)
+
+    def __iter__(self):
+        return zip(self.materiais, self.campos, self.antigos, self.novos)
+
+    def __repr__(self):
+        return f"AlteracoesEstoque({list(self)!r})"
+
+    def materiais_alterados(self):
+        """
+        Devolve o conjunto dos materiais com alguma alteração.
+        """
+        return set(self.materiais)
+
+    def aumentos(self, campo):
+        """
+        Devolve os materiais cujo campo aumentou (por exemplo, 'leadtime_medio_lote').
+        """
+        return [material for material, c, antigo, novo in self if c == campo and novo > antigo]
+
+    def alertas(self):
+        """
+        Gera os alertas em texto das alterações, na ordem em que foram registradas.
+
+        Aumentos de lead time geram também um alerta de necessidade de replanejamento.
+
+        Returns:
+            list: Alertas.
+        """
+        alertas = []
+        for material, campo, antigo, novo in self:
+            rotulo = ROTULOS_ALTERACAO.get(campo, campo)
+            if campo == 'leadtime_medio_lote' and novo > antigo:
+                alertas.append(f"{rotulo} de {material} aumentou: {antigo} -> {novo}")
+                alertas.append("Necessidade de replanejar devido a aumento no leadtime.")
+            else:
+                alertas.append(f"{rotulo} de {material} alterado: {antigo} -> {novo}")
+        return alertas
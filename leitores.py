@@ -0,0 +1,253 @@
+import os
+import sqlite3
+from itertools import islice
+import pandas as pd
+from openpyxl import load_workbook
+
+
+# Número de linhas de uma planilha XLSX convertidas em DataFrame de cada vez
+TAMANHO_BLOCO_XLSX = 10000
+
+
+def ler_xlsx(caminho_arquivo, cabecalho=True, tabela=None):
+    """
+    Lê a planilha ativa de um arquivo XLSX em modo somente leitura.
+
+    As linhas são percorridas como valores (sem montar o modelo de objetos do
+    workbook), as linhas totalmente vazias são descartadas e os dados são
+    convertidos em DataFrames a cada TAMANHO_BLOCO_XLSX linhas, de modo que
+    as tuplas intermediárias nunca ocupam mais do que um bloco.
+
+    Args:
+        caminho_arquivo (str): Caminho do arquivo XLSX.
+        cabecalho (bool): Se True, a primeira linha é usada como cabeçalho.
+        tabela (str, opcional): Nome da aba a ser lida. Se não fornecido, usa a aba ativa.
+
+    Returns:
+        DataFrame: Dados da planilha.
+    """
+    wb = load_workbook(caminho_arquivo, read_only=True, data_only=True)
+    try:
+        ws = wb[tabela] if tabela else wb.active
+        # A dimensão gravada no arquivo pode estar errada; as linhas são lidas como vierem
+        ws.reset_dimensions()
+        linhas = (linha for linha in ws.iter_rows(values_only=True)
+                  if not all(valor is None for valor in linha))
+        colunas = list(next(linhas, ())) if cabecalho else None
+        blocos = []
+        while True:
+            registros = list(islice(linhas, TAMANHO_BLOCO_XLSX))
+            if not registros:
+                break
+            blocos.append(_bloco_xlsx(registros, colunas))
+    finally:
+        wb.close()
+
+    if not blocos:
+        return pd.DataFrame(columns=colunas or [])
+    return blocos[0] if len(blocos) == 1 else pd.concat(blocos, ignore_index=True)
+
+
+def _bloco_xlsx(registros, colunas=None):
+    """
+    Converte um bloco de linhas da planilha em DataFrame.
+
+    As linhas são ajustadas à largura do cabeçalho ou, sem cabeçalho, à da
+    linha mais longa do bloco (colunas numeradas).
+    """
+    if colunas is None:
+        colunas = list(range(max(len(linha) for linha in registros)))
+    largura = len(colunas)
+    registros = [tuple(linha[:largura]) + (None,) * (largura - len(linha)) for linha in registros]
+    return pd.DataFrame.from_records(registros, columns=colunas)
+
+
+def ler_csv(caminho_arquivo, cabecalho=True, tabela=None):
+    """
+    Lê um arquivo CSV, usando o leitor colunar do pyarrow quando disponível.
+
+    Args:
+        caminho_arquivo (str): Caminho do arquivo CSV.
+        cabecalho (bool): Se True, a primeira linha é usada como cabeçalho.
+        tabela (str, opcional): Não se aplica a arquivos CSV.
+
+    Returns:
+        DataFrame: Dados do arquivo.
+    """
+    try:
+        import pyarrow  # noqa: F401
+        engine = 'pyarrow'
+    except ImportError:
+        engine = 'c'
+    df = pd.read_csv(caminho_arquivo, header=0 if cabecalho else None, engine=engine)
+    return df.dropna(how='all')
+
+
+def ler_parquet(caminho_arquivo, cabecalho=True, tabela=None):
+    """
+    Lê um arquivo Parquet (requer pyarrow ou fastparquet).
+
+    Args:
+        caminho_arquivo (str): Caminho do arquivo Parquet.
+        cabecalho (bool): Se False, os nomes das colunas viram a primeira linha dos dados.
+        tabela (str, opcional): Não se aplica a arquivos Parquet.
+
+    Returns:
+        DataFrame: Dados do arquivo.
+    """
+    df = pd.read_parquet(caminho_arquivo).dropna(how='all')
+    return df if cabecalho else _cabecalho_como_linha(df)
+
+
+def ler_sqlite(caminho_arquivo, cabecalho=True, tabela=None):
+    """
+    Lê uma tabela de um banco SQLite.
+
+    Args:
+        caminho_arquivo (str): Caminho do banco SQLite.
+        cabecalho (bool): Se False, os nomes das colunas viram a primeira linha dos dados.
+        tabela (str, opcional): Nome da tabela. Se não fornecido, usa o nome do arquivo
+                                sem extensão (por exemplo, 'Estoque' para Estoque.db).
+
+    Returns:
+        DataFrame: Dados da tabela.
+    """
+    if tabela is None:
+        tabela = os.path.splitext(os.path.basename(caminho_arquivo))[0]
+    conexao = sqlite3.connect(caminho_arquivo)
+    try:
+        df = pd.read_sql_query('SELECT * FROM "{}"'.format(tabela.replace('"', '""')), conexao)
+    finally:
+        conexao.close()
+    df = df.dropna(how='all')
+    return df if cabecalho else _cabecalho_como_linha(df)
+
+
+def _cabecalho_como_linha(df):
+    """
+    Transforma os nomes das colunas na primeira linha dos dados (colunas numeradas).
+    """
+    registros = [tuple(df.columns)] + list(df.itertuples(index=False, name=None))
+    return pd.DataFrame.from_records(registros)
+
+
+# Leitores disponíveis por formato de entrada
+LEITORES = {
+    'xlsx': ler_xlsx,
+    'csv': ler_csv,
+    'parquet': ler_parquet,
+    'sqlite': ler_sqlite,
+}
+
+# Formato associado a cada extensão de arquivo (em ordem de preferência)
+EXTENSOES = {
+    '.xlsx': 'xlsx',
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.db': 'sqlite',
+    '.sqlite': 'sqlite',
+    '.sqlite3': 'sqlite',
+}
+
+
+def registrar_leitor(formato, leitor, extensoes=()):
+    """
+    Registra um novo leitor de entrada.
+
+    Args:
+        formato (str): Nome do formato (por exemplo, 'json').
+        leitor (callable): Função leitor(caminho_arquivo, cabecalho=True, tabela=None) -> DataFrame.
+        extensoes (iterable): Extensões de arquivo associadas ao formato (por exemplo, ['.json']).
+    """
+    LEITORES[formato] = leitor
+    for extensao in extensoes:
+        EXTENSOES[extensao.lower()] = formato
+
+
+def formato_arquivo(caminho_arquivo, formato_padrao=None):
+    """
+    Determina o formato de um arquivo pela extensão.
+
+    Args:
+        caminho_arquivo (str): Caminho ou nome do arquivo.
+        formato_padrao (str, opcional): Formato usado quando a extensão não é reconhecida.
+
+    Returns:
+        str: Formato do arquivo, ou None se não for possível determiná-lo.
+    """
+    extensao = os.path.splitext(caminho_arquivo)[1].lower()
+    return EXTENSOES.get(extensao, formato_padrao)
+
+
+def ler_tabela(caminho_arquivo, formato=None, cabecalho=True, tabela=None):
+    """
+    Lê um arquivo de entrada com o leitor adequado ao seu formato.
+
+    O formato é escolhido pela extensão do arquivo; o parâmetro formato é usado
+    para arquivos com extensão não reconhecida.
+
+    Args:
+        caminho_arquivo (str): Caminho do arquivo.
+        formato (str, opcional): Formato a ser usado se a extensão não for reconhecida.
+        cabecalho (bool): Se True, a primeira linha é usada como cabeçalho.
+        tabela (str, opcional): Aba (XLSX) ou tabela (SQLite) a ser lida.
+
+    Returns:
+        DataFrame: Dados lidos.
+    """
+    formato = formato_arquivo(caminho_arquivo, formato)
+    if formato not in LEITORES:
+        raise ValueError(f"Formato de entrada não suportado para o arquivo '{caminho_arquivo}'.")
+    return LEITORES[formato](caminho_arquivo, cabecalho=cabecalho, tabela=tabela)
+
+
+def localizar_arquivo(pasta_arquivos, nome_base, formato=None):
+    """
+    Procura na pasta um arquivo de entrada com o nome base informado e uma
+    extensão suportada (por exemplo, Estoque.xlsx, Estoque.csv ou Estoque.db).
+
+    Args:
+        pasta_arquivos (str): Pasta onde procurar.
+        nome_base (str): Nome do arquivo sem extensão.
+        formato (str, opcional): Se fornecido, aceita apenas arquivos desse formato.
+
+    Returns:
+        str: Nome do arquivo encontrado. Se nenhum existir, devolve o nome com a
+             primeira extensão aceita (o erro de arquivo faltante aparece na leitura).
+    """
+    extensoes = [extensao for extensao, fmt in EXTENSOES.items() if formato is None or fmt == formato]
+    for extensao in extensoes:
+        nome_arquivo = nome_base + extensao
+        if os.path.exists(os.path.join(pasta_arquivos, nome_arquivo)):
+            return nome_arquivo
+    return nome_base + extensoes[0]
+
+
+def listar_arquivos_bom(pasta_arquivos, formato=None):
+    """
+    Lista os arquivos de BOM da pasta (XXX_BOM.<extensão>).
+
+    Se houver mais de um arquivo para o mesmo produto, prevalece a extensão
+    que aparece primeiro em EXTENSOES.
+
+    Args:
+        pasta_arquivos (str): Pasta onde procurar.
+        formato (str, opcional): Se fornecido, aceita apenas arquivos desse formato.
+
+    Returns:
+        dict: Código do produto -> nome do arquivo, ordenado pelo código do produto.
+    """
+    prioridade = {extensao: i for i, extensao in enumerate(EXTENSOES)}
+    arquivos = {}
+    for arquivo in os.listdir(pasta_arquivos):
+        nome_base, extensao = os.path.splitext(arquivo)
+        extensao = extensao.lower()
+        if not nome_base.endswith("_BOM") or extensao not in EXTENSOES:
+            continue
+        if formato is not None and EXTENSOES[extensao] != formato:
+            continue
+        codigo_produto = nome_base[:-len("_BOM")]
+        atual = arquivos.get(codigo_produto)
+        if atual is None or prioridade[extensao] < prioridade[os.path.splitext(atual)[1].lower()]:
+            arquivos[codigo_produto] = arquivo
+    return dict(sorted(arquivos.items()))
@@ -1,7 +1,7 @@
 '''
 import os
 from datetime import datetime
-from mrp import MRP
+from mrp import MRP, ARQUIVO_CACHE
 
 if __name__ == '__main__':
     print("=" * 80)
@@ -213,7 +213,9 @@ if __name__ == '__main__':
 
     # Inicializar dados do MRP
     print("Inicializando dados do MRP...")
-    mrp.inicializar_dados()
+    # O snapshot fica na pasta base e é identificado pelo conteúdo dos arquivos, de modo que
+    # as cópias feitas para cada ciclo reaproveitam os dados já convertidos
+    mrp.inicializar_dados(usar_cache=True, caminho_cache=os.path.join(diretorio_base, ARQUIVO_CACHE))
 
     # Definir a demanda
     demanda = {"ETI": 100, "ETF": 155}
@@ -1,139 +1,651 @@
+import numpy as np
 import pandas as pd
 import os
-import openpyxl
-from openpyxl import load_workbook
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime, timedelta
+from estoque import EstoqueColunar, AlteracoesEstoque, internar_codigo
+from bom import calcular_codigos_nivel, IndiceOndeUsado, MatrizBOM, RollupBOM
+from leitores import ler_tabela, localizar_arquivo, listar_arquivos_bom
+from ordens import OrdemPlanejada, CustoLeadtime, OrdemControle, OrdensControle, DiarioOrdens, TravasMateriais
+from escritores import escrever_planilha, imprimir_tabela
+from quadro import QuadroPlanejamento, formatar_dias
+from armazenamento import ArmazenamentoSQLite
+from simulacao import CV_CUSTO_PADRAO, CV_LEADTIME_PADRAO, montar_modelo, simular
+
+
+# Contexto vazio usado no lugar das travas quando o modo concorrente não está ativo
+_SEM_TRAVA = nullcontext()
+
+# Correspondência entre os campos do estoque e as colunas da planilha de cotações
+CAMPOS_COTACOES = {
+    'custo_medio_unitario': 'Custo Unitario',
+    'imposto_medio_unitario': 'Imposto Unitario',
+    'frete_medio_lote': 'Frete Lote',
+    'leadtime_medio_lote': 'Lead Time',
+}
+
+# Regras de seleção entre as cotações de fornecedores de um mesmo material
+REGRAS_COTACAO = ('menor_custo', 'menor_leadtime')
+
+# Nome padrão do snapshot com os dados já convertidos dos arquivos de entrada
+ARQUIVO_CACHE = ".mrp_cache.npz"
+VERSAO_CACHE = 3
+
+
+def _assinatura_arquivo(caminho_arquivo, entrada=None):
+    """
+    Calcula a assinatura (mtime, tamanho e hash SHA-256) de um arquivo.
+
+    Se a entrada do snapshot tiver o mesmo mtime e tamanho, o hash gravado é
+    reaproveitado e o arquivo não é relido.
+    """
+    info = os.stat(caminho_arquivo)
+    if entrada is not None and (entrada['mtime_ns'], entrada['tamanho']) == (info.st_mtime_ns, info.st_size):
+        sha256 = entrada['sha256']
+    else:
+        h = hashlib.sha256()
+        with open(caminho_arquivo, 'rb') as arquivo:
+            for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+                h.update(bloco)
+        sha256 = h.hexdigest()
+    return {'mtime_ns': info.st_mtime_ns, 'tamanho': info.st_size, 'sha256': sha256}
+
+
+def _chave_conteudo(entrada):
+    """
+    Devolve a chave dos dados convertidos de um arquivo: o tipo (estoque ou BOM) e o hash do conteúdo.
+    """
+    return f"{entrada['tipo']}-{entrada['sha256']}"
+
+
+def _ler_snapshot(caminho_cache):
+    """
+    Lê o snapshot de dados convertidos. Snapshots ausentes, corrompidos ou de
+    outra versão são ignorados.
+
+    O snapshot é um arquivo .npz lido com allow_pickle=False: os metadados
+    (assinaturas, códigos dos materiais e BOMs) ficam em JSON e as colunas do
+    estoque em arrays numéricos, de modo que a leitura nunca executa código.
+
+    Returns:
+        tuple: (arquivos, conteudos) - assinatura de cada arquivo, por caminho absoluto,
+               e dados convertidos, pela chave do conteúdo (_chave_conteudo).
+    """
+    try:
+        with np.load(caminho_cache, allow_pickle=False) as arquivo:
+            metadados = json.loads(arquivo['metadados'].item())
+            if metadados.get('versao') != VERSAO_CACHE:
+                return {}, {}
+            conteudos = {}
+            for chave, conteudo in metadados['conteudos'].items():
+                if 'bom' in conteudo:
+                    conteudos[chave] = {internar_codigo(material): quantidade
+                                        for material, quantidade in conteudo['bom']}
+                else:
+                    colunas = {campo: arquivo[nome] for campo, nome in conteudo['colunas']}
+                    conteudos[chave] = EstoqueColunar([internar_codigo(codigo) for codigo in conteudo['codigos']],
+                                                      colunas)
+            return metadados['arquivos'], conteudos
+    except Exception:
+        return {}, {}
+
+
+def _gravar_snapshot(caminho_cache, arquivos, conteudos):
+    """
+    Grava o snapshot de forma atômica (arquivo temporário + renomeação).
+
+    Args:
+        caminho_cache (str): Caminho do snapshot.
+        arquivos (dict): Assinatura (mtime, tamanho, sha256 e tipo) de cada arquivo, por caminho absoluto.
+        conteudos (dict): Dados convertidos, pela chave do conteúdo.
+    """
+    metadados = {}
+    arrays = {}
+    for i, (chave, dados) in enumerate(conteudos.items()):
+        if isinstance(dados, EstoqueColunar):
+            metadados[chave] = {'codigos': list(dados.codigos), 'colunas': []}
+            for campo, coluna in dados.colunas.items():
+                arrays[f"{i}_{campo}"] = coluna
+                metadados[chave]['colunas'].append([campo, f"{i}_{campo}"])
+        else:
+            metadados[chave] = {'bom': list(dados.items())}
+
+    caminho_temporario = caminho_cache + ".tmp"
+    with open(caminho_temporario, 'wb') as arquivo:
+        np.savez(arquivo, metadados=np.array(json.dumps({'versao': VERSAO_CACHE, 'arquivos': arquivos,
+                                                         'conteudos': metadados})),
+                 **arrays)
+    os.replace(caminho_temporario, caminho_cache)
+
+
+def _bom_de_dataframe(df_bom):
+    """
+    Converte o DataFrame de uma BOM no dicionário componente -> quantidade.
+    """
+    # Converte as colunas inteiras de uma vez, sem percorrer o DataFrame linha a linha
+    materiais = [internar_codigo(material) for material in df_bom['Material'].tolist()]
+    quantidades = pd.to_numeric(df_bom['Quantidade'], errors='coerce').tolist()
+    return dict(zip(materiais, quantidades))
+
 
 class MRP:
     """
     Classe que implementa o Material Requirements Planning (MRP).
     """
 
-    def __init__(self, pasta_arquivos):
+    def __init__(self, pasta_arquivos, formato_entrada=None):
         """
         Inicializa o objeto MRP com a pasta contendo os arquivos de entrada.
+
+        Args:
+            pasta_arquivos (str): Pasta com os arquivos de entrada e saída.
+            formato_entrada (str, opcional): Formato dos arquivos de entrada ('xlsx', 'csv',
+                                             'parquet' ou 'sqlite'). Se não fornecido, o
+                                             formato é escolhido pela extensão de cada arquivo.
         """
         self.pasta_arquivos = pasta_arquivos
-        self.estoque = {}
-        self.boms = {}  # Bills of Materials
+        self.formato_entrada = formato_entrada
+        self.estoque = EstoqueColunar()
+        self.boms = {}  # Bills of Materials (também cria o índice onde-usado e o rollup)
+        self.codigos_nivel = {}  # Low-level code de cada material das BOMs
+        self.matriz_bom = None  # BOMs compiladas em matriz esparsa (MatrizBOM)
         self.fc_lt_esperados = {}
-        self.planejamento = {}
+        self.planejamento = QuadroPlanejamento()  # Quadro material × dia de entrega
+        self.materiais_alterados = set()  # Materiais com custo ou lead time alterado desde o último replanejamento
+        self.diario = None  # Diário dos eventos das ordens de controle (DiarioOrdens), se ativado
+        self.armazenamento = None  # Banco SQLite com o estado do MRP (ArmazenamentoSQLite), se conectado
+        self.travas = None  # Travas por material (TravasMateriais), no modo concorrente
 
 
+    @property
+    def boms(self):
+        """
+        Dicionário produto -> {componente: quantidade}.
+        """
+        return self._boms
+
+    @boms.setter
+    def boms(self, boms):
+        # Um novo dicionário de BOMs exige índice onde-usado e rollup novos
+        self._boms = boms
+        self._reconstruir_indices_bom()
+
+    def _reconstruir_indices_bom(self):
+        """
+        Reconstrói o índice onde-usado (BOM reversa) e o rollup de lead times a partir de self.boms.
+        """
+        self.indice_onde_usado = IndiceOndeUsado(self.boms)
+        self.rollup = RollupBOM(self.boms, self.indice_onde_usado, self._leadtime_rollup)
+
     def carregar_estoque(self, df_estoque):
         """
         Carrega os dados de estoque a partir de um DataFrame do pandas.
+
+        As colunas do DataFrame são convertidas de uma só vez em arrays tipados
+        (EstoqueColunar); self.estoque[codigo]['campo'] é uma visão sobre esses arrays.
+        """
+        self._incorporar_estoque(EstoqueColunar.de_dataframe(df_estoque))
+        self.rollup.limpar()
+
+    def _incorporar_estoque(self, novo_estoque):
         """
-        for _, row in df_estoque.iterrows():
-            codigo_material = row['Material']
-            self.estoque[codigo_material] = {
-                'em_estoque': row['Em Estoque'],
-                'minimo': row['Minimo'],
-                'custo_medio_unitario': row['Custo Medio Unitario'],
-                'imposto_medio_unitario': row['Imposto Medio Unitario'],
-                'frete_medio_lote': row['Frete Medio Lote'],
-                'leadtime_medio_lote': row['Leadtime Medio Lote']
-            }
+        Incorpora um EstoqueColunar já convertido ao estoque do MRP.
+        """
+        if len(self.estoque) == 0:
+            self.estoque = novo_estoque
+            self._aplicar_travas()
+        else:
+            self.estoque.mesclar(novo_estoque)
 
     def carregar_bom(self, codigo_produto, df_bom):
         """
         Carrega a BOM (Bill of Materials) a partir de um DataFrame do pandas.
         """
-        self.boms[codigo_produto] = {}
-        for _, row in df_bom.iterrows():
-            material = row['Material']
-            quantidade = row['Quantidade']
-            self.boms[codigo_produto][material] = quantidade
-
-    def inicializar_dados(self):
-        """
-        Carrega os dados de estoque e BOMs a partir dos arquivos XLSX.
-        """
-        # Carrega o estoque
-        estoque_path = os.path.join(self.pasta_arquivos, "Estoque.xlsx")
-        estoque_wb = load_workbook(estoque_path)
-        estoque_sheet = estoque_wb.active
-        df_estoque = pd.DataFrame(estoque_sheet.values)
-        df_estoque.columns = df_estoque.iloc[0]
-        df_estoque = df_estoque[1:]
-        df_estoque = df_estoque.dropna(how='all')  # Remove linhas completamente vazias
-        self.carregar_estoque(df_estoque)
-
-        # Carrega as BOMs
-        for arquivo in os.listdir(self.pasta_arquivos):
-            if "_BOM.xlsx" in arquivo:
-                codigo_produto = arquivo.replace("_BOM.xlsx", "")
-                bom_path = os.path.join(self.pasta_arquivos, arquivo)
-                bom_wb = load_workbook(bom_path)
-                bom_sheet = bom_wb.active
-                df_bom = pd.DataFrame(bom_sheet.values)
-                df_bom.columns = df_bom.iloc[0]
-                df_bom = df_bom[1:]
-                df_bom = df_bom.dropna(how='all')  # Adicionado dropna() para remover linhas completamente vazias
-                self.carregar_bom(codigo_produto, df_bom)
+        codigo_produto = internar_codigo(codigo_produto)
+        self.boms[codigo_produto] = _bom_de_dataframe(df_bom)
+        self.indice_onde_usado.definir_bom(codigo_produto, self.boms[codigo_produto])
+        self.rollup.invalidar([codigo_produto])
+        # Os códigos de nível e a matriz precisam ser recalculados com a nova BOM
+        self.codigos_nivel = {}
+        self.matriz_bom = None
+
+    def consultar_onde_usado(self, material, transitivo=False):
+        """
+        Consulta os produtos que usam um material.
+
+        Args:
+            material (str): Código do material.
+            transitivo (bool): Se True, inclui os produtos que usam o material indiretamente
+                               (por meio de submontagens).
+
+        Returns:
+            dict: Produto -> quantidade do material por unidade do produto.
+        """
+        if transitivo:
+            return self.indice_onde_usado.ancestrais(material)
+        return self.indice_onde_usado.pais(material)
+
+    def _leadtime_rollup(self, material):
+        """
+        Devolve o lead time de um material, para o RollupBOM.
+        """
+        dados = self.estoque.get(material)
+        return 0 if dados is None else dados['leadtime_medio_lote']
+
+    def invalidar_rollup(self, materiais):
+        """
+        Descarta os lead times acumulados que dependem dos materiais informados.
+
+        Deve ser chamado quando o lead time de um material é alterado diretamente
+        no estoque (atualizar_custos_leadtimes já o faz).
+
+        Args:
+            materiais (iterable): Materiais alterados.
+        """
+        self.rollup.invalidar(materiais)
+
+    def calcular_codigos_nivel(self):
+        """
+        Calcula o código de nível mais baixo (low-level code) de cada material,
+        verificando se há ciclos nas BOMs.
+
+        Returns:
+            dict: Código de nível de cada material.
+
+        Raises:
+            ValueError: Se as BOMs contiverem um ciclo.
+        """
+        self.codigos_nivel = calcular_codigos_nivel(self.boms)
+        self.matriz_bom = None
+        return self.codigos_nivel
+
+    def compilar_matriz_bom(self):
+        """
+        Compila as BOMs em uma matriz esparsa produto × componente (MatrizBOM).
+
+        A matriz é guardada em self.matriz_bom e reaproveitada pelos planejamentos
+        seguintes, até que uma BOM seja carregada novamente.
+
+        Returns:
+            MatrizBOM: BOMs compiladas.
+        """
+        if self.matriz_bom is None:
+            if not self.codigos_nivel:
+                self.calcular_codigos_nivel()
+            self.matriz_bom = MatrizBOM(self.boms, self.codigos_nivel)
+        return self.matriz_bom
+
+    def inicializar_dados(self, max_workers=None, usar_processos=False, usar_cache=False, caminho_cache=None):
+        """
+        Carrega os dados de estoque e BOMs a partir dos arquivos de entrada.
+
+        Por padrão são lidos Estoque.xlsx e XXX_BOM.xlsx; também são aceitos arquivos
+        CSV, Parquet e SQLite (por exemplo, Estoque.csv ou ETI_BOM.parquet), conforme
+        a extensão ou o formato_entrada do MRP.
+
+        Os arquivos são lidos em paralelo (planilhas XLSX em modo somente leitura).
+        Opcionalmente, os dados convertidos são guardados em um snapshot, identificado
+        pelo hash do conteúdo de cada arquivo (o hash só é recalculado se o mtime ou o
+        tamanho mudarem); nas execuções seguintes, apenas os arquivos com conteúdo novo
+        são lidos, mesmo que tenham sido copiados para outra pasta. Um mesmo snapshot
+        pode ser compartilhado por várias pastas.
+
+        Args:
+            max_workers (int, opcional): Número máximo de leitores simultâneos.
+                                         Se não fornecido, usa o padrão do executor.
+            usar_processos (bool): Se True, lê os arquivos em um pool de processos
+                                   em vez de um pool de threads.
+            usar_cache (bool): Se True, usa e atualiza o snapshot de dados convertidos.
+            caminho_cache (str, opcional): Caminho do snapshot. Se não fornecido, usa
+                                           ARQUIVO_CACHE dentro da pasta de arquivos.
+
+        Returns:
+            bool: True se os dados foram inicializados, False se as BOMs contiverem um ciclo.
+        """
+        arquivo_estoque = localizar_arquivo(self.pasta_arquivos, "Estoque", self.formato_entrada)
+        arquivos_bom = listar_arquivos_bom(self.pasta_arquivos, self.formato_entrada)
+        caminhos = {arquivo: os.path.abspath(os.path.join(self.pasta_arquivos, arquivo))
+                    for arquivo in [arquivo_estoque] + list(arquivos_bom.values())}
+
+        if caminho_cache is None:
+            caminho_cache = os.path.join(self.pasta_arquivos, ARQUIVO_CACHE)
+        arquivos_snapshot, conteudos = _ler_snapshot(caminho_cache) if usar_cache else ({}, {})
+
+        # Separa os arquivos cujo conteúdo já está no snapshot dos que precisam ser lidos
+        assinaturas = {}
+        dados = {}
+        pendentes = []
+        for arquivo, caminho_arquivo in caminhos.items():
+            if usar_cache:
+                assinatura = _assinatura_arquivo(caminho_arquivo, arquivos_snapshot.get(caminho_arquivo))
+                assinatura['tipo'] = 'estoque' if arquivo == arquivo_estoque else 'bom'
+                assinaturas[caminho_arquivo] = assinatura
+                if _chave_conteudo(assinatura) in conteudos:
+                    dados[caminho_arquivo] = conteudos[_chave_conteudo(assinatura)]
+                    continue
+            pendentes.append(caminho_arquivo)
+
+        if pendentes:
+            executor_cls = ProcessPoolExecutor if usar_processos else ThreadPoolExecutor
+            with executor_cls(max_workers=max_workers) as executor:
+                for caminho_arquivo, df in zip(pendentes, executor.map(ler_tabela, pendentes)):
+                    if caminho_arquivo == caminhos[arquivo_estoque]:
+                        dados[caminho_arquivo] = EstoqueColunar.de_dataframe(df)
+                    else:
+                        dados[caminho_arquivo] = _bom_de_dataframe(df)
+                    if usar_cache:
+                        conteudos[_chave_conteudo(assinaturas[caminho_arquivo])] = dados[caminho_arquivo]
+
+        if usar_cache and any(arquivos_snapshot.get(caminho_arquivo) != assinatura
+                              for caminho_arquivo, assinatura in assinaturas.items()):
+            # Mantém as entradas das outras pastas que compartilham o snapshot (enquanto os
+            # arquivos existirem) e apenas os conteúdos usados por alguma delas
+            arquivos_snapshot = {caminho_arquivo: assinatura for caminho_arquivo, assinatura
+                                 in arquivos_snapshot.items() if os.path.exists(caminho_arquivo)}
+            arquivos_snapshot.update(assinaturas)
+            usados = {_chave_conteudo(assinatura) for assinatura in arquivos_snapshot.values()}
+            _gravar_snapshot(caminho_cache, arquivos_snapshot,
+                             {chave: conteudo for chave, conteudo in conteudos.items() if chave in usados})
+
+        # Carrega as BOMs (na ordem dos arquivos) e o estoque
+        for codigo_produto, arquivo in arquivos_bom.items():
+            self.boms[internar_codigo(codigo_produto)] = dados[caminhos[arquivo]]
+        self._incorporar_estoque(dados[caminhos[arquivo_estoque]])
+        self._reconstruir_indices_bom()
+
+        # Calcula os códigos de nível uma única vez, detectando ciclos nas BOMs
+        try:
+            self.calcular_codigos_nivel()
+        except ValueError as e:
+            print(f"Erro: {str(e)}")
+            return False
+
         self.estado = "Inicializado"
+        return True
 
     def calcular_quantidades_producao_aquisicao(self, demanda):
         """
         Calcula as quantidades de produção e aquisição para atender à demanda.
+
+        A explosão das BOMs é feita em todos os níveis, na ordem dos códigos de nível:
+        cada material é calculado uma única vez, depois de acumuladas as necessidades
+        de todos os materiais que o utilizam. Materiais com BOM (e os produtos finais
+        demandados) são produzidos; os demais são adquiridos.
+
+        Os cálculos são vetorizados sobre a matriz esparsa das BOMs: em cada nível, as
+        necessidades brutas dos componentes são o produto da matriz pelo vetor de
+        produção líquida do nível.
         """
+        matriz = self.compilar_matriz_bom()
+
         quantidades = {}
         self.ordens_planejamento = {}
 
-        # 1. Calcular a quantidade a produzir para os produtos finais
-        for produto, quantidade_demanda in demanda.items():
-            # Inicializa as entradas para o produto
-            if produto not in quantidades:
-                quantidades[produto] = {'quantidade_a_produzir': 0, 'quantidade_a_adquirir': 0}
-            if produto not in self.ordens_planejamento:
-                self.ordens_planejamento[produto] = {'Produção': 0, 'Aquisição': 0}
-
-            # Calcula a quantidade a produzir do produto final
-            estoque_atual = self.estoque.get(produto, {'em_estoque': 0})['em_estoque']
-            estoque_minimo = self.estoque.get(produto, {'minimo': 0})['minimo']
-            quantidade_necessaria = max(0, quantidade_demanda + estoque_minimo - estoque_atual)
-            quantidades[produto]['quantidade_a_produzir'] = quantidade_necessaria
-            self.ordens_planejamento[produto]['Produção'] = quantidade_necessaria
-
-        # 2. Calcular a quantidade a adquirir para os componentes
-        componentes_necessarios = {}  # Dicionário para acumular as necessidades dos componentes
+        # Vetor de demanda independente (produtos que não aparecem em nenhuma BOM ficam à parte)
+        demanda_matriz = {produto: qtd for produto, qtd in demanda.items() if produto in matriz.indice}
+        posicoes = np.array([matriz.indice[produto] for produto in demanda_matriz], dtype=np.int64)
+        valores_demanda = np.array(list(demanda_matriz.values()))
+
+        dtype = np.result_type(valores_demanda.dtype if len(valores_demanda) else np.int64,
+                               matriz.quantidades_dtype)
+        necessidades = np.zeros(len(matriz), dtype=dtype)
+        np.add.at(necessidades, posicoes, valores_demanda.astype(dtype))
+        alcancados = np.zeros(len(matriz), dtype=bool)
+        alcancados[posicoes] = True
+        producao, aquisicao, alcancados = self._explodir_niveis(matriz, necessidades, alcancados)
 
+        # Produtos demandados fora das BOMs: apenas produção, sem explosão
         for produto, quantidade_demanda in demanda.items():
-            if produto in self.boms:
-                bom = self.boms[produto]
-                # Calcula a quantidade necessária para o produto
-                estoque_atual_produto = self.estoque.get(produto, {'em_estoque': 0})['em_estoque']
-                estoque_minimo_produto = self.estoque.get(produto, {'minimo': 0})['minimo']
-                quantidade_necessaria = max(0, quantidade_demanda + estoque_minimo_produto - estoque_atual_produto)
-
-                for componente, quantidade_por_produto in bom.items():
-                    # Calcula a necessidade total do componente
-                    necessidade_componente = quantidade_necessaria * quantidade_por_produto
-
-                    # Acumula as necessidades dos componentes
-                    if componente not in componentes_necessarios:
-                        componentes_necessarios[componente] = 0
-                    componentes_necessarios[componente] += necessidade_componente
-
-        # Calcula a quantidade a adquirir para cada componente, considerando o estoque
-        for componente, necessidade_total in componentes_necessarios.items():
-            # Inicializa o componente no dicionário quantidades, se necessário
-            if componente not in quantidades:
-                quantidades[componente] = {'quantidade_a_produzir': 0, 'quantidade_a_adquirir': 0}
-            if componente not in self.ordens_planejamento:
-                self.ordens_planejamento[componente] = {'Produção': 0, 'Aquisição': 0}
-
-            # Calcula a quantidade a adquirir (CORREÇÃO AQUI)
-            estoque_componente = self.estoque.get(componente, {'em_estoque': 0})['em_estoque']
-            estoque_minimo_componente = self.estoque.get(componente, {'minimo': 0})['minimo']
-            quantidade_a_adquirir = max(0, necessidade_total + estoque_minimo_componente - estoque_componente)
-
-            # Define a quantidade a adquirir
-            quantidades[componente]['quantidade_a_adquirir'] = quantidade_a_adquirir
-            self.ordens_planejamento[componente]['Aquisição'] = quantidade_a_adquirir
+            if produto not in matriz.indice:
+                estoque_atual = self.estoque.get(produto, {'em_estoque': 0})['em_estoque']
+                estoque_minimo = self.estoque.get(produto, {'minimo': 0})['minimo']
+                quantidade_necessaria = max(0, quantidade_demanda + estoque_minimo - estoque_atual)
+                quantidades[produto] = {'quantidade_a_produzir': quantidade_necessaria, 'quantidade_a_adquirir': 0}
+                self.ordens_planejamento[produto] = OrdemPlanejada(producao=quantidade_necessaria, aquisicao=0)
+
+        # Monta os dicionários de saída: produtos demandados primeiro, depois os demais por nível
+        indices = [matriz.indice[produto] for produto in demanda_matriz]
+        indices += [i for i in np.flatnonzero(alcancados).tolist() if matriz.materiais[i] not in demanda_matriz]
+        producao_lista = producao.tolist()
+        aquisicao_lista = aquisicao.tolist()
+        for i in indices:
+            material = matriz.materiais[i]
+            quantidades[material] = {'quantidade_a_produzir': producao_lista[i],
+                                     'quantidade_a_adquirir': aquisicao_lista[i]}
+            self.ordens_planejamento[material] = OrdemPlanejada(producao=producao_lista[i], aquisicao=aquisicao_lista[i])
 
         return quantidades, self.ordens_planejamento
 
+    def _explodir_niveis(self, matriz, necessidades, alcancados):
+        """
+        Calcula as quantidades líquidas de produção e aquisição, nível a nível.
+
+        Args:
+            matriz (MatrizBOM): BOMs compiladas.
+            necessidades (ndarray): Demanda independente por material, com forma (n,)
+                                    ou (k, n) para k cenários.
+            alcancados (ndarray): Máscara dos materiais demandados, com a mesma forma.
+
+        Returns:
+            tuple: Arrays (producao, aquisicao, alcancados), com a forma de necessidades.
+        """
+        linhas_estoque = self.estoque.linhas(matriz.materiais)
+        em_estoque = self.estoque.valores('em_estoque', linhas_estoque)
+        minimo = self.estoque.valores('minimo', linhas_estoque)
+
+        dtype = np.result_type(necessidades.dtype, matriz.quantidades_dtype, em_estoque.dtype, minimo.dtype)
+        necessidades = necessidades.astype(dtype)
+        alcancados = alcancados.copy()
+        # Materiais com BOM e produtos demandados são produzidos; os demais são adquiridos
+        produzidos = matriz.tem_bom | alcancados
+
+        producao = np.zeros(necessidades.shape, dtype=dtype)
+        aquisicao = np.zeros(necessidades.shape, dtype=dtype)
+        for nivel in range(matriz.num_niveis):
+            faixa = matriz.faixa_nivel(nivel)
+            # Quantidade líquida do nível, considerando o estoque atual e o mínimo
+            # (apenas para os materiais alcançados pela demanda)
+            liquido = np.maximum(0, necessidades[..., faixa] + minimo[faixa] - em_estoque[faixa])
+            liquido = np.where(alcancados[..., faixa], liquido, 0)
+            producao[..., faixa] = np.where(produzidos[..., faixa], liquido, 0)
+            aquisicao[..., faixa] = np.where(produzidos[..., faixa], 0, liquido)
+            # Explode a produção do nível para os componentes dos níveis de baixo
+            necessidades += matriz.multiplicar(producao, nivel)
+            alcancados |= matriz.alcancaveis(alcancados, nivel)
+
+        return producao, aquisicao, alcancados
+
+    def planejar_cenarios(self, demandas, produtos=None):
+        """
+        Avalia vários cenários de demanda de uma só vez, sem alterar o estado do MRP.
+
+        Cada cenário é calculado como em planejar_producao (quantidades, custos e
+        lead times esperados), mas todos os cenários são explodidos juntos, nível a
+        nível, sobre a matriz esparsa das BOMs.
+
+        Args:
+            demandas (DataFrame | array): Matriz cenários × produtos com as quantidades
+                                          demandadas. Em um DataFrame, as colunas são os
+                                          produtos e o índice identifica os cenários.
+            produtos (list, opcional): Produtos de cada coluna, se demandas não for um DataFrame.
+
+        Returns:
+            dict: Resultado dos cenários, com as chaves:
+                'cenarios' (list): Identificação de cada cenário (linha).
+                'materiais' (list): Material de cada coluna dos arrays.
+                'producao', 'aquisicao' (ndarray): Quantidades (cenários × materiais).
+                'custo', 'leadtime' (ndarray): Custo e lead time esperados (cenários × materiais).
+                'custo_total', 'leadtime_total' (ndarray): Custo total e maior lead time por cenário.
+            Retorna None se os dados não foram inicializados ou a demanda for inválida.
+        """
+        if not hasattr(self, 'estado'):
+            print("Erro: Os dados ainda não foram inicializados.")
+            return None
+
+        cenarios = None
+        if isinstance(demandas, pd.DataFrame):
+            cenarios = demandas.index.tolist()
+            produtos = demandas.columns.tolist()
+            demandas = demandas.apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy()
+        demandas = np.atleast_2d(np.asarray(demandas))
+        if produtos is None or len(produtos) != demandas.shape[1]:
+            print("Erro: Informe um produto para cada coluna da matriz de demandas.")
+            return None
+        if cenarios is None:
+            cenarios = list(range(demandas.shape[0]))
+
+        matriz = self.compilar_matriz_bom()
+        # Produtos demandados fora das BOMs ganham colunas próprias, após os materiais das BOMs
+        extras = [produto for produto in dict.fromkeys(produtos) if produto not in matriz.indice]
+        materiais = matriz.materiais + extras
+        n = len(matriz)
+
+        # Demanda independente de cada cenário, por material (colunas repetidas são somadas)
+        indice_extras = {produto: n + i for i, produto in enumerate(extras)}
+        colunas = np.array([matriz.indice[p] if p in matriz.indice else indice_extras[p] for p in produtos],
+                           dtype=np.int64)
+        necessidades = np.zeros((demandas.shape[0], len(materiais)), dtype=demandas.dtype)
+        np.add.at(necessidades, (slice(None), colunas), demandas)
+        alcancados = np.zeros(necessidades.shape, dtype=bool)
+        alcancados[:, colunas] = True
+
+        producao, aquisicao, _ = self._explodir_niveis(matriz, necessidades[:, :n], alcancados[:, :n])
+
+        # Produtos fora das BOMs: apenas produção, sem explosão
+        linhas_extras = self.estoque.linhas(extras)
+        liquido_extras = np.maximum(0, necessidades[:, n:] + self.estoque.valores('minimo', linhas_extras)
+                                    - self.estoque.valores('em_estoque', linhas_extras))
+        producao = np.hstack([producao, liquido_extras.astype(producao.dtype)])
+        aquisicao = np.hstack([aquisicao, np.zeros_like(liquido_extras, dtype=aquisicao.dtype)])
+
+        # Custos e lead times esperados (mesmas regras de calcular_fc_lt_esperados)
+        linhas = self.estoque.linhas(materiais)
+        custo_unitario = self.estoque.valores('custo_medio_unitario', linhas) \
+            + self.estoque.valores('imposto_medio_unitario', linhas)
+        frete_lote = self.estoque.valores('frete_medio_lote', linhas)
+        leadtime = self.estoque.valores('leadtime_medio_lote', linhas)
+        # Lead time acumulado (caminho crítico) de cada material, memorizado no rollup
+        leadtime_acumulado = np.array([self.rollup.leadtime_acumulado(material) for material in materiais])
+
+        custo = (producao + aquisicao) * custo_unitario + np.where(aquisicao > 0, frete_lote, 0)
+        leadtimes = np.where(producao > 0, leadtime_acumulado, np.where(aquisicao > 0, leadtime, 0))
+
+        return {
+            'cenarios': cenarios,
+            'materiais': materiais,
+            'producao': producao,
+            'aquisicao': aquisicao,
+            'custo': custo,
+            'leadtime': leadtimes,
+            'custo_total': custo.sum(axis=1),
+            'leadtime_total': leadtimes.max(axis=1, initial=0),
+        }
+
+    def planejar_producao_periodos(self, demanda, dias_por_periodo=7, data_inicio=None):
+        """
+        Realiza o MRP por períodos (time-phased): necessidades brutas, estoque projetado,
+        necessidades líquidas e liberações de ordens planejadas em cada período.
+
+        Os materiais são calculados nível a nível, na ordem dos códigos de nível. Em cada
+        nível, o balanço de estoque percorre os períodos para todos os materiais do nível
+        de uma só vez (arrays material × período). As ordens são lote a lote: o
+        recebimento planejado de um período é a sua necessidade líquida, liberado
+        ceil(leadtime / dias_por_periodo) períodos antes. Liberações que cairiam antes do
+        primeiro período ficam no primeiro (ordens atrasadas). As liberações dos materiais
+        produzidos geram as necessidades brutas dos seus componentes nos mesmos períodos.
+
+        Args:
+            demanda (dict | DataFrame): Demanda por período de cada produto. Em um dicionário,
+                                        produto -> lista de quantidades (uma por período); em
+                                        um DataFrame, os produtos no índice e os períodos nas colunas.
+            dias_por_periodo (int): Duração de cada período, em dias.
+            data_inicio (datetime, opcional): Início do primeiro período. Se não fornecida, usa a data atual.
+
+        Returns:
+            dict: Plano por períodos, com as chaves:
+                'materiais' (list): Material de cada linha dos arrays.
+                'periodos' (list): Data de início de cada período ('YYYY-MM-DD').
+                'produzidos' (ndarray): Máscara dos materiais produzidos (os demais são adquiridos).
+                'necessidade_bruta', 'estoque_projetado', 'necessidade_liquida',
+                'recebimentos_planejados', 'liberacoes_planejadas' (ndarray): Arrays material × período.
+            Retorna None se os dados não foram inicializados.
+        """
+        if not hasattr(self, 'estado'):
+            print("Erro: Os dados ainda não foram inicializados.")
+            return None
+        if data_inicio is None:
+            data_inicio = datetime.now()
+
+        if isinstance(demanda, pd.DataFrame):
+            demanda = {produto: linha.to_numpy() for produto, linha in
+                       demanda.apply(pd.to_numeric, errors='coerce').fillna(0).iterrows()}
+        demanda = {produto: np.asarray(serie) for produto, serie in demanda.items()}
+        num_periodos = max((len(serie) for serie in demanda.values()), default=0)
+
+        matriz = self.compilar_matriz_bom()
+        # Produtos demandados fora das BOMs ganham linhas próprias, após os materiais das BOMs
+        extras = [produto for produto in demanda if produto not in matriz.indice]
+        materiais = matriz.materiais + extras
+        indice = {material: i for i, material in enumerate(materiais)}
+        n = len(matriz)
+
+        linhas_estoque = self.estoque.linhas(materiais)
+        em_estoque = self.estoque.valores('em_estoque', linhas_estoque)
+        minimo = self.estoque.valores('minimo', linhas_estoque)
+        leadtime = self.estoque.valores('leadtime_medio_lote', linhas_estoque)
+        defasagem = np.ceil(np.nan_to_num(leadtime) / dias_por_periodo).astype(np.int64)
+
+        dtype = np.result_type(*(serie.dtype for serie in demanda.values()), matriz.quantidades_dtype,
+                               em_estoque.dtype, minimo.dtype)
+        bruta = np.zeros((len(materiais), num_periodos), dtype=dtype)
+        for produto, serie in demanda.items():
+            bruta[indice[produto], :len(serie)] += serie
+        alcancados = np.zeros(len(materiais), dtype=bool)
+        alcancados[[indice[produto] for produto in demanda]] = True
+        produzidos = np.r_[matriz.tem_bom, np.ones(len(extras), dtype=bool)] | alcancados
+
+        estoque_projetado = np.zeros_like(bruta)
+        recebimentos = np.zeros_like(bruta)
+        liberacoes = np.zeros_like(bruta)
+        periodos = np.arange(num_periodos)
+
+        def liquidar(linhas):
+            # Balanço de estoque período a período, vetorizado sobre os materiais informados
+            disponivel = em_estoque[linhas].astype(dtype)
+            ativos = alcancados[linhas]
+            for t in periodos:
+                liquido = np.maximum(0, bruta[linhas, t] + minimo[linhas] - disponivel)
+                liquido = np.where(ativos, liquido, 0)
+                recebimentos[linhas, t] = liquido
+                disponivel = disponivel + liquido - bruta[linhas, t]
+                estoque_projetado[linhas, t] = disponivel
+            # Defasagem pelo lead time, limitada ao primeiro período
+            liberacao = np.maximum(periodos[np.newaxis, :] - defasagem[linhas, np.newaxis], 0)
+            np.add.at(liberacoes, (linhas[:, np.newaxis], liberacao), recebimentos[linhas])
+
+        for nivel in range(matriz.num_niveis):
+            faixa = matriz.faixa_nivel(nivel)
+            liquidar(np.arange(faixa.start, faixa.stop))
+            # Liberações do nível viram necessidades brutas dos componentes, período a período
+            bruta[:n] += matriz.multiplicar(liberacoes[:n].T, nivel).T
+            alcancados[:n] |= matriz.alcancaveis(alcancados[:n], nivel)
+        liquidar(np.arange(n, len(materiais)))
+
+        return {
+            'materiais': materiais,
+            'periodos': [(data_inicio + timedelta(days=int(t) * dias_por_periodo)).strftime('%Y-%m-%d')
+                         for t in periodos],
+            'produzidos': produzidos,
+            'necessidade_bruta': bruta,
+            'estoque_projetado': estoque_projetado,
+            'necessidade_liquida': recebimentos.copy(),
+            'recebimentos_planejados': recebimentos,
+            'liberacoes_planejadas': liberacoes,
+        }
 
     def calcular_fc_lt_esperados(self):
         """
@@ -145,47 +657,120 @@ class MRP:
         self.fc_lt_esperados = {}  # Inicializa o dicionário aqui
 
         for material, ordens in self.ordens_planejamento.items():  # Usar self.ordens_planejamento
-            self.fc_lt_esperados[material] = {}
-
-            # Lógica para Produtos (Produção)
-            if 'Produção' in ordens and ordens['Produção'] > 0:
-                # Aqui você precisará implementar a lógica para calcular o lead time do produto final.
-                # Conforme a descrição, é o maior lead-time entre seus componentes a adquirir somado ao seu próprio lead-time de produção.
-                # Por enquanto, vamos usar um valor padrão para o lead time do produto.
-                # Encontrar o maior lead time dos componentes
-                maior_leadtime_componente = 0
-                if material in self.boms:
-                    for componente in self.boms[material]:
-                        leadtime_componente = self.estoque.get(componente, {'leadtime_medio_lote': 0})[
-                            'leadtime_medio_lote']
-                        maior_leadtime_componente = max(maior_leadtime_componente, leadtime_componente)
-                # Somar o lead time do produto
-                leadtime_produto = self.estoque.get(material, {'leadtime_medio_lote': 0})['leadtime_medio_lote']
-                self.fc_lt_esperados[material]['Leadtime'] = leadtime_produto + maior_leadtime_componente
-
-                # Calcular o custo total de produção
-                custo_unitario = self.estoque.get(material, {'custo_medio_unitario': 0})['custo_medio_unitario']
-                imposto_unitario = self.estoque.get(material, {'imposto_medio_unitario': 0})['imposto_medio_unitario']
-                # Frete não se aplica à produção, então não o incluímos.
-                self.fc_lt_esperados[material]['Custo'] = ordens['Produção'] * (
-                            custo_unitario + imposto_unitario)
-
-            # Lógica para Componentes (Aquisição)
-            if 'Aquisição' in ordens and ordens['Aquisição'] > 0:
-                # Lead time do componente é copiado do dicionário de estoque
-                self.fc_lt_esperados[material]['Leadtime'] = self.estoque.get(material,
-                                                                              {'leadtime_medio_lote': 0})[
-                    'leadtime_medio_lote']
-
-                # Calcular o custo total de aquisição
-                custo_unitario = self.estoque.get(material, {'custo_medio_unitario': 0})['custo_medio_unitario']
-                imposto_unitario = self.estoque.get(material, {'imposto_medio_unitario': 0})['imposto_medio_unitario']
-                frete_lote = self.estoque.get(material, {'frete_medio_lote': 0})['frete_medio_lote']
-                self.fc_lt_esperados[material]['Custo'] = ordens['Aquisição'] * (
-                            custo_unitario + imposto_unitario) + frete_lote
+            self.fc_lt_esperados[material] = self._calcular_fc_lt_material(material, ordens)
 
         return self.fc_lt_esperados
 
+    def _calcular_fc_lt_material(self, material, ordens):
+        """
+        Calcula o custo e o lead time esperados das ordens de um material.
+
+        Args:
+            material (str): Código do material.
+            ordens (dict): Ordens do material ({'Produção': x, 'Aquisição': y}).
+
+        Returns:
+            CustoLeadtime: {'Leadtime': ..., 'Custo': ...} (vazio se não houver ordens).
+        """
+        fc_lt = CustoLeadtime()
+
+        # Lógica para Produtos (Produção)
+        if 'Produção' in ordens and ordens['Produção'] > 0:
+            # Lead time do produto: seu próprio lead time de produção somado ao maior lead time
+            # acumulado entre seus componentes (caminho crítico por todos os níveis da BOM),
+            # memorizado no rollup
+            fc_lt.leadtime = self.rollup.leadtime_acumulado(material)
+
+            # Calcular o custo total de produção
+            custo_unitario = self.estoque.get(material, {'custo_medio_unitario': 0})['custo_medio_unitario']
+            imposto_unitario = self.estoque.get(material, {'imposto_medio_unitario': 0})['imposto_medio_unitario']
+            # Frete não se aplica à produção, então não o incluímos.
+            fc_lt.custo = ordens['Produção'] * (custo_unitario + imposto_unitario)
+
+        # Lógica para Componentes (Aquisição)
+        if 'Aquisição' in ordens and ordens['Aquisição'] > 0:
+            # Lead time do componente é copiado do dicionário de estoque
+            fc_lt.leadtime = self.estoque.get(material, {'leadtime_medio_lote': 0})['leadtime_medio_lote']
+
+            # Calcular o custo total de aquisição
+            custo_unitario = self.estoque.get(material, {'custo_medio_unitario': 0})['custo_medio_unitario']
+            imposto_unitario = self.estoque.get(material, {'imposto_medio_unitario': 0})['imposto_medio_unitario']
+            frete_lote = self.estoque.get(material, {'frete_medio_lote': 0})['frete_medio_lote']
+            fc_lt.custo = ordens['Aquisição'] * (custo_unitario + imposto_unitario) + frete_lote
+
+        return fc_lt
+
+    def simular_monte_carlo(self, num_amostras=100000, semente=None, incertezas=None, cv_custo=CV_CUSTO_PADRAO,
+                            cv_leadtime=CV_LEADTIME_PADRAO, percentis=(50, 90, 99), max_workers=None,
+                            usar_processos=True, tamanho_bloco=10000):
+        """
+        Simula a incerteza de custos e lead times do plano (método de Monte Carlo).
+
+        Em cada sorteio, o custo unitário (com imposto) e o lead time de cada material são
+        sorteados de distribuições log-normais com a média do estoque e o coeficiente de
+        variação do material; o custo total e o lead time total do plano são calculados
+        como em calcular_fc_lt_esperados (lead time dos produtos pelo caminho crítico das
+        BOMs). Os sorteios são vetorizados e divididos em blocos simulados em paralelo.
+
+        Args:
+            num_amostras (int): Número de sorteios.
+            semente (int, opcional): Semente dos sorteios; a mesma semente reproduz os resultados.
+            incertezas (dict, opcional): Coeficientes de variação por material, por exemplo
+                                         {"JOKER": {"custo": 0.05, "leadtime": 0.5}}.
+            cv_custo (float): Coeficiente de variação dos custos dos demais materiais.
+            cv_leadtime (float): Coeficiente de variação dos lead times dos demais materiais.
+            percentis (tuple): Percentis calculados.
+            max_workers (int, opcional): Número máximo de blocos simulados ao mesmo tempo.
+            usar_processos (bool): Se True, simula em um pool de processos em vez de threads.
+            tamanho_bloco (int): Número de sorteios de cada bloco.
+
+        Returns:
+            dict: Resultado da simulação, com as chaves:
+                'custo_total' (dict): Custo total do plano por percentil.
+                'leadtime_total' (dict): Lead time total (dias) por percentil.
+                'data_conclusao' (dict): Data de conclusão do plano (YYYY-MM-DD) por percentil.
+                'num_amostras' (int): Número de sorteios.
+            Retorna None se o planejamento não foi realizado ou se o número de sorteios ou o
+            tamanho dos blocos não for positivo.
+        """
+        if not getattr(self, 'ordens_planejamento', None):
+            print("Erro: O planejamento ainda não foi realizado.")
+            return None
+        if num_amostras <= 0 or tamanho_bloco <= 0:
+            print("Erro: O número de sorteios e o tamanho dos blocos devem ser positivos.")
+            return None
+
+        matriz = self.compilar_matriz_bom()
+        extras = [material for material in self.ordens_planejamento if material not in matriz.indice]
+        materiais = matriz.materiais + extras
+        linhas = self.estoque.linhas(materiais)
+        ordens = [self.ordens_planejamento.get(material, {}) for material in materiais]
+
+        incertezas = incertezas or {}
+        modelo = montar_modelo(
+            matriz, materiais,
+            producao=[ordem.get('Produção', 0) for ordem in ordens],
+            aquisicao=[ordem.get('Aquisição', 0) for ordem in ordens],
+            custo_unitario=self.estoque.valores('custo_medio_unitario', linhas)
+            + self.estoque.valores('imposto_medio_unitario', linhas),
+            frete_lote=self.estoque.valores('frete_medio_lote', linhas),
+            leadtime=self.estoque.valores('leadtime_medio_lote', linhas),
+            cv_custo=[incertezas.get(material, {}).get('custo', cv_custo) for material in materiais],
+            cv_leadtime=[incertezas.get(material, {}).get('leadtime', cv_leadtime) for material in materiais],
+        )
+        custos, leadtimes = simular(modelo, num_amostras, semente, tamanho_bloco, max_workers, usar_processos)
+
+        inicio = getattr(self, 'data_execucao', None) or datetime.now()
+        percentis = list(percentis)
+        custos_percentis = np.percentile(custos, percentis)
+        leadtimes_percentis = np.percentile(leadtimes, percentis)
+        return {
+            'custo_total': dict(zip(percentis, custos_percentis.tolist())),
+            'leadtime_total': dict(zip(percentis, leadtimes_percentis.tolist())),
+            'data_conclusao': {percentil: (inicio + timedelta(days=leadtime)).strftime('%Y-%m-%d')
+                               for percentil, leadtime in zip(percentis, leadtimes_percentis.tolist())},
+            'num_amostras': num_amostras,
+        }
 
     def montar_quadro_planejamento(self, data_execucao=None):
         """
@@ -196,61 +781,130 @@ class MRP:
                                                Se não fornecida, usa a data atual.
 
         Returns:
-            dict: Dicionário representando o quadro de planejamento.
+            QuadroPlanejamento: Quadro de planejamento (material -> {"Estoque Atual": ...,
+                                'YYYY-MM-DD': quantidade}).
         """
         if data_execucao is None:
             data_execucao = datetime.now()
+        # Guardada para que os replanejamentos incrementais usem a mesma referência
+        self.data_execucao = data_execucao
+
+        # Calcula todas as datas de entrega de uma vez, como dias ordinais
+        materiais = list(self.ordens_planejamento)
+        estoque = self.estoque.valores('em_estoque', self.estoque.linhas(materiais))
+        self.planejamento._garantir_materiais(materiais, dict(zip(materiais, estoque.tolist())))
+
+        entregas_materiais, entregas_dias, entregas_quantidades = [], [], []
+        for chave in ('Produção', 'Aquisição'):  # Aquisição prevalece se cair no mesmo dia
+            for material, ordens in self.ordens_planejamento.items():
+                if chave in ordens and ordens[chave] > 0:
+                    entregas_materiais.append(material)
+                    entregas_dias.append(self.fc_lt_esperados[material]['Leadtime'])
+                    entregas_quantidades.append(ordens[chave])
+        self.planejamento.lancar(entregas_materiais, self._dias_entrega(entregas_dias), entregas_quantidades)
 
-        for material, ordens in self.ordens_planejamento.items():
-            if material not in self.planejamento:
-                self.planejamento[material] = {"Estoque Atual": self.estoque.get(material, {'em_estoque': 0})['em_estoque']}
-            if 'Produção' in ordens and ordens['Produção'] > 0:
-                leadtime = self.fc_lt_esperados[material]['Leadtime']
-                data_entrega = data_execucao + timedelta(days=leadtime)
-                self.planejamento[material][data_entrega.strftime('%Y-%m-%d')] = ordens['Produção']
-            if 'Aquisição' in ordens and ordens['Aquisição'] > 0:
-                leadtime = self.fc_lt_esperados[material]['Leadtime']
-                data_entrega = data_execucao + timedelta(days=leadtime)
-                self.planejamento[material][data_entrega.strftime('%Y-%m-%d')] = ordens['Aquisição']
         self.estado = "Planejado"
         return self.planejamento
 
+    def _dias_entrega(self, leadtimes):
+        """
+        Converte lead times em dias ordinais de entrega, a partir da data de execução.
+        """
+        inicio = self.data_execucao
+        fracao_dia = (inicio.hour * 3600 + inicio.minute * 60 + inicio.second + inicio.microsecond / 1e6) / 86400 \
+            if isinstance(inicio, datetime) else 0.0
+        leadtimes = np.asarray(leadtimes, dtype=np.float64)
+        return inicio.toordinal() + np.floor(fracao_dia + leadtimes).astype(np.int64)
 
-    def imprimir_quadro_planejamento(self):
+    def _agendar_entregas(self, material, ordens):
         """
-        Imprime o quadro de planejamento de forma tabular no console.
+        Lança no quadro de planejamento as entregas das ordens de um material.
         """
-        from tabulate import tabulate
+        if material not in self.planejamento:
+            self.planejamento[material] = {"Estoque Atual": self.estoque.get(material, {'em_estoque': 0})['em_estoque']}
+        for chave in ('Produção', 'Aquisição'):
+            if chave in ordens and ordens[chave] > 0:
+                dia = self._dias_entrega([self.fc_lt_esperados[material]['Leadtime']])
+                self.planejamento.lancar([material], dia, [ordens[chave]])
+
+    def replanejar_incremental(self, materiais=None):
+        """
+        Replaneja apenas os materiais afetados por alterações de custo ou lead time.
 
-        tabela = []
-        cabecalho = ["Material", "Estoque Atual"]
-        datas_entrega = set()
+        As quantidades das ordens não dependem de custos e lead times, portanto apenas
+        os custos e lead times esperados (fc_lt_esperados) e as datas de entrega do
+        quadro de planejamento são recalculados. São afetados os materiais alterados e
+        os produtos que os usam, já que o lead time de um produto inclui o maior lead
+        time acumulado entre seus componentes.
 
-        # Coleta todas as datas de entrega únicas
-        for material, dados in self.planejamento.items():
-            for chave in dados.keys():
-                if chave != "Estoque Atual":
-                    datas_entrega.add(chave)
+        Args:
+            materiais (iterable, opcional): Materiais com custo ou lead time alterado. Se não
+                                            fornecido, usa os materiais marcados pela última
+                                            chamada de atualizar_custos_leadtimes.
 
-        # Adiciona as datas de entrega ao cabeçalho
-        cabecalho.extend(sorted(list(datas_entrega)))
+        Returns:
+            set: Materiais replanejados, ou None se o planejamento ainda não foi realizado.
+        """
+        if not self.planejamento or not hasattr(self, 'data_execucao'):
+            print("Erro: O planejamento ainda não foi realizado.")
+            return None
+        materiais = set(self.materiais_alterados if materiais is None else materiais)
+        self.rollup.invalidar(materiais)
+
+        # Materiais alterados e produtos que os usam, direta ou indiretamente (índice onde-usado)
+        afetados = set(materiais)
+        for material in materiais:
+            afetados.update(self.indice_onde_usado.ancestrais(material))
+
+        replanejados = set()
+        for material in afetados:
+            ordens = self.ordens_planejamento.get(material)
+            if not ordens:
+                continue
+            antigo = self.fc_lt_esperados.get(material, {})
+            novo = self._calcular_fc_lt_material(material, ordens)
+            self.fc_lt_esperados[material] = novo
+
+            # Move as entregas do material para a nova data, se o lead time mudou
+            if 'Leadtime' in antigo and antigo['Leadtime'] != novo.get('Leadtime') \
+                    and material in self.planejamento:
+                dia_antigo = int(self._dias_entrega([antigo['Leadtime']])[0])
+                self.planejamento.remover(material, dia_antigo)
+            self._agendar_entregas(material, ordens)
+            replanejados.add(material)
+
+        # Apenas os materiais processados deixam de estar pendentes
+        self.materiais_alterados -= materiais
+        return replanejados
+
+
+    def imprimir_quadro_planejamento(self, prefixo=None, colunas=None, pagina=None, tamanho_pagina=50):
+        """
+        Imprime o quadro de planejamento de forma tabular no console, em páginas.
 
-        # Popula a tabela com os dados
-        for material, dados in self.planejamento.items():
-            linha = [material, dados["Estoque Atual"]]
-            for data in sorted(list(datas_entrega)):
-                linha.append(dados.get(data, ""))  # Usa "" se a data não existir para o material
-            tabela.append(linha)
+        Args:
+            prefixo (str, opcional): Exibe apenas os materiais cujo código começa com o prefixo.
+            colunas (list, opcional): Colunas a exibir (por exemplo, ["Material", "2025-04-11"]).
+            pagina (int, opcional): Página a imprimir. Se não fornecida, imprime a tabela inteira.
+            tamanho_pagina (int): Número de materiais por página.
+        """
+        # As datas só são formatadas aqui, na saída; "" nos dias sem entrega
+        cabecalho = ["Material", "Estoque Atual"] + self.planejamento.datas()
+        materiais = None
+        if prefixo:
+            materiais = [material for material in self.planejamento if str(material).startswith(prefixo)]
 
-        # Imprime a tabela no console
-        print(tabulate(tabela, headers=cabecalho, tablefmt="grid"))
+        imprimir_tabela(cabecalho, self.planejamento.linhas(vazio="", materiais=materiais),
+                        colunas=colunas, pagina=pagina, tamanho_pagina=tamanho_pagina)
 
-    def exportar_quadro_planejamento(self, nome_arquivo):
+    def exportar_quadro_planejamento(self, nome_arquivo, streaming=False):
         """
         Exporta o quadro de planejamento para uma planilha Excel usando openpyxl.
 
         Args:
             nome_arquivo (str): Nome do arquivo Excel a ser criado.
+            streaming (bool): Se True, grava a planilha linha a linha (worksheet somente
+                              escrita e estilos nomeados), com memória constante por linha.
 
         Returns:
             str: Caminho completo do arquivo Excel criado.
@@ -259,6 +913,17 @@ class MRP:
             print("Erro: O quadro de planejamento ainda não foi gerado.")
             return None
 
+        if streaming:
+            cabecalhos = ["Material", "Estoque Atual"] + self.planejamento.datas()
+            linhas = self.planejamento.linhas(vazio=None)
+            caminho_arquivo = os.path.join(self.pasta_arquivos, nome_arquivo)
+            escrever_planilha(caminho_arquivo, "Planejamento", cabecalhos, linhas,
+                              estilos_colunas=['Normal'] * len(cabecalhos),
+                              estilo_cabecalho='mrp_cabecalho_simples',
+                              larguras=[20] + [15] * (len(cabecalhos) - 1), congelar='B2')
+            print(f"Quadro de planejamento exportado com sucesso para: {caminho_arquivo}")
+            return caminho_arquivo
+
         from openpyxl import Workbook
         from openpyxl.styles import Font, Alignment, Border, Side
 
@@ -267,33 +932,16 @@ class MRP:
         ws = wb.active
         ws.title = "Planejamento"
 
-        # Coletar todas as datas de entrega únicas
-        datas_entrega = set()
-        for material, dados in self.planejamento.items():
-            for chave in dados.keys():
-                if chave != "Estoque Atual":
-                    datas_entrega.add(chave)
-
-        # Ordenar as datas
-        datas_ordenadas = sorted(list(datas_entrega))
-
-        # Criar cabeçalhos
-        cabecalhos = ["Material", "Estoque Atual"] + datas_ordenadas
+        # Criar cabeçalhos (datas de entrega já ordenadas pelo quadro)
+        cabecalhos = ["Material", "Estoque Atual"] + self.planejamento.datas()
         for col_idx, header in enumerate(cabecalhos, 1):
             ws.cell(row=1, column=col_idx, value=header)
 
-        # Preencher os dados
-        row_idx = 2
-        for material, dados in self.planejamento.items():
-            ws.cell(row=row_idx, column=1, value=material)
-            ws.cell(row=row_idx, column=2, value=dados["Estoque Atual"])
-
-            # Preencher as datas para este material
-            for col_idx, data in enumerate(datas_ordenadas, 3):
-                if data in dados:
-                    ws.cell(row=row_idx, column=col_idx, value=dados[data])
-
-            row_idx += 1
+        # Preencher os dados (None deixa a célula vazia nos dias sem entrega)
+        for row_idx, linha in enumerate(self.planejamento.linhas(vazio=None), 2):
+            for col_idx, valor in enumerate(linha, 1):
+                if valor is not None:
+                    ws.cell(row=row_idx, column=col_idx, value=valor)
 
         # Aplicar formatação
         # Definir estilo para cabeçalhos
@@ -333,12 +981,14 @@ class MRP:
         print(f"Quadro de planejamento exportado com sucesso para: {caminho_arquivo}")
         return caminho_arquivo
 
-    def exportar_ordens_producao(self, nome_arquivo):
+    def exportar_ordens_producao(self, nome_arquivo, streaming=False):
         """
         Exporta as ordens de produção e aquisição para uma planilha Excel.
 
         Args:
             nome_arquivo (str): Nome do arquivo Excel a ser criado.
+            streaming (bool): Se True, grava a planilha linha a linha (worksheet somente
+                              escrita e estilos nomeados), com memória constante por linha.
 
         Returns:
             str: Caminho completo do arquivo Excel criado.
@@ -347,6 +997,17 @@ class MRP:
             print("Erro: As ordens de produção ainda não foram geradas.")
             return None
 
+        cabecalhos = ["Material", "Retirada de Estoque", "Produção", "Aquisição", "Custo Total Estimado",
+                      "Leadtime Total Estimado", "Custo Total Real", "Leadtime Total Real"]
+
+        if streaming:
+            caminho_arquivo = os.path.join(self.pasta_arquivos, nome_arquivo)
+            escrever_planilha(caminho_arquivo, "Ordens", cabecalhos, self._linhas_ordens_producao(),
+                              estilos_colunas=['mrp_texto'] + ['mrp_numero'] * (len(cabecalhos) - 1),
+                              larguras=[25] + [18] * (len(cabecalhos) - 1), congelar='B2')
+            print(f"Ordens de produção exportadas com sucesso para: {caminho_arquivo}")
+            return caminho_arquivo
+
         from openpyxl import Workbook
         from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
 
@@ -355,54 +1016,11 @@ class MRP:
         ws = wb.active
         ws.title = "Ordens"
 
-        # Definir cabeçalhos
-        cabecalhos = [
-            "Material",
-            "Retirada de Estoque",
-            "Produção",
-            "Aquisição",
-            "Custo Total Estimado",
-            "Leadtime Total Estimado",
-            "Custo Total Real",
-            "Leadtime Total Real"
-        ]
-
-        # Adicionar cabeçalhos
-        for col_idx, header in enumerate(cabecalhos, 1):
-            ws.cell(row=1, column=col_idx, value=header)
-
-        # Preencher os dados
-        row_idx = 2
-        for material, ordens in self.ordens_planejamento.items():
-            ws.cell(row=row_idx, column=1, value=material)
-
-            # Calcular a retirada de estoque (se houver)
-            estoque_atual = self.estoque.get(material, {'em_estoque': 0})['em_estoque']
-
-            # Produção (apenas para produtos finais)
-            producao = ordens.get('Produção', 0)
-            ws.cell(row=row_idx, column=3, value=producao if producao > 0 else "")
-
-            # Aquisição (apenas para componentes)
-            aquisicao = ordens.get('Aquisição', 0)
-            ws.cell(row=row_idx, column=4, value=aquisicao if aquisicao > 0 else "")
-
-            # Retirada de estoque
-            retirada_estoque = min(estoque_atual, producao + aquisicao)
-            ws.cell(row=row_idx, column=2, value=retirada_estoque if retirada_estoque > 0 else "")
-
-            # Custo e Leadtime estimados
-            if material in self.fc_lt_esperados:
-                custo = self.fc_lt_esperados[material].get('Custo', 0)
-                leadtime = self.fc_lt_esperados[material].get('Leadtime', 0)
-                ws.cell(row=row_idx, column=5, value=custo)
-                ws.cell(row=row_idx, column=6, value=leadtime)
-
-            # Custo e Leadtime reais (inicialmente vazios)
-            ws.cell(row=row_idx, column=7, value="")
-            ws.cell(row=row_idx, column=8, value="")
-
-            row_idx += 1
+        # Adicionar cabeçalhos e dados (as mesmas linhas da gravação em streaming)
+        ws.append(cabecalhos)
+        for linha in self._linhas_ordens_producao():
+            ws.append(linha)
+        row_idx = ws.max_row + 1
 
         # Aplicar formatação
         # Definir estilos
@@ -452,6 +1070,25 @@ class MRP:
         print(f"Ordens de produção exportadas com sucesso para: {caminho_arquivo}")
         return caminho_arquivo
 
+    def _linhas_ordens_producao(self):
+        """
+        Gera as linhas da planilha de ordens (mesmas colunas de exportar_ordens_producao).
+        """
+        for material, ordens in self.ordens_planejamento.items():
+            estoque_atual = self.estoque.get(material, {'em_estoque': 0})['em_estoque']
+            producao = ordens.get('Produção', 0)
+            aquisicao = ordens.get('Aquisição', 0)
+            retirada_estoque = min(estoque_atual, producao + aquisicao)
+            custo = leadtime = ""
+            if material in self.fc_lt_esperados:
+                custo = self.fc_lt_esperados[material].get('Custo', 0)
+                leadtime = self.fc_lt_esperados[material].get('Leadtime', 0)
+            yield (material,
+                   retirada_estoque if retirada_estoque > 0 else "",
+                   producao if producao > 0 else "",
+                   aquisicao if aquisicao > 0 else "",
+                   custo, leadtime, "", "")
+
     def iniciar_execucao(self):
         """
         Inicia a fase de execução e controle do MRP.
@@ -466,15 +1103,16 @@ class MRP:
         # Mudar o estado do MRP para Em Execução
         self.estado = "Em Execução"
 
-        # Inicializar o dicionário de ordens_controle
-        self.ordens_controle = {}
+        # Inicializar as ordens de controle (indexadas por status e por tipo de ordem)
+        self.ordens_controle = OrdensControle()
+        self._aplicar_travas()
 
         # Copiar as ordens de planejamento para o dicionário de controle
         for material, ordens in self.ordens_planejamento.items():
-            self.ordens_controle[material] = {
-                'Estoque Atual': self.estoque.get(material, {'em_estoque': 0})['em_estoque'],
-                'Status': 'Planejada'  # Status inicial: Planejada
-            }
+            self.ordens_controle[material] = OrdemControle(
+                estoque_atual=self.estoque.get(material, {'em_estoque': 0})['em_estoque'],
+                status='Planejada'  # Status inicial: Planejada
+            )
 
             # Copiar todas as chaves existentes em ordens para ordens_controle
             if 'Produção' in ordens:
@@ -483,6 +1121,10 @@ class MRP:
             if 'Aquisição' in ordens:
                 self.ordens_controle[material]['Aquisição'] = ordens['Aquisição']
 
+        # O estado inicial da execução é o primeiro snapshot do diário
+        if self.diario is not None:
+            self.diario.gravar_snapshot(self._estado_controle)
+
         print("Execução iniciada com sucesso. Estado atual: Em Execução")
         return True
 
@@ -502,36 +1144,40 @@ class MRP:
             print("Erro: O MRP não está em execução.")
             return False
 
-        if material not in self.ordens_controle:
-            print(f"Erro: Material '{material}' não encontrado nas ordens de controle.")
-            return False
+        with self._trava(material):
+            if material not in self.ordens_controle:
+                print(f"Erro: Material '{material}' não encontrado nas ordens de controle.")
+                return False
 
-        if tipo_ordem not in ['Produção', 'Aquisição']:
-            print(f"Erro: Tipo de ordem '{tipo_ordem}' inválido. Use 'Produção' ou 'Aquisição'.")
-            return False
+            if tipo_ordem not in ['Produção', 'Aquisição']:
+                print(f"Erro: Tipo de ordem '{tipo_ordem}' inválido. Use 'Produção' ou 'Aquisição'.")
+                return False
 
-        if tipo_ordem not in self.ordens_controle[material]:
-            print(f"Erro: Não existe ordem de {tipo_ordem} para o material '{material}'.")
-            return False
+            if tipo_ordem not in self.ordens_controle[material]:
+                print(f"Erro: Não existe ordem de {tipo_ordem} para o material '{material}'.")
+                return False
 
-        # Verificar se a ordem já está pronta
-        if self.ordens_controle[material]['Status'] == 'Pronta':
-            print(f"Erro: Não é possível editar uma ordem que já está pronta.")
-            return False
+            # Verificar se a ordem já está pronta
+            if self.ordens_controle[material]['Status'] == 'Pronta':
+                print(f"Erro: Não é possível editar uma ordem que já está pronta.")
+                return False
 
-        # Salvar quantidade anterior para log
-        quantidade_anterior = self.ordens_controle[material][tipo_ordem]
+            # Salvar quantidade anterior para log
+            quantidade_anterior = self.ordens_controle[material][tipo_ordem]
 
-        # Atualizar a quantidade
-        self.ordens_controle[material][tipo_ordem] = nova_quantidade
+            # Atualizar a quantidade
+            self.ordens_controle[material][tipo_ordem] = nova_quantidade
 
-        # Atualizar o status para 'Planejada' se estava 'Executada'
-        if self.ordens_controle[material]['Status'] == 'Executada':
-            self.ordens_controle[material]['Status'] = 'Planejada'
-            print(f"Status da ordem para '{material}' atualizado para 'Planejada' devido à edição.")
+            # Atualizar o status para 'Planejada' se estava 'Executada'
+            if self.ordens_controle[material]['Status'] == 'Executada':
+                self.ordens_controle[material]['Status'] = 'Planejada'
+                print(f"Status da ordem para '{material}' atualizado para 'Planejada' devido à edição.")
 
-        print(f"Ordem de {tipo_ordem} para '{material}' editada: {quantidade_anterior} -> {nova_quantidade}")
-        return True
+            self._registrar_alteracao(material, {tipo_ordem: nova_quantidade,
+                                                 'Status': self.ordens_controle[material]['Status']})
+
+            print(f"Ordem de {tipo_ordem} para '{material}' editada: {quantidade_anterior} -> {nova_quantidade}")
+            return True
 
     def cancelar_ordem(self, material):
         """
@@ -547,31 +1193,33 @@ class MRP:
             print("Erro: O MRP não está em execução.")
             return False
 
-        if material not in self.ordens_controle:
-            print(f"Erro: Material '{material}' não encontrado nas ordens de controle.")
-            return False
+        with self._trava(material):
+            if material not in self.ordens_controle:
+                print(f"Erro: Material '{material}' não encontrado nas ordens de controle.")
+                return False
 
-        # Verificar se a ordem já está pronta
-        if self.ordens_controle[material]['Status'] == 'Pronta':
-            print(f"Erro: Não é possível cancelar uma ordem que já está pronta.")
-            return False
+            # Verificar se a ordem já está pronta
+            if self.ordens_controle[material]['Status'] == 'Pronta':
+                print(f"Erro: Não é possível cancelar uma ordem que já está pronta.")
+                return False
 
-        # Salvar informações para log
-        tipos_ordem = []
-        if 'Produção' in self.ordens_controle[material]:
-            tipos_ordem.append('Produção')
-        if 'Aquisição' in self.ordens_controle[material]:
-            tipos_ordem.append('Aquisição')
+            # Salvar informações para log
+            tipos_ordem = []
+            if 'Produção' in self.ordens_controle[material]:
+                tipos_ordem.append('Produção')
+            if 'Aquisição' in self.ordens_controle[material]:
+                tipos_ordem.append('Aquisição')
 
-        # Cancelar a ordem (zerar quantidades)
-        for tipo in tipos_ordem:
-            self.ordens_controle[material][tipo] = 0
+            # Cancelar a ordem (zerar quantidades)
+            for tipo in tipos_ordem:
+                self.ordens_controle[material][tipo] = 0
 
-        # Atualizar o status para 'Planejada'
-        self.ordens_controle[material]['Status'] = 'Planejada'
+            # Atualizar o status para 'Planejada'
+            self.ordens_controle[material]['Status'] = 'Planejada'
+            self._registrar_alteracao(material, dict(dict.fromkeys(tipos_ordem, 0), Status='Planejada'))
 
-        print(f"Ordem para '{material}' cancelada. Quantidades zeradas e status definido como 'Planejada'.")
-        return True
+            print(f"Ordem para '{material}' cancelada. Quantidades zeradas e status definido como 'Planejada'.")
+            return True
 
     def atualizar_status_ordem(self, material, novo_status):
         """
@@ -588,48 +1236,310 @@ class MRP:
             print("Erro: O MRP não está em execução.")
             return False
 
+        with self._trava(material):
+            erro = self._validar_status_ordem(material, novo_status)
+            if erro:
+                print(f"Erro: {erro}")
+                return False
+
+            # Atualizar o status
+            self.ordens_controle[material]['Status'] = novo_status
+            print(f"Status da ordem para '{material}' atualizado para '{novo_status}'.")
+
+            # Se o status for 'Pronta', atualizar o estoque
+            if novo_status == 'Pronta':
+                # Atualizar o estoque com base no tipo de ordem (Produção ou Aquisição)
+                if 'Produção' in self.ordens_controle[material] and self.ordens_controle[material]['Produção'] > 0:
+                    quantidade = self.ordens_controle[material]['Produção']
+                    self.estoque[material]['em_estoque'] += quantidade
+                    print(f"Estoque de '{material}' atualizado: +{quantidade} unidades (Produção)")
+
+                if 'Aquisição' in self.ordens_controle[material] and self.ordens_controle[material]['Aquisição'] > 0:
+                    quantidade = self.ordens_controle[material]['Aquisição']
+                    self.estoque[material]['em_estoque'] += quantidade
+                    print(f"Estoque de '{material}' atualizado: +{quantidade} unidades (Aquisição)")
+
+            self._registrar_alteracao(material, {'Status': novo_status},
+                                      em_estoque=self.estoque[material]['em_estoque'] if novo_status == 'Pronta' else None)
+            return True
+
+    def ativar_concorrencia(self, num_travas=64):
+        """
+        Ativa o modo concorrente, em que várias threads podem editar, cancelar e atualizar
+        ordens ao mesmo tempo.
+
+        Cada operação sobre uma ordem adquire a trava do seu material (lock striping com
+        num_travas travas), de modo que operações sobre materiais diferentes seguem em
+        paralelo; as estruturas compartilhadas (estoque, índices das ordens e diário) têm
+        travas próprias, mantidas apenas durante cada escrita. Fora do modo concorrente as
+        operações não usam travas.
+
+        Args:
+            num_travas (int): Número de travas distribuídas entre os materiais.
+        """
+        self.travas = TravasMateriais(num_travas)
+        self._aplicar_travas()
+
+    def _aplicar_travas(self):
+        """
+        Associa travas próprias às estruturas compartilhadas, no modo concorrente.
+        """
+        if self.travas is None:
+            return
+        for estrutura, classe_trava in ((self.estoque, threading.RLock),
+                                        (getattr(self, 'ordens_controle', None), threading.Lock),
+                                        (self.diario, threading.RLock)):
+            if estrutura is not None and isinstance(estrutura.trava, nullcontext):
+                estrutura.trava = classe_trava()
+
+    def _trava(self, material):
+        """
+        Devolve a trava de um material (um contexto vazio fora do modo concorrente).
+        """
+        return _SEM_TRAVA if self.travas is None else self.travas(material)
+
+    def _travas_materiais(self, materiais):
+        """
+        Devolve um contexto com as travas de vários materiais (vazio fora do modo concorrente).
+        """
+        return _SEM_TRAVA if self.travas is None else self.travas.varias(materiais)
+
+    def _validar_status_ordem(self, material, novo_status):
+        """
+        Verifica se o status de uma ordem pode ser atualizado.
+
+        Returns:
+            str: Mensagem de erro, ou None se a atualização é válida.
+        """
         if material not in self.ordens_controle:
-            print(f"Erro: Material '{material}' não encontrado nas ordens de controle.")
-            return False
+            return f"Material '{material}' não encontrado nas ordens de controle."
 
         # Verificar se o novo status é válido
         status_validos = ['Planejada', 'Executada', 'Pronta']
         if novo_status not in status_validos:
-            print(f"Erro: Status '{novo_status}' inválido. Use um dos seguintes: {', '.join(status_validos)}")
-            return False
+            return f"Status '{novo_status}' inválido. Use um dos seguintes: {', '.join(status_validos)}"
 
         # Verificar se a ordem tem quantidades válidas
-        tem_producao = 'Produção' in self.ordens_controle[material] and self.ordens_controle[material]['Produção'] > 0
-        tem_aquisicao = 'Aquisição' in self.ordens_controle[material] and self.ordens_controle[material][
-            'Aquisição'] > 0
+        ordem = self.ordens_controle[material]
+        if not (ordem.get('Produção', 0) > 0 or ordem.get('Aquisição', 0) > 0):
+            return "Não é possível atualizar o status de uma ordem cancelada (quantidades zeradas)."
 
-        if not (tem_producao or tem_aquisicao):
-            print(f"Erro: Não é possível atualizar o status de uma ordem cancelada (quantidades zeradas).")
-            return False
+        if novo_status == 'Pronta' and material not in self.estoque:
+            return f"Material '{material}' não encontrado no estoque."
+        return None
 
-        # Atualizar o status
-        self.ordens_controle[material]['Status'] = novo_status
-        print(f"Status da ordem para '{material}' atualizado para '{novo_status}'.")
+    def atualizar_status_ordens(self, atualizacoes, atomico=False):
+        """
+        Atualiza o status de várias ordens de uma só vez (por exemplo, no recebimento de uma carga).
 
-        # Se o status for 'Pronta', atualizar o estoque
-        if novo_status == 'Pronta':
-            # Atualizar o estoque com base no tipo de ordem (Produção ou Aquisição)
-            if 'Produção' in self.ordens_controle[material] and self.ordens_controle[material]['Produção'] > 0:
-                quantidade = self.ordens_controle[material]['Produção']
-                self.estoque[material]['em_estoque'] += quantidade
-                print(f"Estoque de '{material}' atualizado: +{quantidade} unidades (Produção)")
+        Todas as linhas são validadas antes de qualquer alteração; as entradas em estoque das
+        ordens que passam a 'Pronta' são lançadas em uma única passada. Nada é impresso: o
+        resultado de cada linha é devolvido.
 
-            if 'Aquisição' in self.ordens_controle[material] and self.ordens_controle[material]['Aquisição'] > 0:
-                quantidade = self.ordens_controle[material]['Aquisição']
-                self.estoque[material]['em_estoque'] += quantidade
-                print(f"Estoque de '{material}' atualizado: +{quantidade} unidades (Aquisição)")
+        Args:
+            atualizacoes (iterable | dict): Pares (material, novo_status), ou um dicionário
+                                            material -> novo_status.
+            atomico (bool): Se True, nenhuma linha é aplicada quando alguma for inválida.
+                            Se False, as linhas válidas são aplicadas e as inválidas ignoradas.
 
+        Returns:
+            dict: Resultado da atualização, com as chaves:
+                  'aplicado' (bool): se as alterações foram aplicadas;
+                  'linhas' (list): um dicionário por linha, com 'material', 'status', 'sucesso'
+                                   e 'erro' (mensagem, ou None);
+                  'entradas_estoque' (dict): quantidade lançada no estoque de cada material.
+                  Retorna None se o MRP não está em execução.
+        """
+        if not hasattr(self, 'estado') or self.estado != "Em Execução":
+            print("Erro: O MRP não está em execução.")
+            return None
+
+        if isinstance(atualizacoes, dict):
+            atualizacoes = atualizacoes.items()
+        atualizacoes = list(atualizacoes)
+
+        with self._travas_materiais(material for material, _ in atualizacoes):
+            linhas = [{'material': material, 'status': novo_status, 'sucesso': False,
+                       'erro': self._validar_status_ordem(material, novo_status)}
+                      for material, novo_status in atualizacoes]
+
+            invalidas = any(linha['erro'] for linha in linhas)
+            if atomico and invalidas:
+                return {'aplicado': False, 'linhas': linhas, 'entradas_estoque': {}}
+
+            # Aplica os status e acumula as entradas em estoque das ordens prontas
+            entradas = {}
+            for linha in linhas:
+                if linha['erro']:
+                    continue
+                ordem = self.ordens_controle[linha['material']]
+                ordem['Status'] = linha['status']
+                linha['sucesso'] = True
+                if linha['status'] == 'Pronta':
+                    quantidade = max(ordem.get('Produção', 0), 0) + max(ordem.get('Aquisição', 0), 0)
+                    entradas[linha['material']] = entradas.get(linha['material'], 0) + quantidade
+
+            # Lançamento único no estoque colunar
+            if entradas:
+                materiais = list(entradas)
+                self.estoque.somar('em_estoque', self.estoque.linhas(materiais), np.array(list(entradas.values())))
+
+            for linha in linhas:
+                if linha['sucesso']:
+                    material = linha['material']
+                    self._registrar_alteracao(material, {'Status': linha['status']},
+                                              em_estoque=self.estoque[material]['em_estoque']
+                                              if material in entradas else None)
+
+            return {'aplicado': any(linha['sucesso'] for linha in linhas), 'linhas': linhas,
+                    'entradas_estoque': entradas}
+
+    def ativar_diario(self, nome_arquivo="ordens_controle", intervalo_snapshot=1000, eventos_por_fsync=64,
+                      segundos_por_fsync=1.0):
+        """
+        Ativa o diário dos eventos das ordens de controle.
+
+        As alterações feitas por editar_ordem, cancelar_ordem e atualizar_status_ordem são
+        acrescentadas ao diário, e o estado completo é gravado periodicamente em um snapshot,
+        de modo que um processo reiniciado pode recuperar a execução com recuperar_execucao.
+
+        Args:
+            nome_arquivo (str): Nome base dos arquivos do diário na pasta de arquivos.
+            intervalo_snapshot (int): Número de eventos entre snapshots.
+            eventos_por_fsync (int): Número máximo de eventos não sincronizados com o disco.
+            segundos_por_fsync (float): Tempo máximo, em segundos, sem sincronizar com o disco.
+
+        Returns:
+            DiarioOrdens: Diário ativado.
+        """
+        self.diario = DiarioOrdens(os.path.join(self.pasta_arquivos, nome_arquivo), intervalo_snapshot,
+                                   eventos_por_fsync, segundos_por_fsync)
+        self._aplicar_travas()
+        # Uma execução já iniciada começa o diário com o seu estado atual
+        if getattr(self, 'estado', None) == "Em Execução":
+            self.diario.gravar_snapshot(self._estado_controle)
+        return self.diario
+
+    def _estado_controle(self):
+        """
+        Devolve o estado completo da execução (ordens de controle e estoque dos seus materiais).
+        """
+        return {
+            'ordens': {material: dict(ordem) for material, ordem in self.ordens_controle.items()},
+            'estoque': {material: self.estoque[material]['em_estoque']
+                        for material in self.ordens_controle if material in self.estoque},
+        }
+
+    def _registrar_alteracao(self, material, campos, em_estoque=None):
+        """
+        Acrescenta ao diário, se ativo, os novos valores dos campos alterados de uma ordem.
+        """
+        if self.diario is None:
+            return
+        snapshot = self.diario.registrar('alteracao', material=material, campos=campos)
+        if em_estoque is not None:
+            snapshot = self.diario.registrar('estoque', material=material, em_estoque=em_estoque) or snapshot
+        if snapshot:
+            self.diario.gravar_snapshot(self._estado_controle)
+
+    def recuperar_execucao(self):
+        """
+        Recupera as ordens de controle a partir do diário: lê o último snapshot e reaplica
+        os eventos gravados depois dele.
+
+        Returns:
+            bool: True se a execução foi recuperada com sucesso, False caso contrário.
+        """
+        if self.diario is None:
+            print("Erro: O diário de ordens não está ativo.")
+            return False
+
+        estado, eventos = self.diario.recuperar()
+        if estado is None:
+            print("Erro: Não há execução gravada no diário de ordens.")
+            return False
+
+        ordens_controle = OrdensControle(estado['ordens'])
+        estoque = dict(estado['estoque'])
+        for evento in eventos:
+            if evento['evento'] == 'alteracao':
+                ordens_controle[evento['material']].update(evento['campos'])
+            elif evento['evento'] == 'estoque':
+                estoque[evento['material']] = evento['em_estoque']
+
+        for material, em_estoque in estoque.items():
+            if material in self.estoque:
+                self.estoque[material]['em_estoque'] = em_estoque
+        self.ordens_controle = ordens_controle
+        self._aplicar_travas()
+        self.estado = "Em Execução"
+
+        print(f"Execução recuperada do diário: {len(ordens_controle)} ordens, {len(eventos)} eventos após o snapshot.")
         return True
 
-    def listar_ordens_para_edicao(self):
+    def _filtrar_ordens_controle(self, status=None, prefixo=None, tipo=None):
+        """
+        Percorre as ordens de controle que atendem aos filtros, usando os índices por
+        status e por tipo de ordem.
+
+        Args:
+            status (str | list, opcional): Status (ou lista de status) das ordens.
+            prefixo (str, opcional): Prefixo do código do material.
+            tipo (str, opcional): Tipo da ordem ('Produção' ou 'Aquisição'); seleciona as
+                                  ordens com quantidade positiva desse tipo.
+
+        Yields:
+            tuple: (material, dados da ordem).
+        """
+        for material in self.ordens_controle.materiais(status, tipo):
+            if prefixo and not str(material).startswith(prefixo):
+                continue
+            yield material, self.ordens_controle[material]
+
+    def consultar_ordens(self, status=None, tipo=None, editaveis=False, contar=False):
+        """
+        Consulta as ordens de controle pelos índices de status e de tipo de ordem, sem
+        percorrer todas as ordens.
+
+        Args:
+            status (str | list, opcional): Status (ou lista de status) das ordens.
+            tipo (str, opcional): Tipo da ordem ('Produção' ou 'Aquisição').
+            editaveis (bool): Se True, considera apenas as ordens que ainda podem ser editadas
+                              (status diferente de 'Pronta').
+            contar (bool): Se True, devolve apenas o número de ordens.
+
+        Returns:
+            list | int: Materiais das ordens encontradas (ou o número de ordens), ou None se
+                        a execução ainda não foi iniciada.
+        """
+        if not hasattr(self, 'ordens_controle'):
+            print("Erro: Não há ordens de controle para consultar.")
+            return None
+
+        if editaveis:
+            nao_prontas = [s for s in self.ordens_controle.por_status if s != 'Pronta']
+            if status is None:
+                status = nao_prontas
+            else:
+                status = [s for s in ([status] if isinstance(status, str) else status) if s in nao_prontas]
+
+        if contar:
+            return self.ordens_controle.contar(status, tipo)
+        return self.ordens_controle.materiais(status, tipo)
+
+    def listar_ordens_para_edicao(self, status=None, prefixo=None, tipo=None, colunas=None,
+                                  pagina=None, tamanho_pagina=50):
         """
         Lista todas as ordens que podem ser editadas ou canceladas.
 
+        Args:
+            status (str | list, opcional): Exibe apenas as ordens com este(s) status.
+            prefixo (str, opcional): Exibe apenas os materiais cujo código começa com o prefixo.
+            tipo (str, opcional): Exibe apenas as ordens de 'Produção' ou de 'Aquisição'.
+            colunas (list, opcional): Colunas a exibir.
+            pagina (int, opcional): Página a imprimir. Se não fornecida, imprime a tabela inteira.
+            tamanho_pagina (int): Número de ordens por página.
+
         Returns:
             bool: True se as ordens foram listadas com sucesso, False caso contrário.
         """
@@ -637,41 +1547,41 @@ class MRP:
             print("Erro: Não há ordens de controle para listar.")
             return False
 
-        from tabulate import tabulate
-
-        # Preparar os dados para a tabela
-        tabela = []
         cabecalho = ["Material", "Estoque Atual", "Produção", "Aquisição", "Status", "Editável"]
 
-        for material, dados in self.ordens_controle.items():
-            estoque_atual = dados['Estoque Atual']
-            status = dados['Status']
-
-            producao = dados.get('Produção', 0)
-            aquisicao = dados.get('Aquisição', 0)
-
-            # Verificar se a ordem pode ser editada
-            editavel = "Não" if status == "Pronta" else "Sim"
+        def linhas():
+            for material, dados in self._filtrar_ordens_controle(status, prefixo, tipo):
+                producao = dados.get('Produção', 0)
+                aquisicao = dados.get('Aquisição', 0)
 
-            linha = [
-                material,
-                estoque_atual,
-                producao if producao > 0 else "",
-                aquisicao if aquisicao > 0 else "",
-                status,
-                editavel
-            ]
+                # Verificar se a ordem pode ser editada
+                editavel = "Não" if dados['Status'] == "Pronta" else "Sim"
 
-            tabela.append(linha)
+                yield [
+                    material,
+                    dados['Estoque Atual'],
+                    producao if producao > 0 else "",
+                    aquisicao if aquisicao > 0 else "",
+                    dados['Status'],
+                    editavel
+                ]
 
-        # Imprimir a tabela
-        print(tabulate(tabela, headers=cabecalho, tablefmt="grid"))
+        imprimir_tabela(cabecalho, linhas(), colunas=colunas, pagina=pagina, tamanho_pagina=tamanho_pagina)
         return True
 
-    def listar_ordens_controle(self):
+    def listar_ordens_controle(self, status=None, prefixo=None, tipo=None, colunas=None,
+                               pagina=None, tamanho_pagina=50):
         """
         Lista todas as ordens de controle no console.
 
+        Args:
+            status (str | list, opcional): Exibe apenas as ordens com este(s) status.
+            prefixo (str, opcional): Exibe apenas os materiais cujo código começa com o prefixo.
+            tipo (str, opcional): Exibe apenas as ordens de 'Produção' ou de 'Aquisição'.
+            colunas (list, opcional): Colunas a exibir.
+            pagina (int, opcional): Página a imprimir. Se não fornecida, imprime a tabela inteira.
+            tamanho_pagina (int): Número de ordens por página.
+
         Returns:
             bool: True se as ordens foram listadas com sucesso, False caso contrário.
         """
@@ -679,88 +1589,91 @@ class MRP:
             print("Erro: Não há ordens de controle para listar.")
             return False
 
-        from tabulate import tabulate
-
-        # Preparar os dados para a tabela
-        tabela = []
         cabecalho = ["Material", "Estoque Atual", "Retirada de Estoque", "Produção", "Aquisição", "Status"]
 
-        for material, dados in self.ordens_controle.items():
-            estoque_atual = dados['Estoque Atual']
-            status = dados['Status']
-
-            # Calcular a retirada de estoque
-            producao = dados.get('Produção', 0)
-            aquisicao = dados.get('Aquisição', 0)
-            retirada_estoque = min(estoque_atual, producao + aquisicao)
-
-            linha = [
-                material,
-                estoque_atual,
-                retirada_estoque if retirada_estoque > 0 else "",
-                producao if producao > 0 else "",
-                aquisicao if aquisicao > 0 else "",
-                status
-            ]
-
-            tabela.append(linha)
-
-        # Imprimir a tabela
-        print(tabulate(tabela, headers=cabecalho, tablefmt="grid"))
+        def linhas():
+            for material, dados in self._filtrar_ordens_controle(status, prefixo, tipo):
+                estoque_atual = dados['Estoque Atual']
+
+                # Calcular a retirada de estoque
+                producao = dados.get('Produção', 0)
+                aquisicao = dados.get('Aquisição', 0)
+                retirada_estoque = min(estoque_atual, producao + aquisicao)
+
+                yield [
+                    material,
+                    estoque_atual,
+                    retirada_estoque if retirada_estoque > 0 else "",
+                    producao if producao > 0 else "",
+                    aquisicao if aquisicao > 0 else "",
+                    dados['Status']
+                ]
+
+        imprimir_tabela(cabecalho, linhas(), colunas=colunas, pagina=pagina, tamanho_pagina=tamanho_pagina)
         return True
 
 
-    def listar_custos_materiais(self):
+    def listar_custos_materiais(self, prefixo=None, tipo=None, colunas=None, pagina=None, tamanho_pagina=50):
         """
         Lista os custos estimados de cada material e o custo total em formato tabular.
 
+        Args:
+            prefixo (str, opcional): Lista apenas os materiais cujo código começa com o prefixo.
+            tipo (str, opcional): Lista apenas os materiais de 'Produção' ou de 'Aquisição'.
+            colunas (list, opcional): Colunas a exibir.
+            pagina (int, opcional): Página a imprimir. Se não fornecida, imprime a tabela inteira.
+            tamanho_pagina (int): Número de materiais por página.
+
         Returns:
-            float: Custo total estimado de todos os materiais.
+            float: Custo total estimado dos materiais listados (de todas as páginas).
         """
         if not hasattr(self, 'fc_lt_esperados') or not self.fc_lt_esperados:
             print("Erro: Fluxo de caixa e lead times ainda não foram calculados.")
             return None
 
-        from tabulate import tabulate
-
-        # Preparar os dados para a tabela
-        tabela = []
         cabecalho = ["Material", "Tipo", "Quantidade", "Custo Estimado (R$)"]
-        custo_total = 0
-
-        for material, dados in self.fc_lt_esperados.items():
-            if 'Custo' in dados:
-                # Determinar o tipo (Produção ou Aquisição)
-                tipo = "Produção" if material in self.boms else "Aquisição"
-
-                # Obter a quantidade da ordem
-                quantidade = 0
-                if material in self.ordens_planejamento:
-                    if tipo == "Produção" and 'Produção' in self.ordens_planejamento[material]:
-                        quantidade = self.ordens_planejamento[material]['Produção']
-                    elif tipo == "Aquisição" and 'Aquisição' in self.ordens_planejamento[material]:
-                        quantidade = self.ordens_planejamento[material]['Aquisição']
-
-                # Adicionar à tabela
-                custo = dados['Custo']
-                tabela.append([material, tipo, quantidade, f"{custo:.2f}"])
-                custo_total += custo
-
-        # Adicionar linha de total
-        tabela.append(["TOTAL", "", "", f"{custo_total:.2f}"])
-
-        # Imprimir a tabela
-        print(tabulate(tabela, headers=cabecalho, tablefmt="grid"))
 
+        def selecionados():
+            # Materiais listados e tipo (Produção ou Aquisição) de cada um
+            for material, dados in self.fc_lt_esperados.items():
+                if 'Custo' not in dados or (prefixo and not str(material).startswith(prefixo)):
+                    continue
+                tipo_material = "Produção" if material in self.boms else "Aquisição"
+                if tipo is None or tipo == tipo_material:
+                    yield material, tipo_material, dados['Custo']
+
+        # O total é acumulado enquanto as linhas são impressas
+        acumulado = {'custo': 0, 'completo': False}
+
+        def linhas():
+            for material, tipo_material, custo in selecionados():
+                acumulado['custo'] += custo
+                quantidade = self.ordens_planejamento.get(material, {}).get(tipo_material, 0)
+                yield [material, tipo_material, quantidade, f"{custo:.2f}"]
+            acumulado['completo'] = True
+
+        def linha_total():
+            return ["TOTAL", "", "", f"{acumulado['custo']:.2f}"]
+
+        imprimir_tabela(cabecalho, linhas(), colunas=colunas, pagina=pagina, tamanho_pagina=tamanho_pagina,
+                        linha_total=linha_total)
+
+        # Ao imprimir uma única página, o total das demais é calculado depois de exibi-la
+        if acumulado['completo']:
+            custo_total = acumulado['custo']
+        else:
+            custo_total = sum(custo for _, _, custo in selecionados())
         return custo_total
 
 
-    def exportar_custos_materiais(self, nome_arquivo):
+    def exportar_custos_materiais(self, nome_arquivo, streaming=False):
         """
         Exporta os custos estimados de cada material e o custo total para uma planilha Excel.
 
         Args:
             nome_arquivo (str): Nome do arquivo Excel a ser criado.
+            streaming (bool): Se True, grava a planilha linha a linha (worksheet somente
+                              escrita e estilos nomeados), com memória constante por linha.
 
         Returns:
             str: Caminho completo do arquivo Excel criado.
@@ -769,6 +1682,28 @@ class MRP:
             print("Erro: Fluxo de caixa e lead times ainda não foram calculados.")
             return None
 
+        if streaming:
+            custo_total = 0
+
+            def linhas():
+                nonlocal custo_total
+                for material, dados in self.fc_lt_esperados.items():
+                    if 'Custo' in dados:
+                        tipo = "Produção" if material in self.boms else "Aquisição"
+                        quantidade = self.ordens_planejamento.get(material, {}).get(tipo, 0)
+                        custo_total += dados['Custo']
+                        yield material, tipo, quantidade, dados['Custo']
+
+            cabecalhos = ["Material", "Tipo", "Quantidade", "Custo Estimado (R$)"]
+            caminho_arquivo = os.path.join(self.pasta_arquivos, nome_arquivo)
+            escrever_planilha(caminho_arquivo, "Custos Materiais", cabecalhos, linhas(),
+                              estilos_colunas=['mrp_texto', 'mrp_texto', 'mrp_numero', 'mrp_moeda'],
+                              larguras=[18] * len(cabecalhos), congelar='A2',
+                              linha_total=lambda: ["TOTAL", "", "", custo_total],
+                              estilos_total=['mrp_total'] * 3 + ['mrp_total_moeda'])
+            print(f"Custos de materiais exportados com sucesso para: {caminho_arquivo}")
+            return caminho_arquivo
+
         from openpyxl import Workbook
         from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
 
@@ -874,124 +1809,332 @@ class MRP:
         print(f"Custos de materiais exportados com sucesso para: {caminho_arquivo}")
         return caminho_arquivo
 
-    def atualizar_custos_leadtimes(self, nome_arquivo_cotacoes):
+    def projetar_fluxo_caixa(self, momento='entrega', categorias='tipo'):
+        """
+        Projeta as saídas de caixa diárias do plano a partir dos custos esperados (fc_lt_esperados).
+
+        O custo das ordens de cada material é lançado no dia de entrega (o mesmo do quadro
+        de planejamento) ou no dia de liberação da ordem (entrega menos o lead time do
+        próprio material), e os custos são somados por dia em um array indexado pelo dia,
+        em uma única passada vetorizada.
+
+        Args:
+            momento (str): 'entrega' ou 'liberacao'.
+            categorias (str | dict, opcional): Séries por categoria: 'tipo' (Produção ou
+                                               Aquisição), 'material', um dicionário
+                                               material -> categoria, ou None.
+
+        Returns:
+            dict: Projeção, com as chaves:
+                'datas' (list): Datas (YYYY-MM-DD), uma por dia, do primeiro ao último desembolso.
+                'saidas' (ndarray): Total desembolsado em cada dia.
+                'acumulado' (ndarray): Total acumulado até cada dia.
+                'categorias' (dict): Desembolsos diários por categoria (vazio se categorias for None).
+            Retorna None se o planejamento não foi realizado ou o momento for inválido.
+        """
+        if not getattr(self, 'fc_lt_esperados', None) or not hasattr(self, 'data_execucao'):
+            print("Erro: Fluxo de caixa e lead times ainda não foram calculados.")
+            return None
+        if momento not in ('entrega', 'liberacao'):
+            print(f"Erro: Momento '{momento}' inválido. Use 'entrega' ou 'liberacao'.")
+            return None
+
+        materiais = [material for material, dados in self.fc_lt_esperados.items()
+                     if dados.get('Custo', 0) and 'Leadtime' in dados]
+        leadtimes = np.array([self.fc_lt_esperados[material]['Leadtime'] for material in materiais], dtype=np.float64)
+        # Materiais sem lead time (NaN) não têm dia de entrega e ficam fora da projeção
+        finitos = np.isfinite(leadtimes)
+        if not finitos.all():
+            materiais = [material for material, finito in zip(materiais, finitos.tolist()) if finito]
+            leadtimes = leadtimes[finitos]
+        if len(materiais) == 0:
+            return {'datas': [], 'saidas': np.zeros(0), 'acumulado': np.zeros(0), 'categorias': {}}
+
+        custos = np.array([self.fc_lt_esperados[material]['Custo'] for material in materiais], dtype=np.float64)
+        dias = self._dias_entrega(leadtimes)
+        if momento == 'liberacao':
+            # A ordem é liberada o lead time do próprio material antes da entrega (no próprio
+            # dia da entrega, se o material não tiver lead time no estoque)
+            proprios = self.estoque.valores('leadtime_medio_lote', self.estoque.linhas(materiais)).astype(np.float64)
+            proprios[~np.isfinite(proprios)] = 0
+            dias = dias - np.floor(proprios).astype(np.int64)
+
+        # Dias relativos ao primeiro desembolso
+        primeiro = int(dias.min())
+        deslocamentos = dias - primeiro
+        num_dias = int(deslocamentos.max()) + 1
+        saidas = np.bincount(deslocamentos, weights=custos, minlength=num_dias)
+
+        series = {}
+        if categorias is not None:
+            if categorias == 'tipo':
+                rotulos = ["Aquisição" if self.ordens_planejamento.get(material, {}).get('Aquisição', 0) > 0
+                           else "Produção" for material in materiais]
+            elif categorias == 'material':
+                rotulos = materiais
+            else:
+                rotulos = [categorias.get(material, "Outros") for material in materiais]
+            codigos, nomes = pd.factorize(pd.Series(rotulos, dtype=object))
+            matriz = np.bincount(codigos * num_dias + deslocamentos, weights=custos,
+                                 minlength=len(nomes) * num_dias).reshape(len(nomes), num_dias)
+            series = dict(zip(nomes.tolist(), matriz))
+
+        return {
+            'datas': formatar_dias(np.arange(primeiro, primeiro + num_dias)),
+            'saidas': saidas,
+            'acumulado': np.cumsum(saidas),
+            'categorias': series,
+        }
+
+    def exportar_fluxo_caixa(self, nome_arquivo, momento='entrega', categorias='tipo', apenas_desembolsos=False):
+        """
+        Exporta a projeção diária do fluxo de caixa para uma planilha Excel.
+
+        A planilha tem uma linha por dia, com as saídas de cada categoria, o total do dia
+        e o total acumulado.
+
+        Args:
+            nome_arquivo (str): Nome do arquivo Excel a ser criado.
+            momento (str): 'entrega' ou 'liberacao' (ver projetar_fluxo_caixa).
+            categorias (str | dict, opcional): Categorias das colunas (ver projetar_fluxo_caixa).
+            apenas_desembolsos (bool): Se True, omite os dias sem saídas.
+
+        Returns:
+            str: Caminho completo do arquivo Excel criado.
+        """
+        projecao = self.projetar_fluxo_caixa(momento, categorias)
+        if projecao is None:
+            return None
+
+        nomes = list(projecao['categorias'])
+        valores = np.vstack([*projecao['categorias'].values(), projecao['saidas'], projecao['acumulado']])
+        dias = np.arange(len(projecao['datas']))
+        if apenas_desembolsos:
+            dias = np.flatnonzero(projecao['saidas'])
+
+        def linhas():
+            datas = projecao['datas']
+            colunas = valores[:, dias].T.tolist()
+            for dia, valores_dia in zip(dias.tolist(), colunas):
+                yield [datas[dia]] + valores_dia
+
+        cabecalhos = ["Data"] + [str(nome) for nome in nomes] + ["Total do Dia (R$)", "Acumulado (R$)"]
+        caminho_arquivo = os.path.join(self.pasta_arquivos, nome_arquivo)
+        escrever_planilha(caminho_arquivo, "Fluxo de Caixa", cabecalhos, linhas(),
+                          estilos_colunas=['mrp_texto'] + ['mrp_moeda'] * (len(cabecalhos) - 1),
+                          larguras=[14] + [18] * (len(cabecalhos) - 1), congelar='B2',
+                          linha_total=["TOTAL"] + valores[:-1].sum(axis=1).tolist() + [""],
+                          estilos_total=['mrp_total'] + ['mrp_total_moeda'] * (len(cabecalhos) - 1))
+        print(f"Fluxo de caixa exportado com sucesso para: {caminho_arquivo}")
+        return caminho_arquivo
+
+    def atualizar_custos_leadtimes(self, nome_arquivo_cotacoes, regra='menor_custo'):
         """
         Atualiza os custos e leadtimes com base na planilha de cotações.
 
+        A planilha pode conter várias cotações (de fornecedores diferentes) por material;
+        a cotação aplicada é escolhida pela regra (ver selecionar_cotacoes).
+
+        Os materiais alterados são acumulados em self.materiais_alterados, para uso em
+        replanejar_incremental.
+
         Args:
-            nome_arquivo_cotacoes (str): Nome do arquivo Excel com as cotações.
+            nome_arquivo_cotacoes (str): Nome do arquivo com as cotações (XLSX, CSV, Parquet ou SQLite).
+            regra (str | callable, opcional): Regra de seleção das cotações. Se None, vale a
+                                              última cotação de cada material.
 
         Returns:
             tuple: (bool, list) - Sucesso da operação e lista de alertas.
         """
-        alertas = []
         caminho_arquivo = os.path.join(self.pasta_arquivos, nome_arquivo_cotacoes)
 
         try:
-            # Carregar a planilha de cotações
-            wb = openpyxl.load_workbook(caminho_arquivo)
-            ws = wb.active
+            df_cotacoes = ler_tabela(caminho_arquivo, self.formato_entrada)
+            if regra is not None:
+                df_cotacoes = self.selecionar_cotacoes(df_cotacoes, regra)
+                if df_cotacoes is None:
+                    return False, []
+            alteracoes = self.aplicar_cotacoes(df_cotacoes)
+        except Exception as e:
+            print(f"Erro ao atualizar custos e leadtimes: {str(e)}")
+            return False, []
 
-            # Obter os cabeçalhos
-            headers = [cell.value for cell in ws[1]]
+        alertas = alteracoes.alertas()
+        if alertas:
+            print("Alertas durante a atualização:")
+            for alerta in alertas:
+                print(f"- {alerta}")
 
-            # Processar cada linha da planilha
-            for row in ws.iter_rows(min_row=2, values_only=True):
-                if not row[0]:  # Pular linhas vazias
-                    continue
+        return True, alertas
 
-                material = row[0]
-
-                if material in self.estoque:
-                    # Mapear os valores da linha para um dicionário
-                    row_data = dict(zip(headers, row))
-
-                    # Atualizar custo unitário
-                    if 'Custo Unitario' in row_data and row_data['Custo Unitario'] is not None:
-                        custo_unitario = row_data['Custo Unitario']
-                        if custo_unitario != self.estoque[material]['custo_medio_unitario']:
-                            alerta = f"Custo de {material} alterado: {self.estoque[material]['custo_medio_unitario']} -> {custo_unitario}"
-                            alertas.append(alerta)
-                            self.estoque[material]['custo_medio_unitario'] = custo_unitario
-
-                    # Atualizar imposto unitário
-                    if 'Imposto Unitario' in row_data and row_data['Imposto Unitario'] is not None:
-                        imposto_unitario = row_data['Imposto Unitario']
-                        if imposto_unitario != self.estoque[material]['imposto_medio_unitario']:
-                            alertas.append(
-                                f"Imposto de {material} alterado: {self.estoque[material]['imposto_medio_unitario']} -> {imposto_unitario}")
-                            self.estoque[material]['imposto_medio_unitario'] = imposto_unitario
-
-                    # Atualizar frete por lote
-                    if 'Frete Lote' in row_data and row_data['Frete Lote'] is not None:
-                        frete_lote = row_data['Frete Lote']
-                        if frete_lote != self.estoque[material]['frete_medio_lote']:
-                            alertas.append(
-                                f"Frete de {material} alterado: {self.estoque[material]['frete_medio_lote']} -> {frete_lote}")
-                            self.estoque[material]['frete_medio_lote'] = frete_lote
-
-                    # Atualizar leadtime
-                    if 'Lead Time' in row_data and row_data['Lead Time'] is not None:
-                        lead_time = row_data['Lead Time']
-                        if lead_time > self.estoque[material]['leadtime_medio_lote']:
-                            alertas.append(
-                                f"Leadtime de {material} aumentou: {self.estoque[material]['leadtime_medio_lote']} -> {lead_time}")
-                            self.estoque[material]['leadtime_medio_lote'] = lead_time
-                            alertas.append("Necessidade de replanejar devido a aumento no leadtime.")
-                        elif lead_time != self.estoque[material]['leadtime_medio_lote']:
-                            alertas.append(
-                                f"Leadtime de {material} alterado: {self.estoque[material]['leadtime_medio_lote']} -> {lead_time}")
-                            self.estoque[material]['leadtime_medio_lote'] = lead_time
-
-            if alertas:
-                print("Alertas durante a atualização:")
-                for alerta in alertas:
-                    print(f"- {alerta}")
-
-            return True, alertas
+    def aplicar_cotacoes(self, df_cotacoes):
+        """
+        Aplica ao estoque os custos e lead times de uma tabela de cotações, de forma vetorizada.
 
-        except Exception as e:
-            print(f"Erro ao atualizar custos e leadtimes: {str(e)}")
-            return False, []
+        A tabela é associada ao estoque pelo material (primeira coluna); para cada campo de
+        CAMPOS_COTACOES, vale o último valor informado de cada material, e apenas os valores
+        diferentes dos atuais são gravados, em lote. Materiais fora do estoque e valores
+        vazios são ignorados.
+
+        Args:
+            df_cotacoes (DataFrame): Cotações, com a coluna de materiais e as colunas de CAMPOS_COTACOES
+                                     presentes.
+
+        Returns:
+            AlteracoesEstoque: Alterações aplicadas (material, campo, antigo, novo), na ordem em
+                               que os materiais aparecem nas cotações.
+        """
+        materiais = df_cotacoes.iloc[:, 0].tolist()
+        linhas = self.estoque.linhas(materiais)
+        validas = linhas >= 0
+        posicoes = np.arange(len(linhas))
+
+        # Posição da primeira cotação de cada material (ordem das alterações)
+        primeira = np.full(len(self.estoque), len(linhas), dtype=np.int64)
+        np.minimum.at(primeira, linhas[validas], posicoes[validas])
+
+        partes = []
+        for ordem_campo, (campo, coluna) in enumerate(CAMPOS_COTACOES.items()):
+            if coluna not in df_cotacoes.columns:
+                continue
+            valores = pd.to_numeric(df_cotacoes[coluna], errors='coerce').to_numpy()
+            mascara = validas & ~pd.isna(valores)
+            linhas_campo = linhas[mascara][::-1]
+            valores_campo = valores[mascara][::-1]
+            # Último valor de cada material (primeira ocorrência na ordem invertida)
+            linhas_campo, unicas = np.unique(linhas_campo, return_index=True)
+            valores_campo = valores_campo[unicas]
+            # Colunas com valores vazios são lidas como float: valores inteiros voltam a ser int
+            if valores_campo.dtype.kind == 'f' and np.array_equal(valores_campo, np.floor(valores_campo)):
+                valores_campo = valores_campo.astype(np.int64)
+
+            antigos = self.estoque.valores(campo, linhas_campo)
+            alteradas = valores_campo != antigos
+            if not alteradas.any():
+                continue
+            linhas_campo = linhas_campo[alteradas]
+            valores_campo = valores_campo[alteradas]
+            partes.append((ordem_campo, campo, linhas_campo, antigos[alteradas], valores_campo))
+            self.estoque.atribuir(campo, linhas_campo, valores_campo)
+
+        if not partes:
+            return AlteracoesEstoque()
+
+        # Ordena as alterações pela posição do material nas cotações e, depois, pelo campo
+        linhas_alteradas = np.concatenate([parte[2] for parte in partes])
+        ordem = np.lexsort((np.concatenate([np.full(len(parte[2]), parte[0]) for parte in partes]),
+                            primeira[linhas_alteradas]))
+        campos = np.concatenate([np.full(len(parte[2]), parte[1], dtype=object) for parte in partes])
+        antigos = [valor for parte in partes for valor in parte[3].tolist()]
+        # Como nas células da planilha, cada valor novo inteiro é registrado como int,
+        # mesmo que outros valores do campo tenham casas decimais
+        novos = [int(valor) if isinstance(valor, float) and valor.is_integer() else valor
+                 for parte in partes for valor in parte[4].tolist()]
+        alteracoes = AlteracoesEstoque([self.estoque.codigos[linha] for linha in linhas_alteradas[ordem].tolist()],
+                                       campos[ordem].tolist(), [antigos[i] for i in ordem.tolist()],
+                                       [novos[i] for i in ordem.tolist()])
+
+        materiais_alterados = alteracoes.materiais_alterados()
+        self.materiais_alterados |= materiais_alterados
+        self.rollup.invalidar(materiais_alterados)
+        return alteracoes
+
+    def selecionar_cotacoes(self, df_cotacoes, regra='menor_custo', quantidades=None):
+        """
+        Escolhe, entre as cotações de cada material, a melhor segundo uma regra.
+
+        As cotações são agrupadas por material e ordenadas em uma única passada vetorizada
+        (material, critério da regra, critério de desempate, posição na tabela).
+
+        Regras:
+            'menor_custo': menor custo posto por unidade (Custo Unitario + Imposto Unitario +
+                           Frete Lote rateado pela quantidade), com desempate pelo lead time.
+            'menor_leadtime': menor Lead Time, com desempate pelo custo posto.
+            função: recebe a tabela de cotações (com a coluna 'Custo Posto') e devolve uma
+                    pontuação por linha; vence a menor, com desempate pela posição.
+
+        Valores faltantes de imposto e frete contam como zero. Cotações sem o valor usado pela
+        regra (incompletas, como uma linha só com o Lead Time na regra 'menor_custo') não
+        concorrem, mas também não são descartadas: vêm antes da cotação escolhida do mesmo
+        material, de modo que em aplicar_cotacoes os seus campos preenchidos valem apenas
+        onde a cotação escolhida não tiver valor.
+
+        Args:
+            df_cotacoes (DataFrame): Cotações, com os materiais na primeira coluna e as colunas
+                                     de CAMPOS_COTACOES presentes (e outras, como o fornecedor).
+            regra (str | callable): Regra de seleção (uma de REGRAS_COTACAO ou uma função).
+            quantidades (dict, opcional): Quantidade por material usada para ratear o frete do
+                                          lote. Se não fornecido, usa as quantidades a adquirir
+                                          das ordens de planejamento (1 para os demais materiais).
+
+        Returns:
+            DataFrame: As cotações incompletas e a cotação escolhida de cada material, na ordem
+                       em que os materiais aparecem, com a coluna 'Custo Posto' acrescentada;
+                       None se a regra for inválida.
+        """
+        if not callable(regra) and regra not in REGRAS_COTACAO:
+            print(f"Erro: Regra de seleção '{regra}' inválida. Use uma das seguintes: {', '.join(REGRAS_COTACAO)}")
+            return None
+
+        codigos, materiais = pd.factorize(df_cotacoes.iloc[:, 0], use_na_sentinel=True)
+
+        def coluna(nome, padrao=np.nan):
+            if CAMPOS_COTACOES[nome] not in df_cotacoes.columns:
+                return np.full(len(df_cotacoes), padrao)
+            return pd.to_numeric(df_cotacoes[CAMPOS_COTACOES[nome]], errors='coerce').to_numpy(dtype=np.float64)
+
+        # Quantidade de cada cotação para o rateio do frete do lote
+        if quantidades is None:
+            quantidades = {material: ordem.get('Aquisição', 0)
+                           for material, ordem in getattr(self, 'ordens_planejamento', {}).items()}
+        quantidade_material = np.array([quantidades.get(material, 0) for material in materiais], dtype=np.float64)
+        quantidade_material = np.where(quantidade_material > 0, quantidade_material, 1)
+        quantidade = quantidade_material[codigos]
+
+        custo_posto = coluna('custo_medio_unitario') + np.nan_to_num(coluna('imposto_medio_unitario')) \
+            + np.nan_to_num(coluna('frete_medio_lote')) / quantidade
+        leadtime = coluna('leadtime_medio_lote')
+        df_cotacoes = df_cotacoes.assign(**{'Custo Posto': custo_posto})
+
+        if regra == 'menor_custo':
+            criterios = (custo_posto, leadtime)
+        elif regra == 'menor_leadtime':
+            criterios = (leadtime, custo_posto)
+        else:
+            criterios = (np.asarray(regra(df_cotacoes), dtype=np.float64),)
+
+        # Apenas as cotações com o critério principal concorrem; valores faltantes dos critérios
+        # de desempate vão para o fim do grupo; linhas sem material ficam de fora
+        completas = ~np.isnan(criterios[0])
+        posicoes = np.arange(len(codigos))
+        chaves = [posicoes] + [np.where(np.isnan(criterio), np.inf, criterio) for criterio in reversed(criterios)]
+        ordem = np.lexsort(chaves + [codigos])
+        ordem = ordem[(codigos[ordem] >= 0) & completas[ordem]]
+        primeiras = ordem[np.r_[True, codigos[ordem][1:] != codigos[ordem][:-1]]] if len(ordem) else ordem
+
+        # Cotações incompletas antes da escolhida, agrupadas por material
+        incompletas = posicoes[(codigos >= 0) & ~completas]
+        selecionadas = np.concatenate([incompletas, primeiras])
+        escolhidas = np.r_[np.zeros(len(incompletas), dtype=bool), np.ones(len(primeiras), dtype=bool)]
+        selecionadas = selecionadas[np.lexsort((selecionadas, escolhidas, codigos[selecionadas]))]
+        return df_cotacoes.iloc[selecionadas].reset_index(drop=True)
 
     def recuperar_planejamento(self, nome_arquivo):
         """
-        Recupera o planejamento de uma planilha Excel e o carrega no dicionário de planejamento.
+        Recupera o planejamento de uma planilha Excel e o carrega no quadro de planejamento.
 
         Args:
-            nome_arquivo (str): Nome do arquivo Excel contendo o planejamento.
+            nome_arquivo (str): Nome do arquivo contendo o planejamento (XLSX, CSV, Parquet ou SQLite).
 
         Returns:
             bool: True se o planejamento foi recuperado com sucesso, False caso contrário.
         """
-        import pandas as pd
-        from datetime import datetime
-
         caminho_arquivo = os.path.join(self.pasta_arquivos, nome_arquivo)
 
         try:
-            # Lê a planilha Excel
-            df = pd.read_excel(caminho_arquivo)
-
-            # Reinicializa o dicionário de planejamento
-            self.planejamento = {}
-
-            # Itera sobre as linhas do DataFrame
-            for _, row in df.iterrows():
-                material = row['Material']
-                self.planejamento[material] = {'Estoque Atual': row['Estoque Atual']}
-
-                # Adiciona as datas e quantidades ao dicionário
-                for col in df.columns:
-                    if col not in ['Material', 'Estoque Atual']:
-                        try:
-                            data = datetime.strptime(col, '%Y-%m-%d')
-                            quantidade = row[col]
-                            if pd.notna(quantidade):
-                                self.planejamento[material][col] = quantidade
-                        except ValueError:
-                            # Ignora colunas que não são datas
-                            pass
+            # Lê o arquivo de planejamento e monta o quadro (colunas que não são datas são ignoradas)
+            df = ler_tabela(caminho_arquivo, self.formato_entrada)
+            self.planejamento = QuadroPlanejamento.de_dataframe(df)
 
             print(f"Planejamento recuperado com sucesso de: {caminho_arquivo}")
             return True
@@ -1000,6 +2143,102 @@ class MRP:
             print(f"Erro ao recuperar o planejamento: {str(e)}")
             return False
 
+    def conectar_armazenamento(self, nome_arquivo="mrp.db"):
+        """
+        Conecta o MRP a um banco SQLite (modo WAL) para salvar e carregar o seu estado.
+
+        Args:
+            nome_arquivo (str): Nome do banco na pasta de arquivos (criado se não existir).
+
+        Returns:
+            ArmazenamentoSQLite: Armazenamento conectado.
+        """
+        self.armazenamento = ArmazenamentoSQLite(os.path.join(self.pasta_arquivos, nome_arquivo))
+        return self.armazenamento
+
+    def salvar_estado(self):
+        """
+        Salva no banco, em uma única transação, o estoque, as ordens de planejamento, os
+        custos e lead times esperados, as ordens de controle e o quadro de planejamento.
+
+        Returns:
+            bool: True se o estado foi salvo com sucesso, False caso contrário.
+        """
+        if self.armazenamento is None:
+            print("Erro: O armazenamento não está conectado.")
+            return False
+
+        try:
+            with self.armazenamento.transacao(escrita=True):
+                self.armazenamento.gravar_estoque(self.estoque, substituir=True)
+                self.armazenamento.gravar_registros('ordens_planejamento', getattr(self, 'ordens_planejamento', {}),
+                                                    substituir=True)
+                self.armazenamento.gravar_registros('fc_lt_esperados', self.fc_lt_esperados, substituir=True)
+                self.armazenamento.gravar_registros('ordens_controle', getattr(self, 'ordens_controle', {}),
+                                                    substituir=True)
+                self.armazenamento.gravar_planejamento(self.planejamento)
+                data_execucao = getattr(self, 'data_execucao', None)
+                self.armazenamento.gravar_metadados(
+                    estado=getattr(self, 'estado', None),
+                    data_execucao=data_execucao.isoformat() if data_execucao is not None else None)
+            return True
+        except Exception as e:
+            print(f"Erro ao salvar o estado: {str(e)}")
+            return False
+
+    def carregar_estado(self, materiais=None):
+        """
+        Carrega o estado salvo no banco, por inteiro ou apenas de alguns materiais.
+
+        Os dados lidos são incorporados ao estado atual (os materiais lidos substituem os
+        existentes), de modo que partes de um estado grande podem ser carregadas sob demanda.
+        Todas as tabelas são lidas em uma única transação, com um estado consistente mesmo
+        que outro processo esteja gravando.
+
+        Args:
+            materiais (list, opcional): Materiais a carregar. Se não fornecido, carrega todos.
+
+        Returns:
+            bool: True se o estado foi carregado com sucesso, False caso contrário.
+        """
+        if self.armazenamento is None:
+            print("Erro: O armazenamento não está conectado.")
+            return False
+
+        try:
+            with self.armazenamento.transacao():
+                estoque = self.armazenamento.ler_estoque(materiais)
+                ordens_planejamento = self.armazenamento.ler_registros('ordens_planejamento', materiais)
+                fc_lt_esperados = self.armazenamento.ler_registros('fc_lt_esperados', materiais)
+                ordens_controle = self.armazenamento.ler_registros('ordens_controle', materiais)
+                planejamento = self.armazenamento.ler_planejamento(materiais)
+                metadados = self.armazenamento.ler_metadados()
+        except Exception as e:
+            print(f"Erro ao carregar o estado: {str(e)}")
+            return False
+
+        self._incorporar_estoque(estoque)
+        self.rollup.limpar()
+        if not hasattr(self, 'ordens_planejamento'):
+            self.ordens_planejamento = {}
+        self.ordens_planejamento.update(ordens_planejamento)
+        self.fc_lt_esperados.update(fc_lt_esperados)
+        if not hasattr(self, 'ordens_controle'):
+            self.ordens_controle = OrdensControle()
+            self._aplicar_travas()
+        self.ordens_controle.update(ordens_controle)
+        if len(self.planejamento) == 0:
+            self.planejamento = planejamento
+        else:
+            for material, linha in planejamento.items():
+                self.planejamento[material] = linha
+
+        if metadados.get('estado'):
+            self.estado = metadados['estado']
+        if metadados.get('data_execucao'):
+            self.data_execucao = datetime.fromisoformat(metadados['data_execucao'])
+        return True
+
     def planejar_producao(self, demanda):
         """
         Realiza o planejamento da produção com base na demanda e nos dados inicializados.
@@ -0,0 +1,473 @@
+import json
+import os
+import threading
+import time
+from collections.abc import MutableMapping
+from contextlib import ExitStack, contextmanager, nullcontext
+
+
+class _Registro(MutableMapping):
+    """
+    Registro compacto com campos fixos, guardados em __slots__.
+
+    Os campos são acessados como atributos (ordem.producao) ou pelas chaves usadas
+    nos dicionários do MRP (ordem['Produção']), de modo que o registro pode
+    substituir o dicionário correspondente. Um campo nunca atribuído não existe,
+    como uma chave ausente.
+    """
+
+    __slots__ = ()
+    CAMPOS = {}  # chave -> atributo
+
+    def __init__(self, dados=(), **atributos):
+        """
+        Args:
+            dados (dict, opcional): Valores pelas chaves do dicionário (por exemplo, {'Produção': 10}).
+            **atributos: Valores pelos nomes dos atributos (por exemplo, producao=10).
+        """
+        self.update(dados)
+        for atributo, valor in atributos.items():
+            setattr(self, atributo, valor)
+
+    def _atributo(self, chave):
+        try:
+            return self.CAMPOS[chave]
+        except (KeyError, TypeError):
+            raise KeyError(chave) from None
+
+    def __getitem__(self, chave):
+        try:
+            return getattr(self, self._atributo(chave))
+        except AttributeError:
+            raise KeyError(chave) from None
+
+    def __setitem__(self, chave, valor):
+        setattr(self, self._atributo(chave), valor)
+
+    def __delitem__(self, chave):
+        try:
+            delattr(self, self._atributo(chave))
+        except AttributeError:
+            raise KeyError(chave) from None
+
+    def __contains__(self, chave):
+        atributo = self.CAMPOS.get(chave) if isinstance(chave, str) else None
+        return atributo is not None and hasattr(self, atributo)
+
+    def __iter__(self):
+        return (chave for chave, atributo in self.CAMPOS.items() if hasattr(self, atributo))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def __getstate__(self):
+        return dict(self.items())
+
+    def __setstate__(self, estado):
+        self.update(estado)
+
+
+class OrdemPlanejada(_Registro):
+    """
+    Quantidades planejadas de um material ({'Produção': x, 'Aquisição': y}).
+    """
+
+    __slots__ = ('producao', 'aquisicao')
+    CAMPOS = {'Produção': 'producao', 'Aquisição': 'aquisicao'}
+
+
+class CustoLeadtime(_Registro):
+    """
+    Custo e lead time esperados das ordens de um material ({'Leadtime': ..., 'Custo': ...}).
+    """
+
+    __slots__ = ('leadtime', 'custo')
+    CAMPOS = {'Leadtime': 'leadtime', 'Custo': 'custo'}
+
+
+class OrdemControle(_Registro):
+    """
+    Ordem em execução de um material ({'Estoque Atual', 'Status', 'Produção', 'Aquisição'}).
+
+    Quando a ordem pertence a um OrdensControle, as alterações de status e de
+    quantidades são comunicadas a ele, para manter seus índices atualizados.
+    """
+
+    __slots__ = ('estoque_atual', 'status', 'producao', 'aquisicao', '_dono')
+    CAMPOS = {'Estoque Atual': 'estoque_atual', 'Status': 'status', 'Produção': 'producao', 'Aquisição': 'aquisicao'}
+    INDEXADOS = frozenset(('status', 'producao', 'aquisicao'))
+
+    def __setattr__(self, atributo, valor):
+        dono = getattr(self, '_dono', None) if atributo in self.INDEXADOS else None
+        if dono is None:
+            object.__setattr__(self, atributo, valor)
+            return
+        container, material = dono
+        with container.trava:
+            container._desindexar(material, self)
+            object.__setattr__(self, atributo, valor)
+            container._indexar(material, self)
+
+    def __delattr__(self, atributo):
+        dono = getattr(self, '_dono', None) if atributo in self.INDEXADOS else None
+        if dono is None:
+            object.__delattr__(self, atributo)
+            return
+        container, material = dono
+        with container.trava:
+            container._desindexar(material, self)
+            try:
+                object.__delattr__(self, atributo)
+            finally:
+                container._indexar(material, self)
+
+
+class OrdensControle(MutableMapping):
+    """
+    Ordens em execução por material (material -> OrdemControle), com índices
+    secundários por status e por tipo de ordem.
+
+    Os índices são mantidos a cada alteração das ordens, de modo que consultas como
+    "aquisições executadas" ou "ordens editáveis" não percorrem todas as ordens.
+    Cada índice é um dicionário usado como conjunto ordenado (material -> None).
+    """
+
+    TIPOS = {'Produção': 'producao', 'Aquisição': 'aquisicao'}
+    trava = nullcontext()  # Protege os índices; substituída por uma trava real no modo concorrente
+
+    def __init__(self, ordens=()):
+        """
+        Args:
+            ordens (dict, opcional): Ordens iniciais (material -> OrdemControle ou dicionário).
+        """
+        self._ordens = {}
+        self._posicao = {}  # Ordem de inclusão dos materiais, para listagens estáveis
+        self._contador = 0
+        self.por_status = {}  # status -> {material: None}
+        self.por_tipo = {tipo: {} for tipo in self.TIPOS}  # tipo -> {material: None} (quantidade > 0)
+        self.update(ordens)
+
+    def _indexar(self, material, ordem):
+        status = getattr(ordem, 'status', None)
+        if status is not None:
+            self.por_status.setdefault(status, {})[material] = None
+        for tipo, atributo in self.TIPOS.items():
+            if getattr(ordem, atributo, 0) > 0:
+                self.por_tipo[tipo][material] = None
+
+    def _desindexar(self, material, ordem):
+        status = getattr(ordem, 'status', None)
+        if status is not None:
+            materiais = self.por_status.get(status)
+            if materiais is not None:
+                materiais.pop(material, None)
+                if not materiais:
+                    del self.por_status[status]
+        for tipo in self.TIPOS:
+            self.por_tipo[tipo].pop(material, None)
+
+    def materiais(self, status=None, tipo=None):
+        """
+        Consulta os materiais pelos índices de status e de tipo de ordem.
+
+        Args:
+            status (str | list, opcional): Status (ou lista de status) das ordens.
+            tipo (str, opcional): Tipo da ordem ('Produção' ou 'Aquisição'); seleciona as
+                                  ordens com quantidade positiva desse tipo.
+
+        Returns:
+            list: Materiais que atendem aos filtros, na ordem de inclusão.
+        """
+        candidatos = self._candidatos(status, tipo)
+        if candidatos is None:
+            return list(self._ordens)
+        return sorted(candidatos, key=self._posicao.__getitem__)
+
+    def contar(self, status=None, tipo=None):
+        """
+        Conta os materiais que atendem aos filtros (mesmos filtros de materiais()).
+
+        Returns:
+            int: Número de materiais.
+        """
+        if tipo is None and status is not None and not isinstance(status, str):
+            # Cada material tem um único status: os índices são disjuntos
+            return sum(len(self.por_status.get(s, {})) for s in set(status))
+        candidatos = self._candidatos(status, tipo)
+        return len(self._ordens) if candidatos is None else len(candidatos)
+
+    def _candidatos(self, status, tipo):
+        """
+        Devolve os materiais que atendem aos filtros (None se não há filtros).
+        """
+        conjuntos = []
+        if status is not None:
+            if isinstance(status, str):
+                conjuntos.append(self.por_status.get(status, {}).keys())
+            else:
+                conjuntos.append({material for s in status for material in self.por_status.get(s, {})})
+        if tipo is not None:
+            conjuntos.append(self.por_tipo.get(tipo, {}).keys())
+        if not conjuntos:
+            return None
+        if len(conjuntos) == 1:
+            return conjuntos[0]
+        # Interseção percorrendo o menor conjunto
+        menor, maior = sorted(conjuntos, key=len)
+        return [material for material in menor if material in maior]
+
+    def __getitem__(self, material):
+        return self._ordens[material]
+
+    def __setitem__(self, material, ordem):
+        if not isinstance(ordem, OrdemControle):
+            ordem = OrdemControle(ordem)
+        with self.trava:
+            if material in self._ordens:
+                antiga = self._ordens[material]
+                self._desindexar(material, antiga)
+                object.__setattr__(antiga, '_dono', None)
+            else:
+                self._posicao[material] = self._contador
+                self._contador += 1
+            self._ordens[material] = ordem
+            object.__setattr__(ordem, '_dono', (self, material))
+            self._indexar(material, ordem)
+
+    def __delitem__(self, material):
+        with self.trava:
+            ordem = self._ordens.pop(material)
+            self._desindexar(material, ordem)
+            object.__setattr__(ordem, '_dono', None)
+            del self._posicao[material]
+
+    def __iter__(self):
+        return iter(self._ordens)
+
+    def __len__(self):
+        return len(self._ordens)
+
+    def __contains__(self, material):
+        return material in self._ordens
+
+    def __repr__(self):
+        return repr(self._ordens)
+
+    def __reduce__(self):
+        # Os índices são reconstruídos a partir das ordens
+        return self.__class__, (self._ordens,)
+
+
+# Versão do formato do snapshot do diário de ordens
+VERSAO_DIARIO = 2
+
+
+def _json_padrao(valor):
+    """
+    Converte escalares e arrays numpy (quantidades vindas dos cálculos vetorizados) para JSON.
+    """
+    if hasattr(valor, 'tolist'):
+        return valor.tolist()
+    raise TypeError(f"Valor não serializável: {valor!r}")
+
+
+class DiarioOrdens:
+    """
+    Diário local, somente de acréscimo, dos eventos de controle das ordens.
+
+    Cada evento é gravado como uma linha JSON no arquivo '<caminho>.diario'; as
+    gravações são sincronizadas com o disco (fsync) em lotes: a cada
+    eventos_por_fsync eventos, ou no primeiro evento gravado depois de
+    segundos_por_fsync segundos sem sincronização. A cada
+    intervalo_snapshot eventos, o estado completo é gravado em '<caminho>.snapshot'
+    e o diário é reiniciado, de modo que a recuperação lê no máximo um snapshot e
+    intervalo_snapshot eventos, qualquer que seja o histórico.
+    """
+
+    trava = nullcontext()  # Serializa as gravações; substituída por uma trava real no modo concorrente
+
+    def __init__(self, caminho, intervalo_snapshot=1000, eventos_por_fsync=64, segundos_por_fsync=1.0):
+        """
+        Args:
+            caminho (str): Caminho base dos arquivos do diário (sem extensão).
+            intervalo_snapshot (int): Número de eventos entre snapshots.
+            eventos_por_fsync (int): Número máximo de eventos não sincronizados com o disco.
+            segundos_por_fsync (float): Tempo máximo, em segundos, sem sincronizar com o disco.
+        """
+        self.caminho_diario = caminho + ".diario"
+        self.caminho_snapshot = caminho + ".snapshot"
+        self.intervalo_snapshot = intervalo_snapshot
+        self.eventos_por_fsync = eventos_por_fsync
+        self.segundos_por_fsync = segundos_por_fsync
+
+        self.sequencia = 0  # Número do último evento gravado
+        self.eventos_desde_snapshot = 0
+        self._pendentes = 0  # Eventos ainda não sincronizados com o disco
+        self._ultimo_fsync = time.monotonic()
+        self._arquivo = None
+
+    def _abrir(self):
+        if self._arquivo is None:
+            self._arquivo = open(self.caminho_diario, 'a', encoding='utf-8')
+        return self._arquivo
+
+    def registrar(self, evento, **dados):
+        """
+        Acrescenta um evento ao diário.
+
+        Args:
+            evento (str): Tipo do evento (por exemplo, 'alteracao').
+            **dados: Dados do evento (serializáveis em JSON).
+
+        Returns:
+            bool: True se um novo snapshot deve ser gravado (intervalo atingido).
+        """
+        with self.trava:
+            self.sequencia += 1
+            registro = {'seq': self.sequencia, 'evento': evento}
+            registro.update(dados)
+            arquivo = self._abrir()
+            arquivo.write(json.dumps(registro, ensure_ascii=False, default=_json_padrao) + "\n")
+            # O evento chega ao sistema operacional imediatamente (sobrevive a uma falha do
+            # processo); apenas o fsync, que o protege de uma queda do sistema, é feito em lotes
+            arquivo.flush()
+
+            self.eventos_desde_snapshot += 1
+            self._pendentes += 1
+            if self._pendentes >= self.eventos_por_fsync or \
+                    time.monotonic() - self._ultimo_fsync >= self.segundos_por_fsync:
+                self.sincronizar()
+            return self.eventos_desde_snapshot >= self.intervalo_snapshot
+
+    def sincronizar(self):
+        """
+        Grava no disco (flush + fsync) os eventos pendentes.
+        """
+        if self._arquivo is not None and self._pendentes:
+            os.fsync(self._arquivo.fileno())
+        self._pendentes = 0
+        self._ultimo_fsync = time.monotonic()
+
+    def gravar_snapshot(self, estado):
+        """
+        Grava o estado completo e reinicia o diário.
+
+        O snapshot é gravado em JSON, como os eventos, de forma atômica (arquivo temporário
+        + renomeação) e guarda o número do último evento que já contém; assim, se o processo for interrompido
+        antes de o diário ser reiniciado, os eventos antigos são ignorados na recuperação.
+
+        Args:
+            estado (dict | callable): Estado completo das ordens de controle, ou uma função
+                                      que o devolve (chamada com as gravações bloqueadas).
+        """
+        with self.trava:
+            if callable(estado):
+                estado = estado()
+            self.sincronizar()
+            caminho_temporario = self.caminho_snapshot + ".tmp"
+            with open(caminho_temporario, 'w', encoding='utf-8') as arquivo:
+                json.dump({'versao': VERSAO_DIARIO, 'seq': self.sequencia, 'estado': estado},
+                          arquivo, ensure_ascii=False, default=_json_padrao)
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+            os.replace(caminho_temporario, self.caminho_snapshot)
+
+            # Reinicia o diário: os eventos anteriores já estão no snapshot
+            self.fechar()
+            open(self.caminho_diario, 'w').close()
+            self.eventos_desde_snapshot = 0
+
+    def recuperar(self):
+        """
+        Lê o último snapshot e os eventos gravados depois dele.
+
+        Uma última linha incompleta (gravação interrompida) é descartada. Um snapshot
+        ilegível ou adulterado é ignorado (o estado devolvido é None).
+
+        Returns:
+            tuple: (estado do snapshot ou None, lista de eventos posteriores, em ordem).
+        """
+        estado, sequencia = None, 0
+        try:
+            with open(self.caminho_snapshot, 'r', encoding='utf-8') as arquivo:
+                snapshot = json.load(arquivo)
+            if snapshot.get('versao') == VERSAO_DIARIO:
+                if not isinstance(snapshot['seq'], int) or not isinstance(snapshot['estado'], dict):
+                    raise ValueError
+                estado, sequencia = snapshot['estado'], snapshot['seq']
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, AttributeError):
+            print(f"Erro: O snapshot do diário '{self.caminho_snapshot}' é inválido e foi ignorado.")
+
+        eventos = []
+        if os.path.exists(self.caminho_diario):
+            self.fechar()
+            with open(self.caminho_diario, 'rb+') as arquivo:
+                valido = 0  # Fim do último evento completo
+                for linha in arquivo:
+                    try:
+                        if not linha.endswith(b"\n"):
+                            raise ValueError
+                        registro = json.loads(linha)
+                    except ValueError:
+                        # Linha incompleta: o processo foi interrompido durante a gravação.
+                        # É removida para que os próximos eventos não fiquem depois dela.
+                        arquivo.truncate(valido)
+                        break
+                    valido += len(linha)
+                    if registro['seq'] > sequencia:
+                        eventos.append(registro)
+
+        self.sequencia = eventos[-1]['seq'] if eventos else sequencia
+        self.eventos_desde_snapshot = len(eventos)
+        return estado, eventos
+
+    def fechar(self):
+        """
+        Sincroniza os eventos pendentes e fecha o arquivo do diário.
+        """
+        self.sincronizar()
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+
+class TravasMateriais:
+    """
+    Conjunto fixo de travas distribuídas entre os materiais (lock striping).
+
+    Cada material é associado a uma das num_travas travas pelo hash do seu código,
+    de modo que operações sobre materiais diferentes raramente disputam a mesma
+    trava, sem uma trava por material.
+    """
+
+    def __init__(self, num_travas=64):
+        """
+        Args:
+            num_travas (int): Número de travas.
+        """
+        self._travas = [threading.Lock() for _ in range(num_travas)]
+
+    def __call__(self, material):
+        """
+        Devolve a trava de um material.
+        """
+        return self._travas[hash(material) % len(self._travas)]
+
+    @contextmanager
+    def varias(self, materiais):
+        """
+        Adquire as travas de vários materiais, sempre na mesma ordem (sem risco de deadlock).
+
+        Args:
+            materiais (iterable): Códigos dos materiais.
+        """
+        indices = sorted({hash(material) % len(self._travas) for material in materiais})
+        with ExitStack() as pilha:
+            for indice in indices:
+                pilha.enter_context(self._travas[indice])
+            yield
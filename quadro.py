@@ -0,0 +1,411 @@
+import numpy as np
+import pandas as pd
+from collections.abc import MutableMapping
+from datetime import date, datetime
+
+
+# Ordinal de 1970-01-01, para converter os dias ordinais em datetime64
+_ORDINAL_EPOCA = date(1970, 1, 1).toordinal()
+
+ESTOQUE_ATUAL = "Estoque Atual"
+
+
+def dia_ordinal(data):
+    """
+    Converte uma data no dia ordinal usado pelo quadro de planejamento.
+
+    Args:
+        data (str | date | datetime): Data no formato 'YYYY-MM-DD' ou objeto de data.
+
+    Returns:
+        int: Dia ordinal (date.toordinal()).
+
+    Raises:
+        ValueError: Se a data não puder ser interpretada.
+    """
+    if isinstance(data, datetime):
+        return data.date().toordinal()
+    if isinstance(data, date):
+        return data.toordinal()
+    if isinstance(data, str):
+        return datetime.strptime(data, '%Y-%m-%d').toordinal()
+    raise ValueError(f"Data inválida: {data!r}")
+
+
+def formatar_dias(dias):
+    """
+    Formata dias ordinais como datas 'YYYY-MM-DD' (vetorizado).
+
+    Args:
+        dias (ndarray): Dias ordinais.
+
+    Returns:
+        list: Datas formatadas.
+    """
+    dias = np.asarray(dias, dtype=np.int64)
+    return np.datetime_as_string((dias - _ORDINAL_EPOCA).astype('datetime64[D]')).tolist()
+
+
+def colunas_datas(colunas):
+    """
+    Seleciona as colunas de um quadro de planejamento que são datas de entrega.
+
+    Args:
+        colunas (iterable): Colunas do quadro (por exemplo, df.columns).
+
+    Returns:
+        list: Colunas que são datas, na ordem original; 'Material', 'Estoque Atual' e
+              demais colunas que não são datas são ignoradas.
+    """
+    datas = []
+    for coluna in colunas:
+        if coluna in ('Material', ESTOQUE_ATUAL):
+            continue
+        try:
+            dia_ordinal(coluna)
+            datas.append(coluna)
+        except ValueError:
+            # Ignora colunas que não são datas
+            pass
+    return datas
+
+
+def _escalar(valor):
+    """
+    Converte um valor do quadro em escalar Python (inteiro, quando não há parte fracionária).
+    """
+    valor = float(valor)
+    return int(valor) if valor.is_integer() else valor
+
+
+class LinhaQuadro(MutableMapping):
+    """
+    Visão de um material do quadro de planejamento, acessada como o antigo
+    dicionário {"Estoque Atual": ..., 'YYYY-MM-DD': quantidade, ...}.
+    """
+
+    __slots__ = ('_quadro', '_linha')
+
+    def __init__(self, quadro, linha):
+        self._quadro = quadro
+        self._linha = linha
+
+    def __getitem__(self, chave):
+        if chave == ESTOQUE_ATUAL:
+            return _escalar(self._quadro.estoque_atual[self._linha])
+        coluna = self._quadro.coluna(chave)
+        if coluna is None or np.isnan(self._quadro.quantidades[self._linha, coluna]):
+            raise KeyError(chave)
+        return _escalar(self._quadro.quantidades[self._linha, coluna])
+
+    def __setitem__(self, chave, valor):
+        self._quadro.definir(self._linha, chave, valor)
+
+    def __delitem__(self, chave):
+        if chave == ESTOQUE_ATUAL:
+            raise TypeError("Não é possível remover o estoque atual de uma linha do quadro.")
+        self[chave]  # KeyError se a data não estiver preenchida
+        self._quadro.quantidades[self._linha, self._quadro.coluna(chave)] = np.nan
+
+    def __iter__(self):
+        yield ESTOQUE_ATUAL
+        colunas = np.flatnonzero(~np.isnan(self._quadro.quantidades[self._linha]))
+        yield from formatar_dias(self._quadro.dias[colunas])
+
+    def __len__(self):
+        return 1 + int(np.count_nonzero(~np.isnan(self._quadro.quantidades[self._linha])))
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class QuadroPlanejamento(MutableMapping):
+    """
+    Quadro de planejamento em formato colunar: uma matriz densa material × dia
+    (NaN indica dia sem entrega), um índice ordenado de dias ordinais e o estoque
+    atual de cada material.
+
+    Comporta-se como o antigo dicionário material -> {"Estoque Atual": ...,
+    'YYYY-MM-DD': quantidade}; as datas só são formatadas na saída.
+    """
+
+    def __init__(self):
+        self.materiais = []
+        self.indice = {}
+        # Arrays com capacidade de reserva, ampliada geometricamente; as posições além
+        # dos materiais e dias em uso ficam com estoque 0 e quantidades NaN
+        self._estoque_atual = np.zeros(0, dtype=np.float64)
+        self._dias = np.zeros(0, dtype=np.int64)
+        self._quantidades = np.zeros((0, 0), dtype=np.float64)
+        self._num_dias = 0
+
+    @property
+    def estoque_atual(self):
+        """
+        Estoque atual de cada material (visão sobre a parte em uso).
+        """
+        return self._estoque_atual[:len(self.materiais)]
+
+    @property
+    def dias(self):
+        """
+        Dias ordinais das colunas, em ordem crescente (visão sobre a parte em uso).
+        """
+        return self._dias[:self._num_dias]
+
+    @property
+    def quantidades(self):
+        """
+        Matriz material × dia das quantidades (visão sobre a parte em uso).
+        """
+        return self._quantidades[:len(self.materiais), :self._num_dias]
+
+    @classmethod
+    def de_dataframe(cls, df, apenas_positivos=False):
+        """
+        Monta o quadro a partir de um DataFrame com as colunas 'Material', 'Estoque Atual'
+        e uma coluna por data ('YYYY-MM-DD'); colunas que não são datas são ignoradas.
+
+        Args:
+            df (DataFrame): Quadro de planejamento lido de um arquivo.
+            apenas_positivos (bool): Se True, descarta quantidades menores ou iguais a zero.
+
+        Returns:
+            QuadroPlanejamento: Quadro montado.
+        """
+        df = df.drop_duplicates('Material', keep='last')
+        colunas = colunas_datas(df.columns)
+        dias = [dia_ordinal(coluna) for coluna in colunas]
+
+        valores = np.array(df[colunas].apply(pd.to_numeric, errors='coerce'), dtype=np.float64)
+        if apenas_positivos:
+            valores[~(valores > 0)] = np.nan
+        materiais = df['Material'].tolist()
+        estoque = np.array(pd.to_numeric(df[ESTOQUE_ATUAL], errors='coerce'), dtype=np.float64) \
+            if ESTOQUE_ATUAL in df.columns else np.zeros(len(materiais))
+
+        quadro = cls()
+        quadro._garantir_materiais(materiais, dict(zip(materiais, estoque.tolist())))
+        quadro.lancar(np.repeat(np.arange(len(materiais)), len(dias)), np.tile(dias, len(materiais)),
+                      valores.ravel())
+        return quadro
+
+    def copiar(self):
+        """
+        Devolve uma cópia independente do quadro (sem a capacidade de reserva).
+        """
+        copia = QuadroPlanejamento()
+        copia.materiais = list(self.materiais)
+        copia.indice = dict(self.indice)
+        copia._estoque_atual = self.estoque_atual.copy()
+        copia._dias = self.dias.copy()
+        copia._quantidades = self.quantidades.copy()
+        copia._num_dias = self._num_dias
+        return copia
+
+    def _redimensionar(self, linhas=None, colunas=None):
+        """
+        Amplia a capacidade dos arrays, copiando apenas a parte em uso.
+        """
+        linhas = self._quantidades.shape[0] if linhas is None else linhas
+        colunas = self._quantidades.shape[1] if colunas is None else colunas
+        n, m = len(self.materiais), self._num_dias
+        estoque_atual = np.zeros(linhas, dtype=np.float64)
+        estoque_atual[:n] = self._estoque_atual[:n]
+        dias = np.zeros(colunas, dtype=np.int64)
+        dias[:m] = self._dias[:m]
+        quantidades = np.full((linhas, colunas), np.nan)
+        quantidades[:n, :m] = self._quantidades[:n, :m]
+        self._estoque_atual, self._dias, self._quantidades = estoque_atual, dias, quantidades
+
+    def _garantir_materiais(self, materiais, estoque_atual=None):
+        """
+        Inclui os materiais que ainda não estão no quadro e devolve as linhas de todos.
+
+        A capacidade de linhas dobra quando se esgota, de modo que incluir materiais
+        um a um custa tempo constante amortizado.
+        """
+        novos = [material for material in dict.fromkeys(materiais) if material not in self.indice]
+        if novos:
+            n = len(self.materiais)
+            total = n + len(novos)
+            if total > len(self._estoque_atual):
+                self._redimensionar(linhas=max(total, 2 * len(self._estoque_atual)))
+            for material in novos:
+                self.indice[material] = len(self.materiais)
+                self.materiais.append(material)
+            estoque_atual = estoque_atual or {}
+            self._estoque_atual[n:total] = [estoque_atual.get(material, 0) for material in novos]
+        return np.fromiter((self.indice[material] for material in materiais), dtype=np.int64, count=len(materiais))
+
+    def _garantir_dias(self, dias):
+        """
+        Inclui os dias que ainda não estão no índice (mantendo-o ordenado) e devolve suas colunas.
+
+        A capacidade de colunas dobra quando se esgota. Dias posteriores aos já existentes
+        ocupam as colunas livres sem mover dados; dias intercalados deslocam as colunas
+        existentes dentro da própria matriz.
+        """
+        dias = np.asarray(dias, dtype=np.int64)
+        m = self._num_dias
+        novos = np.setdiff1d(dias, self._dias[:m])
+        if len(novos):
+            total = m + len(novos)
+            if total > len(self._dias):
+                self._redimensionar(colunas=max(total, 2 * len(self._dias)))
+            if m and novos[0] < self._dias[m - 1]:
+                n = len(self.materiais)
+                todos = np.union1d(self._dias[:m], novos)
+                self._quantidades[:n, np.searchsorted(todos, self._dias[:m])] = self._quantidades[:n, :m].copy()
+                self._quantidades[:n, np.searchsorted(todos, novos)] = np.nan
+                self._dias[:total] = todos
+            else:
+                self._dias[m:total] = novos
+            self._num_dias = total
+        return np.searchsorted(self.dias, dias)
+
+    def lancar(self, materiais, dias, quantidades, estoque_atual=None):
+        """
+        Lança várias entregas no quadro de uma só vez.
+
+        Materiais e dias novos são incluídos no quadro; quantidades NaN são ignoradas.
+        Se o mesmo material e dia aparecerem mais de uma vez, prevalece o último lançamento.
+
+        Args:
+            materiais (list | ndarray): Material de cada entrega (códigos, ou linhas do quadro
+                                        se for um array de inteiros).
+            dias (ndarray): Dia ordinal de cada entrega.
+            quantidades (ndarray): Quantidade de cada entrega.
+            estoque_atual (dict, opcional): Estoque atual dos materiais novos.
+        """
+        quantidades = np.asarray(quantidades, dtype=np.float64)
+        validas = ~np.isnan(quantidades)
+        if isinstance(materiais, np.ndarray) and materiais.dtype.kind == 'i':
+            linhas = materiais[validas]
+        else:
+            linhas = self._garantir_materiais(materiais, estoque_atual)[validas]
+        colunas = self._garantir_dias(np.asarray(dias, dtype=np.int64)[validas])
+
+        # Mantém apenas o último lançamento de cada célula
+        celulas = linhas * len(self.dias) + colunas
+        _, ultimos = np.unique(celulas[::-1], return_index=True)
+        ultimos = len(celulas) - 1 - ultimos
+        self.quantidades[linhas[ultimos], colunas[ultimos]] = quantidades[validas][ultimos]
+
+    def remover(self, material, data):
+        """
+        Remove a entrega de um material em uma data, se houver.
+
+        Args:
+            material (str): Código do material.
+            data (str | date | int): Data da entrega ('YYYY-MM-DD', date ou dia ordinal).
+        """
+        coluna = self.coluna(data)
+        if material in self.indice and coluna is not None:
+            self.quantidades[self.indice[material], coluna] = np.nan
+
+    def colunas_ativas(self):
+        """
+        Devolve a máscara dos dias que têm ao menos uma entrega.
+        """
+        return ~np.isnan(self.quantidades).all(axis=0) if len(self.materiais) else np.zeros(len(self.dias), bool)
+
+    def datas(self):
+        """
+        Devolve as datas ('YYYY-MM-DD') dos dias com entregas, em ordem crescente.
+        """
+        return formatar_dias(self.dias[self.colunas_ativas()])
+
+    def linhas(self, vazio="", materiais=None, bloco=1024):
+        """
+        Gera as linhas do quadro para impressão ou exportação: [material, estoque atual,
+        quantidade em cada data de datas()].
+
+        A conversão para valores Python é feita sobre blocos de linhas da matriz, de modo
+        que as primeiras linhas ficam disponíveis sem converter o quadro inteiro.
+
+        Args:
+            vazio: Valor usado nos dias sem entrega.
+            materiais (list, opcional): Materiais a incluir, na ordem desejada. Se não
+                                        fornecido, usa todos os materiais do quadro.
+            bloco (int): Número de linhas convertidas de cada vez.
+        """
+        linhas = np.arange(len(self.materiais)) if materiais is None else \
+            np.array([self.indice[material] for material in materiais], dtype=np.int64)
+        colunas = np.flatnonzero(self.colunas_ativas())
+        for inicio in range(0, len(linhas), bloco):
+            trecho = linhas[inicio:inicio + bloco]
+            tabela = self._valores(self.quantidades[np.ix_(trecho, colunas)], vazio).tolist()
+            estoque = self._valores(self.estoque_atual[trecho], vazio).tolist()
+            for i, linha in enumerate(trecho.tolist()):
+                yield [self.materiais[linha], estoque[i]] + tabela[i]
+
+    @staticmethod
+    def _valores(quantidades, vazio):
+        """
+        Converte um array de quantidades em um array de objetos Python (inteiros quando
+        possível), com o valor vazio nas posições NaN.
+        """
+        preenchidos = ~np.isnan(quantidades)
+        valores = quantidades[preenchidos]
+        objetos = valores.astype(object)
+        inteiros = valores == np.floor(valores)
+        objetos[inteiros] = valores[inteiros].astype(np.int64).astype(object)
+        resultado = np.full(quantidades.shape, vazio, dtype=object)
+        resultado[preenchidos] = objetos
+        return resultado
+
+    def coluna(self, data):
+        """
+        Devolve a coluna de uma data ('YYYY-MM-DD', date ou dia ordinal), ou None se não houver.
+        """
+        try:
+            dia = data if isinstance(data, (int, np.integer)) else dia_ordinal(data)
+        except ValueError:
+            return None
+        coluna = int(np.searchsorted(self.dias, dia))
+        return coluna if coluna < len(self.dias) and self.dias[coluna] == dia else None
+
+    def definir(self, linha, chave, valor):
+        """
+        Altera o estoque atual ou a quantidade de uma data em uma linha do quadro.
+        """
+        valor = np.nan if valor is None else valor
+        if chave == ESTOQUE_ATUAL:
+            self.estoque_atual[linha] = valor
+        else:
+            coluna = self._garantir_dias([dia_ordinal(chave)])[0]
+            self.quantidades[linha, coluna] = valor
+
+    def __getitem__(self, material):
+        return LinhaQuadro(self, self.indice[material])
+
+    def __setitem__(self, material, registro):
+        linha = self._garantir_materiais([material])[0]
+        self.quantidades[linha] = np.nan
+        self.estoque_atual[linha] = 0
+        for chave, valor in registro.items():
+            self.definir(linha, chave, valor)
+
+    def __delitem__(self, material):
+        linha = self.indice.pop(material)
+        del self.materiais[linha]
+        # Sobe as linhas seguintes e devolve a última à capacidade livre
+        n = len(self.materiais)
+        self._estoque_atual[linha:n] = self._estoque_atual[linha + 1:n + 1].copy()
+        self._estoque_atual[n] = 0
+        self._quantidades[linha:n] = self._quantidades[linha + 1:n + 1].copy()
+        self._quantidades[n] = np.nan
+        self.indice = {material: i for i, material in enumerate(self.materiais)}
+
+    def __iter__(self):
+        return iter(self.materiais)
+
+    def __len__(self):
+        return len(self.materiais)
+
+    def __contains__(self, material):
+        return material in self.indice
+
+    def __repr__(self):
+        return f"QuadroPlanejamento({len(self.materiais)} materiais × {len(self.dias)} dias)"
@@ -0,0 +1,420 @@
+import asyncio
+import copy
+import json
+import multiprocessing
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import nullcontext
+from urllib.parse import urlsplit, parse_qs
+from mrp import MRP
+from ordens import _json_padrao
+
+
+MOTIVOS_HTTP = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                409: "Conflict", 413: "Content Too Large", 500: "Internal Server Error"}
+
+# Tamanho máximo, em bytes, do corpo de uma requisição
+TAMANHO_MAXIMO_CORPO = 1 << 20
+
+# MRP de cada processo do pool de planejamento (modo com processos)
+_mrp_trabalhador = None
+
+
+def _iniciar_trabalhador(pasta_arquivos, formato_entrada):
+    """
+    Inicializa o MRP de um processo do pool de planejamento a partir dos arquivos de entrada.
+    """
+    global _mrp_trabalhador
+    _mrp_trabalhador = MRP(pasta_arquivos, formato_entrada)
+    _mrp_trabalhador.inicializar_dados()
+
+
+def _planejar_trabalhador(demanda):
+    """
+    Planeja uma demanda no MRP do processo do pool.
+    """
+    return _planejar(_mrp_trabalhador, demanda)
+
+
+def _planejar(mrp, demanda):
+    """
+    Avalia uma demanda sem alterar o estado do MRP.
+
+    Returns:
+        dict: Quantidades, custo e lead time esperados dos materiais a produzir ou adquirir,
+              e os totais da demanda.
+    """
+    produtos = list(demanda)
+    resultado = mrp.planejar_cenarios(np.array([list(demanda.values())]), produtos)
+    if resultado is None:
+        raise ValueError("Os dados do MRP não foram inicializados ou a demanda é inválida.")
+
+    ordens = {}
+    for i, material in enumerate(resultado['materiais']):
+        producao = resultado['producao'][0, i]
+        aquisicao = resultado['aquisicao'][0, i]
+        if producao > 0 or aquisicao > 0:
+            ordens[material] = {'Produção': producao, 'Aquisição': aquisicao,
+                                'Custo Esperado': resultado['custo'][0, i],
+                                'Leadtime Esperado': resultado['leadtime'][0, i]}
+    return {'ordens': ordens, 'custo_total': resultado['custo_total'][0],
+            'leadtime_total': resultado['leadtime_total'][0]}
+
+
+class ErroRequisicao(Exception):
+    """
+    Erro de uma requisição ao serviço, com o status HTTP da resposta.
+    """
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class ServicoPlanejamento:
+    """
+    Serviço local (HTTP sobre loopback ou socket Unix) que mantém um MRP e, opcionalmente,
+    um CRP inicializados em memória.
+
+    Rotas (corpos e respostas em JSON):
+        GET  /estado                 Estado do MRP e número de ordens de controle.
+        POST /planejar               Avalia uma demanda ({"demanda": {"ETF": 10}}) sem alterar
+                                     o estado do MRP.
+        GET  /ordens                 Materiais das ordens de controle (?status=&tipo=&editaveis=1).
+        POST /ordens/status          Atualiza status em lote ({"atualizacoes": [["ETF", "Pronta"]],
+                                     "atomico": false}).
+        POST /ordens/editar          Edita uma ordem ({"material", "tipo", "quantidade"}).
+        POST /ordens/cancelar        Cancela uma ordem ({"material"}).
+        GET  /capacidade             Demanda e capacidade disponível por operação (?data=YYYY-MM-DD).
+
+    Os planejamentos, que usam a CPU, são executados em um pool de trabalhadores fora do
+    laço de eventos; requisições idênticas simultâneas de planejamento compartilham uma
+    única execução.
+
+    As operações sobre ordens também rodam fora do laço de eventos. Se o modo concorrente
+    do MRP estiver ativo (mrp.ativar_concorrencia()), operações sobre materiais diferentes
+    seguem em paralelo; caso contrário, o serviço as executa uma de cada vez.
+    """
+
+    def __init__(self, mrp, crp=None, max_workers=None, usar_processos=False):
+        """
+        Args:
+            mrp (MRP): MRP já inicializado.
+            crp (CRP, opcional): CRP com a demanda e a capacidade dos recursos carregadas.
+            max_workers (int, opcional): Número máximo de planejamentos simultâneos.
+            usar_processos (bool): Se True, planeja em um pool de processos, cada um com o MRP
+                                   inicializado a partir dos arquivos de entrada (sem as
+                                   alterações feitas em memória depois da inicialização).
+        """
+        self.mrp = mrp
+        self.crp = crp
+        if usar_processos:
+            # Os processos são criados sob demanda, com threads já em execução: "spawn" evita
+            # herdar travas adquiridas por essas threads (fork)
+            self.executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_iniciar_trabalhador,
+                                                initargs=(mrp.pasta_arquivos, mrp.formato_entrada),
+                                                mp_context=multiprocessing.get_context("spawn"))
+            self._funcao_planejar = _planejar_trabalhador
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=max_workers)
+            self._funcao_planejar = lambda demanda: _planejar(self.mrp, demanda)
+        self.planejamentos_executados = 0
+        self._em_andamento = {}
+        self._servidor = None
+        self._rotas = {
+            ('GET', '/estado'): self._rota_estado,
+            ('POST', '/planejar'): self._rota_planejar,
+            ('GET', '/ordens'): self._rota_ordens,
+            ('POST', '/ordens/status'): self._rota_status,
+            ('POST', '/ordens/editar'): self._rota_editar,
+            ('POST', '/ordens/cancelar'): self._rota_cancelar,
+            ('GET', '/capacidade'): self._rota_capacidade,
+        }
+
+        # As operações sobre ordens chegam de várias conexões ao mesmo tempo: sem as travas
+        # por material do MRP, são serializadas por uma trava do serviço
+        self._trava_ordens = threading.Lock() if mrp.travas is None else nullcontext()
+        # Compila as BOMs antes do primeiro planejamento
+        if getattr(mrp, 'estado', None) is not None:
+            mrp.compilar_matriz_bom()
+
+    async def iniciar(self, host="127.0.0.1", porta=8765, caminho_socket=None):
+        """
+        Começa a aceitar conexões.
+
+        Args:
+            host (str): Endereço em que o serviço escuta.
+            porta (int): Porta TCP (0 escolhe uma porta livre).
+            caminho_socket (str, opcional): Caminho de um socket Unix, usado no lugar de host e porta.
+
+        Returns:
+            asyncio.Server: Servidor iniciado.
+        """
+        if caminho_socket:
+            self._servidor = await asyncio.start_unix_server(self._atender, path=caminho_socket)
+        else:
+            self._servidor = await asyncio.start_server(self._atender, host, porta)
+        return self._servidor
+
+    @property
+    def endereco(self):
+        """
+        Endereço em que o serviço está escutando.
+        """
+        return self._servidor.sockets[0].getsockname()
+
+    async def fechar(self):
+        """
+        Para de aceitar conexões e encerra o pool de planejamento.
+        """
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        self.executor.shutdown(wait=True)
+
+    async def planejar(self, demanda):
+        """
+        Avalia uma demanda no pool de planejamento, compartilhando a execução com as
+        requisições idênticas que estiverem em andamento.
+
+        Args:
+            demanda (dict): Quantidades demandadas por produto final.
+
+        Returns:
+            dict: Resultado do planejamento (ordens, custo_total e leadtime_total).
+        """
+        chave = json.dumps(demanda, sort_keys=True)
+        execucao = self._em_andamento.get(chave)
+        if execucao is None:
+            execucao = asyncio.get_running_loop().run_in_executor(self.executor, self._funcao_planejar, demanda)
+            self._em_andamento[chave] = execucao
+            execucao.add_done_callback(lambda _: self._em_andamento.pop(chave, None))
+            self.planejamentos_executados += 1
+        # Uma requisição cancelada não cancela a execução compartilhada
+        return await asyncio.shield(execucao)
+
+    async def _atender(self, reader, writer):
+        """
+        Atende as requisições HTTP/1.1 de uma conexão (com keep-alive).
+        """
+        try:
+            while True:
+                try:
+                    requisicao = await self._ler_requisicao(reader)
+                except ErroRequisicao as e:
+                    # O restante da requisição não pode ser separado da próxima: responde e fecha
+                    await self._responder(writer, e.status, {'erro': str(e)}, fechar=True)
+                    break
+                if requisicao is None:
+                    break
+                linha, cabecalhos, corpo = requisicao
+
+                try:
+                    metodo, alvo, _ = linha.decode('latin-1').split(' ', 2)
+                    status, resposta = 200, await self._despachar(metodo, alvo, corpo)
+                except ErroRequisicao as e:
+                    status, resposta = e.status, {'erro': str(e)}
+                except ValueError as e:
+                    status, resposta = 400, {'erro': str(e)}
+                except Exception as e:
+                    status, resposta = 500, {'erro': str(e)}
+
+                fechar = cabecalhos.get('connection', '').lower() == 'close'
+                await self._responder(writer, status, resposta, fechar)
+                if fechar:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _ler_requisicao(reader):
+        """
+        Lê a linha de requisição, os cabeçalhos e o corpo de uma requisição.
+
+        Returns:
+            tuple: (linha, cabecalhos, corpo), ou None se a conexão foi encerrada.
+
+        Raises:
+            ErroRequisicao: 400 se uma linha for longa demais ou o Content-Length for
+                            inválido; 413 se o corpo passar de TAMANHO_MAXIMO_CORPO.
+        """
+        try:
+            linha = await reader.readline()
+            if not linha:
+                return None
+            cabecalhos = {}
+            while True:
+                cabecalho = await reader.readline()
+                if cabecalho in (b'\r\n', b'\n', b''):
+                    break
+                nome, _, valor = cabecalho.decode('latin-1').partition(':')
+                cabecalhos[nome.strip().lower()] = valor.strip()
+        except ValueError:
+            # StreamReader.readline sinaliza linhas acima do limite do buffer com ValueError
+            raise ErroRequisicao(400, "Linha de requisição ou cabeçalho longo demais.")
+
+        tamanho = cabecalhos.get('content-length', '') or '0'
+        if not (tamanho.isascii() and tamanho.isdigit()):
+            raise ErroRequisicao(400, f"Content-Length inválido: {tamanho!r}.")
+        if int(tamanho) > TAMANHO_MAXIMO_CORPO:
+            raise ErroRequisicao(413, f"O corpo da requisição passa de {TAMANHO_MAXIMO_CORPO} bytes.")
+        return linha, cabecalhos, await reader.readexactly(int(tamanho))
+
+    @staticmethod
+    async def _responder(writer, status, resposta, fechar):
+        """
+        Envia uma resposta JSON.
+        """
+        dados = json.dumps(resposta, default=_json_padrao, ensure_ascii=False).encode('utf-8')
+        writer.write((f"HTTP/1.1 {status} {MOTIVOS_HTTP[status]}\r\n"
+                      f"Content-Type: application/json; charset=utf-8\r\n"
+                      f"Content-Length: {len(dados)}\r\n"
+                      f"Connection: {'close' if fechar else 'keep-alive'}\r\n\r\n").encode('latin-1') + dados)
+        await writer.drain()
+
+    async def _despachar(self, metodo, alvo, corpo):
+        """
+        Encaminha uma requisição para a rota correspondente.
+        """
+        url = urlsplit(alvo)
+        rota = self._rotas.get((metodo, url.path))
+        if rota is None:
+            if any(caminho == url.path for _, caminho in self._rotas):
+                raise ErroRequisicao(405, f"Método {metodo} não permitido em {url.path}.")
+            raise ErroRequisicao(404, f"Rota {url.path} não encontrada.")
+
+        parametros = {nome: valores[-1] for nome, valores in parse_qs(url.query).items()}
+        if corpo:
+            try:
+                parametros.update(json.loads(corpo))
+            except json.JSONDecodeError as e:
+                raise ErroRequisicao(400, f"Corpo JSON inválido: {e}")
+        return await rota(parametros)
+
+    def _exigir_execucao(self):
+        """
+        Verifica se o MRP está em execução (pré-condição das rotas de ordens).
+        """
+        if getattr(self.mrp, 'estado', None) != "Em Execução":
+            raise ErroRequisicao(409, "O MRP não está em execução.")
+
+    async def _executar_ordem(self, funcao, *argumentos):
+        """
+        Executa uma operação sobre ordens em uma thread, fora do laço de eventos.
+        """
+        def executar():
+            with self._trava_ordens:
+                return funcao(*argumentos)
+
+        return await asyncio.to_thread(executar)
+
+    async def _rota_estado(self, parametros):
+        ordens_controle = getattr(self.mrp, 'ordens_controle', None)
+        return {'estado': getattr(self.mrp, 'estado', "Não Inicializado"),
+                'ordens': len(ordens_controle) if ordens_controle is not None else 0,
+                'planejamentos_executados': self.planejamentos_executados}
+
+    async def _rota_planejar(self, parametros):
+        demanda = parametros.get('demanda')
+        if not isinstance(demanda, dict) or not demanda \
+                or not all(isinstance(quantidade, (int, float)) for quantidade in demanda.values()):
+            raise ErroRequisicao(400, "Informe a demanda como {\"produto\": quantidade}.")
+        return await self.planejar(demanda)
+
+    async def _rota_ordens(self, parametros):
+        self._exigir_execucao()
+        editaveis = str(parametros.get('editaveis', '')).lower() in ('1', 'true', 'sim')
+        return {'materiais': self.mrp.consultar_ordens(status=parametros.get('status'),
+                                                       tipo=parametros.get('tipo'), editaveis=editaveis)}
+
+    async def _rota_status(self, parametros):
+        self._exigir_execucao()
+        atualizacoes = parametros.get('atualizacoes')
+        if not isinstance(atualizacoes, list) or not all(isinstance(a, list) and len(a) == 2 for a in atualizacoes):
+            raise ErroRequisicao(400, "Informe as atualizações como [[material, status], ...].")
+        # As operações sobre ordens usam as travas dos materiais e o diário: ficam fora do laço
+        return await self._executar_ordem(self.mrp.atualizar_status_ordens, [tuple(a) for a in atualizacoes],
+                                          bool(parametros.get('atomico', False)))
+
+    async def _rota_editar(self, parametros):
+        self._exigir_execucao()
+        try:
+            argumentos = (parametros['material'], parametros['tipo'], parametros['quantidade'])
+        except KeyError as e:
+            raise ErroRequisicao(400, f"Parâmetro obrigatório ausente: {e.args[0]}.")
+        if not await self._executar_ordem(self.mrp.editar_ordem, *argumentos):
+            raise ErroRequisicao(409, f"A ordem de '{argumentos[0]}' não pôde ser editada.")
+        return {'sucesso': True, 'ordem': dict(self.mrp.ordens_controle[argumentos[0]])}
+
+    async def _rota_cancelar(self, parametros):
+        self._exigir_execucao()
+        if 'material' not in parametros:
+            raise ErroRequisicao(400, "Parâmetro obrigatório ausente: material.")
+        if not await self._executar_ordem(self.mrp.cancelar_ordem, parametros['material']):
+            raise ErroRequisicao(409, f"A ordem de '{parametros['material']}' não pôde ser cancelada.")
+        return {'sucesso': True}
+
+    async def _rota_capacidade(self, parametros):
+        if self.crp is None:
+            raise ErroRequisicao(409, "O serviço não tem um CRP configurado.")
+        demanda, capacidade = await asyncio.to_thread(self._calcular_capacidade, parametros.get('data'))
+        if demanda is None or capacidade is None:
+            raise ErroRequisicao(409, "A demanda ou a capacidade dos recursos não foram carregadas no CRP.")
+        operacoes = dict.fromkeys(list(demanda) + list(capacidade))
+        return {'data': parametros.get('data'),
+                'operacoes': {operacao: {'demanda': sum(demanda.get(operacao, {}).values()),
+                                         'capacidade': capacidade.get(operacao, 0)}
+                              for operacao in operacoes}}
+
+    def _calcular_capacidade(self, data):
+        """
+        Calcula a demanda por operação e a capacidade disponível em uma data.
+
+        O CRP usa uma cópia do quadro de planejamento em memória (sem exportá-lo para
+        uma planilha), tirada sob a trava das ordens, e cada requisição trabalha em uma
+        cópia rasa do CRP, de modo que requisições simultâneas não se interferem.
+        """
+        crp = copy.copy(self.crp)
+        with self._trava_ordens:
+            if len(self.mrp.planejamento) > 0:
+                crp.planejamento_mrp = self.mrp.planejamento.copiar()
+        return crp.calcular_demanda_por_operacao(), crp.capacidade_disponivel(data)
+
+
+async def executar_servico(pasta_arquivos, host="127.0.0.1", porta=8765, caminho_socket=None,
+                           max_workers=None, usar_processos=False):
+    """
+    Inicializa o MRP da pasta de arquivos e atende requisições até ser interrompido.
+    """
+    mrp = MRP(pasta_arquivos)
+    if not mrp.inicializar_dados():
+        return
+    mrp.ativar_concorrencia()
+    servico = ServicoPlanejamento(mrp, max_workers=max_workers, usar_processos=usar_processos)
+    servidor = await servico.iniciar(host, porta, caminho_socket)
+    print(f"Serviço de planejamento escutando em {servico.endereco}")
+    try:
+        await servidor.serve_forever()
+    finally:
+        await servico.fechar()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serviço local de planejamento MRP")
+    parser.add_argument("pasta_arquivos", help="Pasta com os arquivos de entrada do MRP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--socket", dest="caminho_socket", help="Caminho de um socket Unix")
+    parser.add_argument("--trabalhadores", dest="max_workers", type=int)
+    parser.add_argument("--processos", dest="usar_processos", action="store_true",
+                        help="Planeja em um pool de processos em vez de threads")
+    argumentos = parser.parse_args()
+    try:
+        asyncio.run(executar_servico(**vars(argumentos)))
+    except KeyboardInterrupt:
+        pass
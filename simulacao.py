@@ -0,0 +1,161 @@
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+
+
+# Coeficientes de variação padrão (desvio padrão / média) dos custos e lead times
+CV_CUSTO_PADRAO = 0.1
+CV_LEADTIME_PADRAO = 0.2
+
+# Modelo de cada processo do pool de simulação (recebido uma única vez, na inicialização)
+_modelo_trabalhador = None
+
+
+def _amostrar_lognormal(gerador, medias, cvs, num_amostras):
+    """
+    Sorteia valores log-normais com a média e o coeficiente de variação de cada material.
+
+    Materiais com média não positiva valem 0 e materiais com coeficiente de variação
+    nulo valem exatamente a média.
+
+    Returns:
+        ndarray: Amostras com forma (num_amostras, materiais).
+    """
+    positivas = medias > 0
+    sigma = np.sqrt(np.log1p(np.square(cvs)))
+    mu = np.log(np.where(positivas, medias, 1)) - np.square(sigma) / 2
+    amostras = np.exp(mu + sigma * gerador.standard_normal((num_amostras, len(medias))))
+    return np.where(positivas, np.where(sigma > 0, amostras, medias), 0)
+
+
+def _simular_bloco(modelo, semente, num_amostras):
+    """
+    Simula um bloco de sorteios do custo total e do lead time total do plano.
+
+    Args:
+        modelo (dict): Modelo montado por montar_modelo.
+        semente (SeedSequence): Semente do bloco.
+        num_amostras (int): Número de sorteios do bloco.
+
+    Returns:
+        tuple: Arrays (custos, leadtimes) com num_amostras valores cada.
+    """
+    gerador = np.random.default_rng(semente)
+    matriz = modelo['matriz']
+    n = len(matriz)
+
+    # Lead time acumulado (caminho crítico) de cada material, nível a nível, de baixo para cima
+    leadtimes = _amostrar_lognormal(gerador, modelo['leadtime'], modelo['cv_leadtime'], num_amostras)
+    acumulados = leadtimes.copy()
+    for nivel in reversed(range(matriz.num_niveis)):
+        acumulados[:, :n] += matriz.maximo_componentes(acumulados[:, :n], nivel)
+
+    # Custos apenas dos materiais com ordens (mesmas regras de calcular_fc_lt_esperados)
+    ordenados = modelo['ordenados']
+    custos_unitarios = _amostrar_lognormal(gerador, modelo['custo_unitario'][ordenados],
+                                           modelo['cv_custo'][ordenados], num_amostras)
+    producao = modelo['producao'][ordenados]
+    aquisicao = modelo['aquisicao'][ordenados]
+    adquiridos = aquisicao > 0
+    custos = np.where(adquiridos, custos_unitarios * aquisicao + modelo['frete_lote'][ordenados],
+                      custos_unitarios * producao)
+    leadtimes_ordens = np.where(adquiridos, leadtimes[:, ordenados], acumulados[:, ordenados])
+
+    return custos.sum(axis=1), leadtimes_ordens.max(axis=1, initial=0)
+
+
+def _iniciar_trabalhador(modelo):
+    """
+    Guarda o modelo no processo do pool de simulação.
+    """
+    global _modelo_trabalhador
+    _modelo_trabalhador = modelo
+
+
+def _simular_bloco_trabalhador(semente, num_amostras):
+    """
+    Simula um bloco com o modelo do processo do pool.
+    """
+    return _simular_bloco(_modelo_trabalhador, semente, num_amostras)
+
+
+def montar_modelo(matriz, materiais, producao, aquisicao, custo_unitario, frete_lote, leadtime,
+                  cv_custo=CV_CUSTO_PADRAO, cv_leadtime=CV_LEADTIME_PADRAO):
+    """
+    Monta o modelo de incerteza do plano, com um valor por material em cada array.
+
+    Os materiais das BOMs vêm primeiro, na ordem da matriz; produtos fora das BOMs vêm depois.
+
+    Args:
+        matriz (MatrizBOM): BOMs compiladas.
+        materiais (list): Materiais do modelo (matriz.materiais seguidos dos demais).
+        producao, aquisicao (ndarray): Quantidades a produzir e a adquirir.
+        custo_unitario (ndarray): Custo unitário médio (com imposto).
+        frete_lote (ndarray): Frete médio por lote.
+        leadtime (ndarray): Lead time médio.
+        cv_custo, cv_leadtime (float | ndarray): Coeficiente de variação dos custos e dos lead times.
+
+    Returns:
+        dict: Modelo usado por simular.
+    """
+    forma = len(materiais)
+    producao = np.asarray(producao, dtype=np.float64)
+    aquisicao = np.asarray(aquisicao, dtype=np.float64)
+    return {
+        'matriz': matriz,
+        'materiais': materiais,
+        'producao': producao,
+        'aquisicao': aquisicao,
+        'custo_unitario': np.asarray(custo_unitario, dtype=np.float64),
+        'frete_lote': np.asarray(frete_lote, dtype=np.float64),
+        'leadtime': np.asarray(leadtime, dtype=np.float64),
+        'cv_custo': np.broadcast_to(np.asarray(cv_custo, dtype=np.float64), forma),
+        'cv_leadtime': np.broadcast_to(np.asarray(cv_leadtime, dtype=np.float64), forma),
+        'ordenados': np.flatnonzero((producao > 0) | (aquisicao > 0)),
+    }
+
+
+def simular(modelo, num_amostras=100000, semente=None, tamanho_bloco=10000, max_workers=None,
+            usar_processos=True):
+    """
+    Sorteia o custo total e o lead time total do plano.
+
+    Os sorteios são divididos em blocos de tamanho fixo, cada um com a sua semente
+    derivada (SeedSequence.spawn) da semente informada, e os blocos são simulados em
+    paralelo. Como a divisão não depende do número de trabalhadores, a mesma semente
+    produz sempre os mesmos sorteios.
+
+    Args:
+        modelo (dict): Modelo montado por montar_modelo.
+        num_amostras (int): Número de sorteios.
+        semente (int, opcional): Semente dos sorteios. Se não fornecida, os sorteios não
+                                 são reproduzíveis.
+        tamanho_bloco (int): Número de sorteios de cada bloco (limita a memória por trabalhador).
+        max_workers (int, opcional): Número máximo de blocos simulados ao mesmo tempo.
+        usar_processos (bool): Se True, simula os blocos em um pool de processos em vez de
+                               um pool de threads.
+
+    Returns:
+        tuple: Arrays (custos, leadtimes) com num_amostras valores cada.
+    """
+    tamanhos = [tamanho_bloco] * (num_amostras // tamanho_bloco)
+    if num_amostras % tamanho_bloco:
+        tamanhos.append(num_amostras % tamanho_bloco)
+    sementes = np.random.SeedSequence(semente).spawn(len(tamanhos))
+
+    if len(tamanhos) <= 1:
+        resultados = [_simular_bloco(modelo, semente_bloco, tamanho)
+                      for semente_bloco, tamanho in zip(sementes, tamanhos)]
+    elif usar_processos:
+        # O modelo é enviado uma vez a cada processo, e não junto com cada bloco
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_iniciar_trabalhador,
+                                 initargs=(modelo,)) as executor:
+            resultados = list(executor.map(_simular_bloco_trabalhador, sementes, tamanhos))
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            resultados = list(executor.map(partial(_simular_bloco, modelo), sementes, tamanhos))
+
+    if not resultados:
+        return np.zeros(0), np.zeros(0)
+    return (np.concatenate([custos for custos, _ in resultados]),
+            np.concatenate([leadtimes for _, leadtimes in resultados]))
@@ -0,0 +1,108 @@
+import unittest
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from armazenamento import ArmazenamentoSQLite
+from estoque import EstoqueColunar
+from ordens import OrdemPlanejada, OrdemControle, OrdensControle
+from quadro import QuadroPlanejamento
+
+
+class TestArmazenamentoSQLite(unittest.TestCase):
+    """
+    Classe de teste do armazenamento SQLite.
+    """
+
+    def setUp(self):
+        """
+        Cria um banco SQLite vazio em uma pasta de testes.
+        """
+        self.pasta_testes = "test_data_armazenamento"
+        if not os.path.exists(self.pasta_testes):
+            os.makedirs(self.pasta_testes)
+        self.caminho = os.path.join(self.pasta_testes, "mrp.db")
+        self.armazenamento = ArmazenamentoSQLite(self.caminho)
+
+    def tearDown(self):
+        """
+        Fecha o banco e remove a pasta de testes.
+        """
+        self.armazenamento.fechar()
+        for arquivo in os.listdir(self.pasta_testes):
+            os.remove(os.path.join(self.pasta_testes, arquivo))
+        os.rmdir(self.pasta_testes)
+
+    def test_modo_wal(self):
+        """
+        Testa se o banco é aberto em modo WAL.
+        """
+        modo = self.armazenamento.conexao.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(modo, "wal")
+
+    def test_estoque(self):
+        """
+        Testa a gravação e a leitura (completa e parcial) do estoque.
+        """
+        estoque = EstoqueColunar.de_dataframe(pd.DataFrame([
+            ["ETF", 0, 5, 100, 0, 0, 5],
+            ["DAQ", 10, 10, 11.5, 2, 6, 11],
+        ], columns=["Material", "Em Estoque", "Minimo", "Custo Medio Unitario", "Imposto Medio Unitario",
+                    "Frete Medio Lote", "Leadtime Medio Lote"]))
+        self.armazenamento.gravar_estoque(estoque)
+
+        lido = self.armazenamento.ler_estoque()
+        self.assertEqual(lido.codigos, ["ETF", "DAQ"])
+        self.assertEqual(lido["DAQ"]["custo_medio_unitario"], 11.5)
+        self.assertIsInstance(lido["ETF"]["em_estoque"], int)
+        self.assertEqual(self.armazenamento.ler_estoque(["DAQ"]).codigos, ["DAQ"])
+
+    def test_registros(self):
+        """
+        Testa os upserts em lote e as consultas das ordens.
+        """
+        self.armazenamento.gravar_registros('ordens_planejamento', {
+            "ETF": OrdemPlanejada(producao=np.int64(10), aquisicao=0),
+            "DAQ": {"Aquisição": 5},
+        })
+        self.armazenamento.gravar_registros('ordens_planejamento', {"ETF": {"Produção": 7}, "JOKER": {"Produção": 1}})
+        ordens = self.armazenamento.ler_registros('ordens_planejamento')
+        # Escalares numpy são convertidos na gravação, sem adaptadores globais no sqlite3
+        self.assertNotIn((np.int64, sqlite3.PrepareProtocol), sqlite3.adapters)
+        # Materiais novos vão para o final; os existentes mantêm a posição
+        self.assertEqual(list(ordens), ["ETF", "DAQ", "JOKER"])
+        self.assertEqual(ordens["ETF"], {"Produção": 7})
+        self.assertIsInstance(ordens["DAQ"], OrdemPlanejada)
+
+        self.armazenamento.gravar_registros('ordens_controle', OrdensControle({
+            "ETF": OrdemControle(estoque_atual=0, status="Pronta", producao=10),
+            "DAQ": OrdemControle(estoque_atual=10, status="Planejada", aquisicao=5),
+        }))
+        prontas = self.armazenamento.ler_registros('ordens_controle', status="Pronta")
+        self.assertIsInstance(prontas, OrdensControle)
+        self.assertEqual(list(prontas), ["ETF"])
+        self.assertEqual(len(self.armazenamento.ler_registros('ordens_controle', ["DAQ"], status="Pronta")), 0)
+
+    def test_planejamento(self):
+        """
+        Testa a gravação do quadro de planejamento e a leitura por período.
+        """
+        quadro = QuadroPlanejamento()
+        quadro["ETF"] = {"Estoque Atual": 5, "2025-04-11": 100, "2025-05-02": 20}
+        quadro["DAQ"] = {"Estoque Atual": 10}
+        self.armazenamento.gravar_planejamento(quadro)
+
+        self.assertEqual(self.armazenamento.ler_planejamento(), quadro)
+        abril = self.armazenamento.ler_planejamento(data_inicio="2025-04-01", data_fim="2025-04-30")
+        self.assertEqual(dict(abril["ETF"]), {"Estoque Atual": 5, "2025-04-11": 100})
+
+        # A leitura por outra conexão enxerga o estado gravado
+        outra = ArmazenamentoSQLite(self.caminho)
+        try:
+            self.assertEqual(list(outra.ler_planejamento(["DAQ"])), ["DAQ"])
+        finally:
+            outra.fechar()
+
+
+if __name__ == '__main__':
+    unittest.main()
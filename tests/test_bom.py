@@ -0,0 +1,126 @@
+import unittest
+import numpy as np
+from bom import calcular_codigos_nivel, IndiceOndeUsado, MatrizBOM, RollupBOM
+
+
+class TestBOM(unittest.TestCase):
+    """
+    Classe de teste das estruturas de BOM.
+    """
+
+    def setUp(self):
+        """
+        Define BOMs de exemplo com uma submontagem compartilhada.
+        """
+        self.boms = {
+            "KIT": {"ETI": 2, "JOKER": 1},
+            "ETI": {"PLACA": 1, "Invólucro": 1},
+            "ETF": {"PLACA": 1},
+            "PLACA": {"JOKER": 1, "DAQ": 2},
+        }
+
+    def test_calcular_codigos_nivel(self):
+        """
+        Testa se cada material recebe o nível mais baixo em que aparece.
+        """
+        niveis = calcular_codigos_nivel(self.boms)
+        self.assertEqual(niveis["KIT"], 0)
+        self.assertEqual(niveis["ETF"], 0)
+        self.assertEqual(niveis["ETI"], 1)
+        self.assertEqual(niveis["PLACA"], 2)
+        # JOKER aparece no nível 1 (KIT) e no nível 3 (PLACA): prevalece o mais baixo
+        self.assertEqual(niveis["JOKER"], 3)
+        self.assertEqual(niveis["DAQ"], 3)
+
+    def test_ciclo(self):
+        """
+        Testa se um ciclo nas BOMs é detectado.
+        """
+        self.boms["DAQ"] = {"ETI": 1}
+        with self.assertRaises(ValueError) as contexto:
+            calcular_codigos_nivel(self.boms)
+        self.assertIn("PLACA", str(contexto.exception))
+
+    def test_matriz_bom(self):
+        """
+        Testa o produto matriz-vetor por nível e a propagação dos materiais alcançados.
+        """
+        matriz = MatrizBOM(self.boms, calcular_codigos_nivel(self.boms))
+        self.assertEqual(matriz.num_niveis, 4)
+        self.assertEqual(matriz.materiais[matriz.faixa_nivel(0)], ["KIT", "ETF"])
+
+        producao = np.zeros(len(matriz), dtype=np.int64)
+        producao[matriz.indice["KIT"]] = 10
+        producao[matriz.indice["PLACA"]] = 3
+        necessidades = matriz.multiplicar(producao)
+        self.assertEqual(necessidades[matriz.indice["ETI"]], 20)
+        self.assertEqual(necessidades[matriz.indice["JOKER"]], 13)
+        self.assertEqual(necessidades[matriz.indice["DAQ"]], 6)
+        # Apenas as BOMs dos produtos do nível 0
+        self.assertEqual(matriz.multiplicar(producao, nivel=0)[matriz.indice["JOKER"]], 10)
+
+        # Vários vetores de produção de uma só vez
+        lote = np.vstack([producao, 2 * producao])
+        self.assertEqual(matriz.multiplicar(lote)[:, matriz.indice["JOKER"]].tolist(), [13, 26])
+
+        mascara = np.zeros(len(matriz), dtype=bool)
+        mascara[matriz.indice["ETF"]] = True
+        alcancados = matriz.alcancaveis(mascara)
+        self.assertEqual([matriz.materiais[i] for i in np.flatnonzero(alcancados)], ["PLACA"])
+
+        # Maior valor entre os componentes dos produtos de um nível
+        valores = np.arange(len(matriz), dtype=np.float64) + 1
+        maximos = matriz.maximo_componentes(np.vstack([valores, -valores]), matriz.niveis[matriz.indice["PLACA"]])
+        self.assertEqual(maximos[:, matriz.indice["PLACA"]].tolist(),
+                         [max(valores[matriz.indice["JOKER"]], valores[matriz.indice["DAQ"]]),
+                          -min(valores[matriz.indice["JOKER"]], valores[matriz.indice["DAQ"]])])
+        self.assertEqual(np.count_nonzero(maximos), 2)
+
+    def test_indice_onde_usado(self):
+        """
+        Testa as consultas diretas e transitivas do índice onde-usado e sua atualização.
+        """
+        indice = IndiceOndeUsado(self.boms)
+        self.assertEqual(indice.pais("PLACA"), {"ETI": 1, "ETF": 1})
+        self.assertEqual(indice.pais("KIT"), {})
+        # JOKER: 1 direto no KIT + 2 ETI × 1 PLACA × 1 JOKER
+        self.assertEqual(indice.ancestrais("JOKER"), {"KIT": 3, "PLACA": 1, "ETI": 1, "ETF": 1})
+        self.assertEqual(indice.produtos_finais("DAQ"), {"KIT": 4, "ETF": 2})
+
+        # Recarregar uma BOM troca apenas as entradas do produto
+        indice.definir_bom("ETF", {"DAQ": 1})
+        self.assertEqual(indice.pais("PLACA"), {"ETI": 1})
+        self.assertEqual(indice.produtos_finais("DAQ"), {"KIT": 4, "ETF": 1})
+        indice.remover_bom("KIT")
+        self.assertNotIn("ETI", indice)
+
+    def test_rollup(self):
+        """
+        Testa o lead time acumulado, memorizado e invalidado por material.
+        """
+        leadtimes = {"KIT": 1, "ETI": 2, "ETF": 3, "PLACA": 4, "JOKER": 10, "DAQ": 20, "Invólucro": 5}
+        consultas = []
+
+        def leadtime_material(material):
+            consultas.append(material)
+            return leadtimes[material]
+
+        rollup = RollupBOM(self.boms, IndiceOndeUsado(self.boms), leadtime_material)
+        # KIT -> ETI -> PLACA -> DAQ: 1 + 2 + 4 + 20
+        self.assertEqual(rollup.leadtime_acumulado("KIT"), 27)
+        # ETF reaproveita a PLACA já calculada: 3 + 4 + 20
+        self.assertEqual(rollup.leadtime_acumulado("ETF"), 27)
+        # Cada material é consultado uma única vez
+        self.assertEqual(sorted(consultas), sorted(leadtimes))
+
+        # Alterar o Invólucro descarta apenas ele, o ETI e o KIT
+        leadtimes["Invólucro"] = 30
+        consultas.clear()
+        rollup.invalidar(["Invólucro"])
+        self.assertEqual(rollup.leadtime_acumulado("KIT"), 33)
+        self.assertEqual(rollup.leadtime_acumulado("ETF"), 27)
+        self.assertEqual(sorted(consultas), ["ETI", "Invólucro", "KIT"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import sys
+import pandas as pd
+from estoque import EstoqueColunar
+
+
+class TestEstoqueColunar(unittest.TestCase):
+    """
+    Classe de teste do estoque colunar.
+    """
+
+    def setUp(self):
+        """
+        Cria um estoque colunar a partir de um DataFrame de exemplo.
+        """
+        self.df_estoque = pd.DataFrame([
+            ["ETF", 0, 5, 100, 0, 0, 5],
+            ["JOKER", 10, 10, 10, 1, 5, 10],
+            ["DAQ", 10, 10, 11.5, 2, 6, 11],
+        ], columns=["Material", "Em Estoque", "Minimo", "Custo Medio Unitario", "Imposto Medio Unitario",
+                    "Frete Medio Lote", "Leadtime Medio Lote"])
+        self.estoque = EstoqueColunar.de_dataframe(self.df_estoque)
+
+    def test_de_dataframe(self):
+        """
+        Testa se as colunas são convertidas em arrays tipados com o mapa código -> linha.
+        """
+        self.assertEqual(len(self.estoque), 3)
+        self.assertEqual(self.estoque.indice["JOKER"], 1)
+        self.assertEqual(self.estoque.colunas["em_estoque"].dtype.kind, "i")
+        self.assertEqual(self.estoque.colunas["custo_medio_unitario"].dtype.kind, "f")
+        # Os valores são devolvidos como escalares Python
+        self.assertIsInstance(self.estoque["JOKER"]["leadtime_medio_lote"], int)
+        self.assertEqual(self.estoque["DAQ"]["custo_medio_unitario"], 11.5)
+        self.assertEqual(self.estoque.get("Inexistente", {'em_estoque': 0})['em_estoque'], 0)
+        # Os códigos são internados e as visões não têm __dict__
+        self.assertIs(self.estoque.codigos[1], sys.intern("JOKER"))
+        self.assertFalse(hasattr(self.estoque["JOKER"], '__dict__'))
+
+    def test_escrita_na_visao(self):
+        """
+        Testa se as escritas feitas pela visão alteram os arrays.
+        """
+        self.estoque["JOKER"]["em_estoque"] += 5
+        self.assertEqual(self.estoque.colunas["em_estoque"][1], 15)
+        # Um valor não inteiro promove a coluna para float
+        self.estoque["JOKER"]["custo_medio_unitario"] = 42.41
+        self.assertEqual(self.estoque["JOKER"]["custo_medio_unitario"], 42.41)
+        self.assertEqual(self.estoque.colunas["custo_medio_unitario"].dtype.kind, "f")
+
+    def test_somar(self):
+        """
+        Testa o lançamento em lote, com linhas repetidas e promoção para float.
+        """
+        linhas = self.estoque.linhas(["JOKER", "DAQ", "JOKER"])
+        self.estoque.somar('em_estoque', linhas, [5, 1, 2])
+        self.assertEqual(self.estoque["JOKER"]["em_estoque"], 17)
+        self.assertEqual(self.estoque.colunas["em_estoque"].dtype.kind, "i")
+        self.estoque.somar('em_estoque', linhas[:1], [0.5])
+        self.assertEqual(self.estoque["JOKER"]["em_estoque"], 17.5)
+
+    def test_mesclar(self):
+        """
+        Testa se a mesclagem sobrescreve materiais existentes e adiciona os novos.
+        """
+        df_novo = pd.DataFrame([
+            ["DAQ", 99, 10, 11, 2, 6, 11],
+            ["ADS1115", 10, 5, 15, 6, 10, 15],
+        ], columns=self.df_estoque.columns)
+        self.estoque.mesclar(EstoqueColunar.de_dataframe(df_novo))
+        self.assertEqual(len(self.estoque), 4)
+        self.assertEqual(self.estoque["DAQ"]["em_estoque"], 99)
+        self.assertEqual(self.estoque["ADS1115"]["leadtime_medio_lote"], 15)
+        self.assertEqual(self.estoque["ETF"]["minimo"], 5)
+
+    def test_inclusao_incremental(self):
+        """
+        Testa se incluir materiais um a um reaproveita a reserva das colunas sem perder valores.
+        """
+        estoque = EstoqueColunar()
+        realocacoes = 0
+        for i in range(1000):
+            reserva = estoque._reservas.get('em_estoque')
+            estoque[f"M{i}"] = {'em_estoque': i, 'minimo': 2 * i}
+            realocacoes += estoque._reservas['em_estoque'] is not reserva
+        self.assertLessEqual(realocacoes, 12)
+        self.assertEqual(len(estoque.colunas['em_estoque']), 1000)
+        self.assertEqual(estoque["M999"]["em_estoque"], 999)
+        self.assertEqual(estoque["M500"]["minimo"], 1000)
+        self.assertEqual(estoque["M0"]["custo_medio_unitario"], 0)
+
+        # Promoção para float e mesclagem continuam compatíveis com a reserva
+        estoque["M1"] = {'em_estoque': 1.5}
+        estoque["NOVO"] = {'em_estoque': 3}
+        estoque.mesclar(EstoqueColunar.de_dataframe(pd.DataFrame(
+            [["MAIS", 7, 1, 1, 1, 1, 1]], columns=self.df_estoque.columns)))
+        self.assertEqual(estoque["M1"]["em_estoque"], 1.5)
+        self.assertEqual(estoque["NOVO"]["em_estoque"], 3)
+        self.assertEqual(estoque["MAIS"]["em_estoque"], 7)
+        self.assertEqual(estoque["M999"]["em_estoque"], 999)
+        self.assertEqual(len(estoque), 1002)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import os
+import importlib.util
+import sqlite3
+from unittest import mock
+import pandas as pd
+from openpyxl import Workbook
+from leitores import ler_tabela, localizar_arquivo, listar_arquivos_bom
+from mrp import MRP
+
+
+class TestLeitores(unittest.TestCase):
+    """
+    Classe de teste dos leitores de arquivos de entrada.
+    """
+
+    def setUp(self):
+        """
+        Cria o diretório de testes.
+        """
+        self.pasta_testes = "test_data_leitores"
+        if not os.path.exists(self.pasta_testes):
+            os.makedirs(self.pasta_testes)
+
+    def tearDown(self):
+        """
+        Remove o diretório de testes e seu conteúdo.
+        """
+        for arquivo in os.listdir(self.pasta_testes):
+            os.remove(os.path.join(self.pasta_testes, arquivo))
+        os.rmdir(self.pasta_testes)
+
+    def caminho(self, nome_arquivo):
+        """
+        Devolve o caminho de um arquivo dentro do diretório de testes.
+        """
+        return os.path.join(self.pasta_testes, nome_arquivo)
+
+    def test_ler_xlsx(self):
+        """
+        Testa a leitura somente leitura de uma planilha, descartando linhas vazias.
+        """
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["Material", "Quantidade"])
+        sheet.append(["JOKER", 1])
+        sheet.append([None, None])
+        sheet.append(["DAQ"])
+        workbook.save(self.caminho("Leitura.xlsx"))
+
+        df = ler_tabela(self.caminho("Leitura.xlsx"))
+        self.assertEqual(list(df.columns), ["Material", "Quantidade"])
+        self.assertEqual(df["Material"].tolist(), ["JOKER", "DAQ"])
+        self.assertEqual(df["Quantidade"].iloc[0], 1)
+
+        # Sem cabeçalho, a primeira linha faz parte dos dados
+        df = ler_tabela(self.caminho("Leitura.xlsx"), cabecalho=False)
+        self.assertEqual(df.iloc[0].tolist(), ["Material", "Quantidade"])
+
+        # Blocos menores que a planilha produzem o mesmo resultado
+        with mock.patch("leitores.TAMANHO_BLOCO_XLSX", 1):
+            df = ler_tabela(self.caminho("Leitura.xlsx"))
+        self.assertEqual(df["Material"].tolist(), ["JOKER", "DAQ"])
+        self.assertEqual(list(df.index), [0, 1])
+
+    def test_ler_csv_e_sqlite(self):
+        """
+        Testa a leitura de CSV e SQLite, inclusive com formato escolhido por configuração.
+        """
+        df_original = pd.DataFrame({"Material": ["JOKER", "DAQ"], "Quantidade": [1, 2]})
+        df_original.to_csv(self.caminho("ETI_BOM.csv"), index=False)
+        df_original.to_csv(self.caminho("feed.txt"), index=False)
+        with sqlite3.connect(self.caminho("ETF_BOM.db")) as conexao:
+            df_original.to_sql("ETF_BOM", conexao, index=False)
+
+        for df in (ler_tabela(self.caminho("ETI_BOM.csv")),
+                   ler_tabela(self.caminho("feed.txt"), formato="csv"),
+                   ler_tabela(self.caminho("ETF_BOM.db"))):
+            self.assertEqual(df["Material"].tolist(), ["JOKER", "DAQ"])
+            self.assertEqual(df["Quantidade"].tolist(), [1, 2])
+
+        with self.assertRaises(ValueError):
+            ler_tabela(self.caminho("feed.txt"))
+
+        self.assertEqual(listar_arquivos_bom(self.pasta_testes), {"ETF": "ETF_BOM.db", "ETI": "ETI_BOM.csv"})
+        self.assertEqual(listar_arquivos_bom(self.pasta_testes, "csv"), {"ETI": "ETI_BOM.csv"})
+        self.assertEqual(localizar_arquivo(self.pasta_testes, "Estoque"), "Estoque.xlsx")
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow não instalado")
+    def test_ler_parquet(self):
+        """
+        Testa a leitura de arquivos Parquet.
+        """
+        pd.DataFrame({"Material": ["JOKER"], "Quantidade": [3]}).to_parquet(self.caminho("ETI_BOM.parquet"))
+        df = ler_tabela(self.caminho("ETI_BOM.parquet"))
+        self.assertEqual(df["Quantidade"].tolist(), [3])
+
+    def test_inicializar_mrp_csv(self):
+        """
+        Testa a inicialização do MRP a partir de arquivos CSV.
+        """
+        pd.DataFrame([["ETI", 5, 5, 80, 0, 0, 5], ["JOKER", 10, 10, 10, 1, 5, 10]],
+                     columns=["Material", "Em Estoque", "Minimo", "Custo Medio Unitario", "Imposto Medio Unitario",
+                              "Frete Medio Lote", "Leadtime Medio Lote"]).to_csv(self.caminho("Estoque.csv"), index=False)
+        pd.DataFrame({"Material": ["JOKER"], "Quantidade": [2]}).to_csv(self.caminho("ETI_BOM.csv"), index=False)
+
+        mrp = MRP(self.pasta_testes, formato_entrada="csv")
+        mrp.inicializar_dados(usar_cache=False)
+        self.assertEqual(mrp.estado, "Inicializado")
+        self.assertEqual(mrp.boms, {"ETI": {"JOKER": 2}})
+        self.assertEqual(mrp.estoque["JOKER"]["leadtime_medio_lote"], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -81,6 +81,125 @@ class TestMRP(unittest.TestCase):
         self.assertEqual(self.mrp.boms["ETI"]["JOKER"], 1)
         self.assertEqual(self.mrp.boms["ETF"]["JOKER"], 1)
 
+    def test_consultar_onde_usado(self):
+        """
+        Testa o índice onde-usado montado na inicialização e atualizado ao recarregar uma BOM.
+        """
+        import pandas as pd
+
+        self.mrp.inicializar_dados()
+        self.assertEqual(self.mrp.consultar_onde_usado("ADS1115"), {"ETI": 2, "ETF": 2})
+
+        self.mrp.carregar_bom("KIT", pd.DataFrame({"Material": ["ETI", "ADS1115"], "Quantidade": [3, 1]}))
+        self.assertEqual(self.mrp.consultar_onde_usado("ADS1115", transitivo=True), {"ETI": 2, "ETF": 2, "KIT": 7})
+        self.mrp.carregar_bom("KIT", pd.DataFrame({"Material": ["ETF"], "Quantidade": [1]}))
+        self.assertEqual(self.mrp.consultar_onde_usado("ADS1115", transitivo=True), {"ETI": 2, "ETF": 2, "KIT": 2})
+
+        # Substituir o dicionário de BOMs reconstrói o índice e o rollup
+        self.mrp.boms = {"ETI": {"ADS1115": 1}}
+        self.assertEqual(self.mrp.consultar_onde_usado("ADS1115"), {"ETI": 1})
+        self.assertIs(self.mrp.rollup.boms, self.mrp.boms)
+
+    def test_inicializar_dados_paralelo(self):
+        """
+        Testa se a leitura das planilhas em um pool de processos produz os mesmos dados.
+        """
+        self.mrp.inicializar_dados()
+        mrp_processos = MRP(self.pasta_testes)
+        mrp_processos.inicializar_dados(max_workers=2, usar_processos=True, usar_cache=False)
+        self.assertEqual(mrp_processos.estado, "Inicializado")
+        self.assertEqual(mrp_processos.boms, self.mrp.boms)
+        self.assertEqual(list(mrp_processos.estoque), list(self.mrp.estoque))
+        self.assertEqual(dict(mrp_processos.estoque["ADS1115"]), dict(self.mrp.estoque["ADS1115"]))
+
+    def test_inicializar_dados_snapshot(self):
+        """
+        Testa se o snapshot (opcional) evita reler planilhas inalteradas e relê apenas as alteradas.
+        """
+        from unittest import mock
+        import pickle
+        import shutil
+        import mrp as modulo_mrp
+
+        caminho_cache = os.path.join(self.pasta_testes, modulo_mrp.ARQUIVO_CACHE)
+
+        # Sem usar_cache, nenhum snapshot é gravado
+        self.mrp.inicializar_dados()
+        self.assertFalse(os.path.exists(caminho_cache))
+
+        # Um snapshot que não seja um .npz válido (por exemplo, um pickle) é ignorado
+        with open(caminho_cache, 'wb') as arquivo:
+            pickle.dump({'versao': modulo_mrp.VERSAO_CACHE, 'arquivos': {}}, arquivo)
+        mrp_frio = MRP(self.pasta_testes)
+        mrp_frio.inicializar_dados(usar_cache=True)
+        self.assertEqual(mrp_frio.boms, self.mrp.boms)
+
+        # Partida a quente: nenhuma planilha é lida
+        with mock.patch("mrp.ler_tabela", side_effect=AssertionError("planilha relida")):
+            mrp_quente = MRP(self.pasta_testes)
+            mrp_quente.inicializar_dados(usar_cache=True)
+        self.assertEqual(mrp_quente.boms, self.mrp.boms)
+        self.assertEqual(mrp_quente.estoque["JOKER"]["em_estoque"], 10)
+        self.assertEqual(dict(mrp_quente.estoque["ADS1115"]), dict(self.mrp.estoque["ADS1115"]))
+
+        # Apenas a BOM alterada é lida novamente
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["Material", "Quantidade"])
+        sheet.append(["JOKER", 3])
+        workbook.save(os.path.join(self.pasta_testes, "ETI_BOM.xlsx"))
+        with mock.patch("mrp.ler_tabela", wraps=modulo_mrp.ler_tabela) as leitor:
+            mrp_alterado = MRP(self.pasta_testes)
+            mrp_alterado.inicializar_dados(usar_cache=True)
+        self.assertEqual(leitor.call_count, 1)
+        self.assertEqual(mrp_alterado.boms["ETI"], {"JOKER": 3})
+        self.assertEqual(mrp_alterado.boms["ETF"], self.mrp.boms["ETF"])
+
+        # Cópias em outra pasta (com outro mtime) são reconhecidas pelo conteúdo
+        outra_pasta = os.path.join(self.pasta_testes, "outra")
+        os.makedirs(outra_pasta)
+        for arquivo in ("Estoque.xlsx", "ETF_BOM.xlsx"):
+            shutil.copy(os.path.join(self.pasta_testes, arquivo), os.path.join(outra_pasta, arquivo))
+        with mock.patch("mrp.ler_tabela", side_effect=AssertionError("planilha relida")):
+            mrp_outro = MRP(outra_pasta)
+            mrp_outro.inicializar_dados(usar_cache=True, caminho_cache=caminho_cache)
+        self.assertNotIn("ETI", mrp_outro.boms)
+        self.assertEqual(mrp_outro.boms["ETF"], self.mrp.boms["ETF"])
+        shutil.rmtree(outra_pasta)
+
+    def test_inicializar_dados_snapshot_compartilhado(self):
+        """
+        Testa se duas pastas que compartilham o snapshot mantêm as entradas uma da outra.
+        """
+        from unittest import mock
+        import shutil
+        import mrp as modulo_mrp
+
+        caminho_cache = os.path.join(self.pasta_testes, modulo_mrp.ARQUIVO_CACHE)
+        outra_pasta = os.path.join(self.pasta_testes, "outra")
+        os.makedirs(outra_pasta)
+        shutil.copy(os.path.join(self.pasta_testes, "Estoque.xlsx"), os.path.join(outra_pasta, "Estoque.xlsx"))
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["Material", "Quantidade"])
+        sheet.append(["JOKER", 3])
+        workbook.save(os.path.join(outra_pasta, "KIT_BOM.xlsx"))
+
+        try:
+            for pasta in (self.pasta_testes, outra_pasta):
+                MRP(pasta).inicializar_dados(usar_cache=True, caminho_cache=caminho_cache)
+
+            # Partida a quente nas duas pastas, alternadamente: nenhuma planilha é lida
+            with mock.patch("mrp.ler_tabela", side_effect=AssertionError("planilha relida")):
+                quentes = []
+                for pasta in (self.pasta_testes, outra_pasta, self.pasta_testes):
+                    quentes.append(MRP(pasta))
+                    quentes[-1].inicializar_dados(usar_cache=True, caminho_cache=caminho_cache)
+            self.assertEqual(quentes[2].boms["ETI"]["JOKER"], 1)
+            self.assertEqual(quentes[1].boms, {"KIT": {"JOKER": 3}})
+        finally:
+            shutil.rmtree(outra_pasta)
+
     def criar_arquivo_estoque_teste(self):
         """
         Cria arquivo de Estoque de exemplo (XLSX) para ser usado nos testes.
@@ -164,6 +283,386 @@ class TestMRP(unittest.TestCase):
         self.assertEqual(quantidades["Chip Internet Móvel"]["quantidade_a_adquirir"], 105)
         self.assertEqual(ordens_planejamento["Chip Internet Móvel"]["Aquisição"], 105)
 
+    def test_calcular_quantidades_multinivel(self):
+        """
+        Testa a explosão das BOMs em vários níveis, com submontagem e componente compartilhados.
+        """
+        import pandas as pd
+
+        self.mrp.inicializar_dados()
+        # KIT usa 2 ETI (submontagem com BOM própria) e 1 JOKER (também componente do ETI)
+        self.mrp.carregar_bom("KIT", pd.DataFrame({"Material": ["ETI", "JOKER"], "Quantidade": [2, 1]}))
+        self.assertEqual(self.mrp.calcular_codigos_nivel()["JOKER"], 2)
+
+        quantidades, ordens_planejamento = self.mrp.calcular_quantidades_producao_aquisicao({"KIT": 10})
+        # KIT não está no estoque: produzir 10
+        self.assertEqual(ordens_planejamento["KIT"]["Produção"], 10)
+        # ETI: necessidade 20, estoque 5, mínimo 5 -> produzir 20 (não adquirir)
+        self.assertEqual(ordens_planejamento["ETI"]["Produção"], 20)
+        self.assertEqual(ordens_planejamento["ETI"]["Aquisição"], 0)
+        # JOKER: 10 (KIT) + 20 (ETI), calculado uma única vez -> adquirir 30
+        self.assertEqual(ordens_planejamento["JOKER"]["Aquisição"], 30)
+        # ADS1115: 2 por ETI -> 40 + 5 - 10 = 35
+        self.assertEqual(quantidades["ADS1115"]["quantidade_a_adquirir"], 35)
+        # ETF não é usado pelo KIT
+        self.assertNotIn("ETF", ordens_planejamento)
+
+    def test_inicializar_dados_ciclo(self):
+        """
+        Testa se um ciclo nas BOMs impede a inicialização.
+        """
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["Material", "Quantidade"])
+        sheet.append(["ETF", 1])
+        workbook.save(os.path.join(self.pasta_testes, "JOKER_BOM.xlsx"))
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["Material", "Quantidade"])
+        sheet.append(["JOKER", 1])
+        workbook.save(os.path.join(self.pasta_testes, "ETF_BOM.xlsx"))
+
+        self.assertFalse(self.mrp.inicializar_dados())
+        self.assertNotEqual(getattr(self.mrp, "estado", None), "Inicializado")
+
+    def test_planejar_cenarios(self):
+        """
+        Testa o planejamento de vários cenários de demanda de uma só vez, sem alterar o estado do MRP.
+        """
+        import pandas as pd
+
+        self.mrp.inicializar_dados()
+        demandas = pd.DataFrame({"ETI": [200, 0, 50], "ETF": [100, 30, 0], "AVULSO": [0, 5, 1]},
+                                index=["base", "só ETF", "só ETI"])
+        resultado = self.mrp.planejar_cenarios(demandas)
+        self.assertEqual(resultado['cenarios'], ["base", "só ETF", "só ETI"])
+        self.assertEqual(resultado['producao'].shape, (3, len(resultado['materiais'])))
+        self.assertFalse(getattr(self.mrp, 'ordens_planejamento', {}))
+        self.assertEqual(self.mrp.estado, "Inicializado")
+
+        # Cada cenário deve coincidir com um planejamento individual
+        for i, (_, linha) in enumerate(demandas.iterrows()):
+            mrp = MRP(self.pasta_testes)
+            mrp.inicializar_dados(usar_cache=False)
+            mrp.planejar_producao(linha.to_dict())
+            for material, ordens in mrp.ordens_planejamento.items():
+                j = resultado['materiais'].index(material)
+                self.assertEqual(resultado['producao'][i, j], ordens['Produção'])
+                self.assertEqual(resultado['aquisicao'][i, j], ordens['Aquisição'])
+                if material in mrp.fc_lt_esperados and mrp.fc_lt_esperados[material]:
+                    self.assertAlmostEqual(resultado['custo'][i, j], mrp.fc_lt_esperados[material]['Custo'])
+                    self.assertEqual(resultado['leadtime'][i, j], mrp.fc_lt_esperados[material]['Leadtime'])
+            custo_total = sum(dados.get('Custo', 0) for dados in mrp.fc_lt_esperados.values())
+            self.assertAlmostEqual(resultado['custo_total'][i], custo_total)
+
+    def test_planejar_producao_periodos(self):
+        """
+        Testa o MRP por períodos: defasagem pelo lead time e explosão das liberações para os componentes.
+        """
+        from datetime import datetime
+
+        self.mrp.inicializar_dados()
+        plano = self.mrp.planejar_producao_periodos({"ETI": [0, 0, 100]}, dias_por_periodo=7,
+                                                    data_inicio=datetime(2025, 1, 6))
+        self.assertEqual(plano['periodos'], ["2025-01-06", "2025-01-13", "2025-01-20"])
+        linha = {material: i for i, material in enumerate(plano['materiais'])}
+
+        # ETI: estoque 5, mínimo 5, lead time 5 dias -> recebe 100 no período 2, liberado no período 1
+        self.assertEqual(plano['recebimentos_planejados'][linha["ETI"]].tolist(), [0, 0, 100])
+        self.assertEqual(plano['liberacoes_planejadas'][linha["ETI"]].tolist(), [0, 100, 0])
+        self.assertEqual(plano['estoque_projetado'][linha["ETI"]].tolist(), [5, 5, 5])
+        # ADS1115: 2 por ETI no período 1; estoque 10, mínimo 5, lead time 15 dias (liberação atrasada)
+        self.assertEqual(plano['necessidade_bruta'][linha["ADS1115"]].tolist(), [0, 200, 0])
+        self.assertEqual(plano['necessidade_liquida'][linha["ADS1115"]].tolist(), [0, 195, 0])
+        self.assertEqual(plano['liberacoes_planejadas'][linha["ADS1115"]].tolist(), [195, 0, 0])
+        self.assertFalse(plano['produzidos'][linha["ADS1115"]])
+        # D-SUB25 macho: o estoque mínimo (50) é recomposto já no primeiro período
+        self.assertEqual(plano['recebimentos_planejados'][linha["D-SUB25 macho"]].tolist(), [38, 100, 0])
+        # ETF não é usado pela demanda
+        self.assertEqual(plano['recebimentos_planejados'][linha["ETF"]].tolist(), [0, 0, 0])
+
+    def test_exportar_streaming(self):
+        """
+        Testa se as exportações em modo streaming gravam os mesmos valores das exportações em memória.
+        """
+        from openpyxl import load_workbook
+
+        self.mrp.inicializar_dados()
+        self.mrp.planejar_producao({"ETI": 100, "ETF": 100})
+        for exportar in (self.mrp.exportar_quadro_planejamento, self.mrp.exportar_ordens_producao,
+                         self.mrp.exportar_custos_materiais):
+            caminho = exportar("memoria.xlsx")
+            caminho_streaming = exportar("streaming.xlsx", streaming=True)
+            ws = load_workbook(caminho).active
+            ws_streaming = load_workbook(caminho_streaming).active
+            valores = [[valor if valor != "" else None for valor in linha] for linha in ws.iter_rows(values_only=True)]
+            valores_streaming = [[valor if valor != "" else None for valor in linha]
+                                 for linha in ws_streaming.iter_rows(values_only=True)]
+            self.assertEqual(valores_streaming, valores)
+            self.assertEqual(ws_streaming.title, ws.title)
+            self.assertEqual(ws_streaming.freeze_panes, ws.freeze_panes)
+            self.assertEqual(ws_streaming["A1"].font.b, True)
+
+    def test_listagens_paginadas(self):
+        """
+        Testa a paginação, os filtros e a seleção de colunas das listagens no console.
+        """
+        import io
+        from contextlib import redirect_stdout
+
+        self.mrp.inicializar_dados()
+        self.mrp.planejar_producao({"ETI": 100, "ETF": 100})
+        self.mrp.iniciar_execucao()
+
+        saida = io.StringIO()
+        with redirect_stdout(saida):
+            self.assertTrue(self.mrp.listar_ordens_controle(pagina=2, tamanho_pagina=3))
+        self.assertIn("Página 2 (linhas 4 a 6) - há mais linhas", saida.getvalue())
+
+        # Sem página, a listagem continua sendo uma única tabela, sem rodapé de paginação
+        saida = io.StringIO()
+        with redirect_stdout(saida):
+            self.mrp.listar_ordens_controle(tamanho_pagina=3)
+        self.assertNotIn("Página", saida.getvalue())
+        self.assertEqual(saida.getvalue().count("Material"), 1)
+
+        saida = io.StringIO()
+        with redirect_stdout(saida):
+            self.mrp.listar_ordens_para_edicao(prefixo="ET", tipo="Produção", colunas=["Material", "Status"])
+        self.assertIn("ETI", saida.getvalue())
+        self.assertNotIn("JOKER", saida.getvalue())
+        self.assertNotIn("Editável", saida.getvalue())
+
+        saida = io.StringIO()
+        with redirect_stdout(saida):
+            custo_pagina = self.mrp.listar_custos_materiais(pagina=1, tamanho_pagina=2)
+            custo_total = self.mrp.listar_custos_materiais()
+        # O total considera todas as páginas, mas só é impresso na última
+        self.assertAlmostEqual(custo_pagina, custo_total)
+        self.assertEqual(saida.getvalue().count("TOTAL"), 1)
+
+        saida = io.StringIO()
+        with redirect_stdout(saida):
+            self.mrp.imprimir_quadro_planejamento(prefixo="JOKER")
+        self.assertIn("JOKER", saida.getvalue())
+        self.assertNotIn("DAQ", saida.getvalue())
+
+    def test_recuperar_execucao(self):
+        """
+        Testa se a execução é recuperada do diário de ordens após reiniciar o processo.
+        """
+        self.mrp.inicializar_dados()
+        self.mrp.ativar_diario(intervalo_snapshot=3)
+        self.mrp.planejar_producao({"ETI": 100, "ETF": 100})
+        self.mrp.iniciar_execucao()
+        self.mrp.editar_ordem("JOKER", "Aquisição", 300)
+        self.mrp.cancelar_ordem("DAQ")
+        self.mrp.atualizar_status_ordem("ETF", "Executada")
+        self.mrp.atualizar_status_ordem("JOKER", "Pronta")
+
+        # Novo processo: recupera o snapshot e os eventos posteriores
+        mrp_reiniciado = MRP(self.pasta_testes)
+        mrp_reiniciado.inicializar_dados()
+        mrp_reiniciado.ativar_diario()
+        self.assertTrue(mrp_reiniciado.recuperar_execucao())
+        self.assertEqual(mrp_reiniciado.ordens_controle, self.mrp.ordens_controle)
+        self.assertEqual(mrp_reiniciado.estoque["JOKER"]["em_estoque"], self.mrp.estoque["JOKER"]["em_estoque"])
+        self.assertEqual(mrp_reiniciado.estado, "Em Execução")
+
+    def test_atualizar_status_ordens(self):
+        """
+        Testa a atualização de status em lote, atômica e por linha.
+        """
+        self.mrp.inicializar_dados()
+        self.mrp.planejar_producao({"ETI": 100, "ETF": 100})
+        self.mrp.iniciar_execucao()
+        self.mrp.cancelar_ordem("DAQ")
+        estoque_joker = self.mrp.estoque["JOKER"]["em_estoque"]
+        aquisicao_joker = self.mrp.ordens_controle["JOKER"]["Aquisição"]
+
+        atualizacoes = [("JOKER", "Pronta"), ("ETF", "Executada"), ("DAQ", "Pronta"), ("XYZ", "Pronta")]
+        resultado = self.mrp.atualizar_status_ordens(atualizacoes, atomico=True)
+        self.assertFalse(resultado['aplicado'])
+        self.assertEqual([linha['erro'] is None for linha in resultado['linhas']], [True, True, False, False])
+        self.assertEqual(self.mrp.ordens_controle["JOKER"]["Status"], "Planejada")
+        self.assertEqual(self.mrp.estoque["JOKER"]["em_estoque"], estoque_joker)
+
+        resultado = self.mrp.atualizar_status_ordens(atualizacoes)
+        self.assertTrue(resultado['aplicado'])
+        self.assertEqual([linha['sucesso'] for linha in resultado['linhas']], [True, True, False, False])
+        self.assertEqual(resultado['entradas_estoque'], {"JOKER": aquisicao_joker})
+        self.assertEqual(self.mrp.ordens_controle["ETF"]["Status"], "Executada")
+        self.assertEqual(self.mrp.estoque["JOKER"]["em_estoque"], estoque_joker + aquisicao_joker)
+
+        # Os índices de status acompanham as atualizações
+        self.assertEqual(self.mrp.consultar_ordens(status="Pronta"), ["JOKER"])
+        self.assertNotIn("JOKER", self.mrp.consultar_ordens(editaveis=True))
+        self.assertEqual(self.mrp.consultar_ordens(editaveis=True, contar=True), len(self.mrp.ordens_controle) - 1)
+
+    def test_concorrencia(self):
+        """
+        Testa edições e atualizações de status feitas por várias threads ao mesmo tempo.
+        """
+        import threading
+        from contextlib import redirect_stdout
+        from io import StringIO
+
+        self.mrp.inicializar_dados()
+        self.mrp.planejar_producao({"ETI": 100, "ETF": 100})
+        self.mrp.ativar_concorrencia(num_travas=4)
+        self.mrp.ativar_diario(intervalo_snapshot=7)
+        self.mrp.iniciar_execucao()
+        materiais = list(self.mrp.ordens_controle)
+        estoque_inicial = {material: self.mrp.estoque[material]["em_estoque"] for material in materiais}
+
+        def operador(indice):
+            for rodada in range(20):
+                for material in materiais:
+                    tipo = "Produção" if "Produção" in self.mrp.ordens_controle[material] else "Aquisição"
+                    self.mrp.editar_ordem(material, tipo, indice + rodada + 1)
+            # Cada thread recebe uma parte das ordens
+            for material in materiais[indice::4]:
+                self.mrp.atualizar_status_ordem(material, "Pronta")
+
+        with redirect_stdout(StringIO()):
+            threads = [threading.Thread(target=operador, args=(indice,)) for indice in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.mrp.diario.fechar()
+
+        self.assertEqual(self.mrp.consultar_ordens(status="Pronta"), materiais)
+        for material in materiais:
+            ordem = self.mrp.ordens_controle[material]
+            quantidade = ordem.get("Produção", 0) + ordem.get("Aquisição", 0)
+            self.assertEqual(self.mrp.estoque[material]["em_estoque"], estoque_inicial[material] + quantidade)
+
+        # O diário reproduz o estado final
+        ordens = {material: dict(ordem) for material, ordem in self.mrp.ordens_controle.items()}
+        self.assertTrue(self.mrp.recuperar_execucao())
+        self.assertEqual({material: dict(ordem) for material, ordem in self.mrp.ordens_controle.items()}, ordens)
+
+    def test_simular_monte_carlo(self):
+        """
+        Testa a simulação de Monte Carlo dos custos e lead times do plano.
+        """
+        self.mrp.inicializar_dados()
+        self.assertIsNone(self.mrp.simular_monte_carlo(100))
+        self.mrp.planejar_producao({"ETI": 100, "ETF": 100})
+        self.assertIsNone(self.mrp.simular_monte_carlo(0))
+
+        # Sem incerteza, todos os percentis são a estimativa pontual
+        pontual = self.mrp.simular_monte_carlo(100, cv_custo=0, cv_leadtime=0, usar_processos=False)
+        custo = sum(fc_lt.get('Custo', 0) for fc_lt in self.mrp.fc_lt_esperados.values())
+        leadtime = max(fc_lt.get('Leadtime', 0) for fc_lt in self.mrp.fc_lt_esperados.values())
+        self.assertAlmostEqual(pontual['custo_total'][99], custo)
+        self.assertEqual(pontual['leadtime_total'], {50: leadtime, 90: leadtime, 99: leadtime})
+
+        # A mesma semente reproduz os sorteios, em threads ou em processos
+        resultado = self.mrp.simular_monte_carlo(3000, semente=7, usar_processos=False, tamanho_bloco=1000)
+        self.assertEqual(self.mrp.simular_monte_carlo(3000, semente=7, max_workers=2, tamanho_bloco=1000), resultado)
+        self.assertLess(resultado['custo_total'][50], resultado['custo_total'][99])
+        self.assertLessEqual(resultado['data_conclusao'][50], resultado['data_conclusao'][90])
+
+        # Incerteza apenas no lead time do componente do caminho crítico
+        critico = self.mrp.simular_monte_carlo(1000, semente=7, cv_custo=0, cv_leadtime=0,
+                                               incertezas={"D-SUB25 macho": {"leadtime": 0.5}},
+                                               usar_processos=False)
+        self.assertEqual(critico['custo_total'][50], pontual['custo_total'][50])
+        self.assertGreater(critico['leadtime_total'][99], leadtime)
+
+    def test_projetar_fluxo_caixa(self):
+        """
+        Testa a projeção diária das saídas de caixa e a sua exportação.
+        """
+        from datetime import datetime
+        import pandas as pd
+
+        self.mrp.inicializar_dados()
+        self.mrp.calcular_quantidades_producao_aquisicao({"ETI": 100, "ETF": 100})
+        self.mrp.calcular_fc_lt_esperados()
+        self.mrp.montar_quadro_planejamento(datetime(2025, 4, 1))
+
+        projecao = self.mrp.projetar_fluxo_caixa()
+        custo_total = sum(fc_lt.get('Custo', 0) for fc_lt in self.mrp.fc_lt_esperados.values())
+        self.assertAlmostEqual(projecao['acumulado'][-1], custo_total)
+        # Os desembolsos caem nos dias de entrega do quadro de planejamento
+        self.assertEqual([data for data, saida in zip(projecao['datas'], projecao['saidas']) if saida],
+                         self.mrp.planejamento.datas())
+        self.assertEqual(set(projecao['categorias']), {"Produção", "Aquisição"})
+        self.assertAlmostEqual(sum(serie.sum() for serie in projecao['categorias'].values()), custo_total)
+        dia_joker = projecao['datas'].index("2025-04-11")
+        self.assertEqual(self.mrp.projetar_fluxo_caixa(categorias='material')['categorias']["JOKER"][dia_joker],
+                         self.mrp.fc_lt_esperados["JOKER"]["Custo"])
+
+        # Aquisições são liberadas na data de execução
+        liberacao = self.mrp.projetar_fluxo_caixa('liberacao', categorias={"ETF": "Produto", "ETI": "Produto"})
+        self.assertEqual(liberacao['datas'][0], "2025-04-01")
+        self.assertAlmostEqual(liberacao['categorias']["Outros"][0], projecao['categorias']["Aquisição"].sum())
+        self.assertIsNone(self.mrp.projetar_fluxo_caixa('pagamento'))
+
+        caminho = self.mrp.exportar_fluxo_caixa("fluxo_caixa.xlsx", apenas_desembolsos=True)
+        df = pd.read_excel(caminho)
+        self.assertEqual(len(df), len(self.mrp.planejamento.datas()) + 1)
+        self.assertAlmostEqual(df["Total do Dia (R$)"].iloc[-1], custo_total)
+
+    def test_projetar_fluxo_caixa_sem_leadtime(self):
+        """
+        Testa se materiais sem lead time ficam fora da projeção sem invalidar os demais.
+        """
+        from datetime import datetime
+
+        self.mrp.inicializar_dados()
+        self.mrp.calcular_quantidades_producao_aquisicao({"ETI": 100, "ETF": 100})
+        self.mrp.calcular_fc_lt_esperados()
+        self.mrp.montar_quadro_planejamento(datetime(2025, 4, 1))
+
+        self.mrp.fc_lt_esperados["JOKER"]["Leadtime"] = float('nan')
+        self.mrp.estoque["ETF"]["leadtime_medio_lote"] = float('nan')
+        custo_total = sum(fc_lt.get('Custo', 0) for material, fc_lt in self.mrp.fc_lt_esperados.items()
+                          if material != "JOKER")
+        for momento in ('entrega', 'liberacao'):
+            projecao = self.mrp.projetar_fluxo_caixa(momento, categorias='material')
+            self.assertNotIn("JOKER", projecao['categorias'])
+            self.assertAlmostEqual(projecao['acumulado'][-1], custo_total)
+            self.assertGreaterEqual(projecao['datas'][0], "2025-04-01")
+
+        # Sem nenhum material com lead time, a projeção é vazia
+        for fc_lt in self.mrp.fc_lt_esperados.values():
+            fc_lt['Leadtime'] = float('nan')
+        self.assertEqual(self.mrp.projetar_fluxo_caixa()['datas'], [])
+
+    def test_salvar_carregar_estado(self):
+        """
+        Testa se o estado salvo no banco SQLite é carregado por outro MRP.
+        """
+        from datetime import datetime
+
+        self.mrp.inicializar_dados()
+        self.mrp.calcular_quantidades_producao_aquisicao({"ETI": 100, "ETF": 100})
+        self.mrp.calcular_fc_lt_esperados()
+        self.mrp.montar_quadro_planejamento(datetime(2025, 4, 1))
+        self.mrp.iniciar_execucao()
+        self.mrp.conectar_armazenamento()
+        self.assertTrue(self.mrp.salvar_estado())
+
+        mrp_carregado = MRP(self.pasta_testes)
+        mrp_carregado.conectar_armazenamento()
+        try:
+            self.assertTrue(mrp_carregado.carregar_estado(["JOKER"]))
+            self.assertEqual(list(mrp_carregado.ordens_controle), ["JOKER"])
+            self.assertTrue(mrp_carregado.carregar_estado())
+            self.assertEqual(mrp_carregado.ordens_planejamento, self.mrp.ordens_planejamento)
+            self.assertEqual(mrp_carregado.fc_lt_esperados, self.mrp.fc_lt_esperados)
+            self.assertEqual(mrp_carregado.ordens_controle, self.mrp.ordens_controle)
+            self.assertEqual(mrp_carregado.planejamento, self.mrp.planejamento)
+            self.assertEqual(mrp_carregado.estado, "Em Execução")
+            self.assertEqual(mrp_carregado.data_execucao, datetime(2025, 4, 1))
+        finally:
+            mrp_carregado.armazenamento.fechar()
+            self.mrp.armazenamento.fechar()
+
     def test_calcular_fc_lt_esperados(self):
         """
         Testa o cálculo do fluxo de caixa e lead times esperados.
@@ -508,6 +1007,145 @@ class TestMRP(unittest.TestCase):
         self.assertTrue(any("Custo de ETF" in alerta and "100" in alerta and "70" in alerta for alerta in alertas),
                         "Alerta sobre alteração de custo do ETF não encontrado")
 
+    def test_aplicar_cotacoes(self):
+        """
+        Testa o conjunto de alterações da aplicação vetorizada de cotações.
+        """
+        import pandas as pd
+
+        self.mrp.inicializar_dados()
+        cotacoes = pd.DataFrame([
+            ["JOKER", 12, None, None, 15],
+            ["XYZ", 1, 1, 1, 1],
+            ["DAQ", 11, 2.5, 6, 9],
+            ["JOKER", 13.5, None, 5, None],
+        ], columns=["Material", "Custo Unitario", "Imposto Unitario", "Frete Lote", "Lead Time"])
+
+        alteracoes = self.mrp.aplicar_cotacoes(cotacoes)
+        # Vale a última cotação de cada material; valores iguais e vazios são ignorados
+        self.assertEqual(list(alteracoes), [
+            ("JOKER", "custo_medio_unitario", 10, 13.5),
+            ("JOKER", "leadtime_medio_lote", 10, 15),
+            ("DAQ", "imposto_medio_unitario", 2, 2.5),
+            ("DAQ", "leadtime_medio_lote", 11, 9),
+        ])
+        self.assertEqual(self.mrp.estoque["JOKER"]["custo_medio_unitario"], 13.5)
+        self.assertEqual(self.mrp.estoque["DAQ"]["leadtime_medio_lote"], 9)
+        self.assertEqual(self.mrp.materiais_alterados, {"JOKER", "DAQ"})
+        self.assertEqual(alteracoes.aumentos("leadtime_medio_lote"), ["JOKER"])
+        self.assertEqual(alteracoes.alertas()[1:3], ["Leadtime de JOKER aumentou: 10 -> 15",
+                                                     "Necessidade de replanejar devido a aumento no leadtime."])
+
+        # Cotações já aplicadas não geram alterações
+        self.assertEqual(len(self.mrp.aplicar_cotacoes(cotacoes)), 0)
+
+    def test_aplicar_cotacoes_texto_alertas(self):
+        """
+        Testa se valores inteiros aparecem sem casas decimais nos alertas, mesmo em colunas com valores fracionários.
+        """
+        import pandas as pd
+
+        self.mrp.inicializar_dados()
+        cotacoes = pd.DataFrame([
+            ["ETF", 70, None, 2.5, None],
+            ["JOKER", 42.41, None, 0, None],
+        ], columns=["Material", "Custo Unitario", "Imposto Unitario", "Frete Lote", "Lead Time"])
+
+        alertas = self.mrp.aplicar_cotacoes(cotacoes).alertas()
+        self.assertIn("Custo de ETF alterado: 100 -> 70", alertas)
+        self.assertIn("Custo de JOKER alterado: 10 -> 42.41", alertas)
+        self.assertIn("Frete de ETF alterado: 0 -> 2.5", alertas)
+        self.assertIn("Frete de JOKER alterado: 5 -> 0", alertas)
+
+    def test_selecionar_cotacoes(self):
+        """
+        Testa a seleção da melhor cotação por material entre vários fornecedores.
+        """
+        import pandas as pd
+
+        self.mrp.inicializar_dados()
+        cotacoes = pd.DataFrame([
+            ["JOKER", "A", 10, 1, 100, 20],
+            ["DAQ", "A", 12, 0, None, 8],
+            ["JOKER", "B", 12, 1, 0, 5],
+            ["DAQ", "B", 11, 0.5, 0, 8],
+            ["JOKER", "C", None, 0, 0, 1],
+        ], columns=["Material", "Fornecedor", "Custo Unitario", "Imposto Unitario", "Frete Lote", "Lead Time"])
+
+        # Frete rateado: JOKER/A custa 10 + 1 + 100/50 = 13 com 50 unidades, e 111 com 1 unidade
+        # JOKER/C não tem custo: não concorre, mas é mantida antes da cotação escolhida
+        selecionadas = self.mrp.selecionar_cotacoes(cotacoes, quantidades={"JOKER": 50})
+        self.assertEqual(list(selecionadas["Material"]), ["JOKER", "JOKER", "DAQ"])
+        # Empate no custo posto de JOKER: vence o menor lead time
+        self.assertEqual(list(selecionadas["Fornecedor"]), ["C", "B", "B"])
+        self.assertEqual(list(self.mrp.selecionar_cotacoes(cotacoes, quantidades={"JOKER": 100})["Fornecedor"]),
+                         ["C", "A", "B"])
+        # Empate no lead time de DAQ: vence o menor custo posto
+        self.assertEqual(list(self.mrp.selecionar_cotacoes(cotacoes, 'menor_leadtime')["Fornecedor"]), ["C", "B"])
+        # Empate na pontuação de DAQ: vence a primeira cotação
+        self.assertEqual(list(self.mrp.selecionar_cotacoes(cotacoes, lambda df: -df["Lead Time"])["Fornecedor"]),
+                         ["A", "A"])
+        self.assertIsNone(self.mrp.selecionar_cotacoes(cotacoes, 'mais_barato'))
+
+    def test_selecionar_cotacoes_incompletas(self):
+        """
+        Testa se cotações sem preço ainda atualizam os campos que informam.
+        """
+        import pandas as pd
+
+        self.mrp.inicializar_dados()
+        cotacoes = pd.DataFrame([
+            ["JOKER", "A", None, None, None, 99],
+            ["DAQ", "A", 12, 1, None, None],
+            ["DAQ", "B", None, None, None, 30],
+            ["DAQ", "C", 11, 1, 0, 7],
+        ], columns=["Material", "Fornecedor", "Custo Unitario", "Imposto Unitario", "Frete Lote", "Lead Time"])
+
+        alteracoes = self.mrp.aplicar_cotacoes(self.mrp.selecionar_cotacoes(cotacoes))
+        # JOKER só tem a cotação incompleta: o lead time chega ao estoque
+        self.assertEqual(self.mrp.estoque["JOKER"]["leadtime_medio_lote"], 99)
+        # DAQ: prevalecem os valores da cotação escolhida (C)
+        self.assertEqual(self.mrp.estoque["DAQ"]["custo_medio_unitario"], 11)
+        self.assertEqual(self.mrp.estoque["DAQ"]["leadtime_medio_lote"], 7)
+        self.assertEqual(list(dict.fromkeys(alteracoes.materiais)), ["JOKER", "DAQ"])
+
+    def test_replanejar_incremental(self):
+        """
+        Testa se o replanejamento incremental produz o mesmo resultado de um planejamento completo.
+        """
+        from datetime import datetime
+
+        demanda = {"ETI": 100, "ETF": 100}
+        data_execucao = datetime(2025, 4, 1)
+        self.mrp.inicializar_dados()
+        self.mrp.calcular_quantidades_producao_aquisicao(demanda)
+        self.mrp.calcular_fc_lt_esperados()
+        self.mrp.montar_quadro_planejamento(data_execucao)
+        self.assertIn("2025-04-11", self.mrp.planejamento["JOKER"])
+
+        self.criar_arquivo_cotacoes_teste()
+        self.mrp.atualizar_custos_leadtimes("Cotacoes.xlsx")
+        self.assertEqual(self.mrp.materiais_alterados, {"ETF", "JOKER", "DAQ"})
+        # Com materiais explícitos, apenas eles deixam de estar pendentes
+        self.assertEqual(self.mrp.replanejar_incremental(materiais=["JOKER"]), {"JOKER", "ETI", "ETF"})
+        self.assertEqual(self.mrp.materiais_alterados, {"ETF", "DAQ"})
+        replanejados = self.mrp.replanejar_incremental()
+        # Materiais alterados e os produtos que os usam diretamente
+        self.assertEqual(replanejados, {"ETF", "DAQ", "ETI"})
+        self.assertEqual(self.mrp.materiais_alterados, set())
+
+        # Planejamento completo com os valores já atualizados
+        mrp_completo = MRP(self.pasta_testes)
+        mrp_completo.inicializar_dados(usar_cache=False)
+        mrp_completo.atualizar_custos_leadtimes("Cotacoes.xlsx")
+        mrp_completo.calcular_quantidades_producao_aquisicao(demanda)
+        mrp_completo.calcular_fc_lt_esperados()
+        mrp_completo.montar_quadro_planejamento(data_execucao)
+
+        self.assertEqual(self.mrp.fc_lt_esperados, mrp_completo.fc_lt_esperados)
+        self.assertEqual(self.mrp.planejamento, mrp_completo.planejamento)
+        self.assertNotIn("2025-04-11", self.mrp.planejamento["JOKER"])
+
     def criar_arquivo_planejamento_teste(self):
         """
         Cria um arquivo de planejamento de teste para ser usado nos testes.
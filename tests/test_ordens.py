@@ -0,0 +1,191 @@
+import unittest
+import os
+import pickle
+import numpy as np
+from ordens import OrdemPlanejada, CustoLeadtime, OrdemControle, OrdensControle, DiarioOrdens
+
+
+class _CargaMaliciosa:
+    """
+    Objeto cujo unpickling cria um arquivo marcador (simula um snapshot plantado).
+    """
+
+    def __init__(self, marcador):
+        self.marcador = marcador
+
+    def __reduce__(self):
+        return open, (self.marcador, 'w')
+
+
+class TestOrdens(unittest.TestCase):
+    """
+    Classe de teste dos registros compactos de ordens.
+    """
+
+    def test_acesso_como_dicionario(self):
+        """
+        Testa se os registros se comportam como os dicionários que substituem.
+        """
+        ordem = OrdemPlanejada(producao=10, aquisicao=0)
+        self.assertEqual(ordem['Produção'], 10)
+        self.assertEqual(ordem, {'Produção': 10, 'Aquisição': 0})
+        self.assertEqual(ordem.get('Status', 'Nenhum'), 'Nenhum')
+
+        ordem['Aquisição'] = 5
+        self.assertEqual(ordem.aquisicao, 5)
+        with self.assertRaises(KeyError):
+            ordem['Status'] = 'Pronta'
+
+        # Campos nunca atribuídos não existem, como chaves ausentes
+        fc_lt = CustoLeadtime()
+        self.assertEqual(dict(fc_lt), {})
+        self.assertNotIn('Leadtime', fc_lt)
+        fc_lt.leadtime = 15
+        self.assertEqual(list(fc_lt), ['Leadtime'])
+
+        controle = OrdemControle({'Estoque Atual': 5, 'Status': 'Planejada'}, producao=20)
+        del controle['Estoque Atual']
+        self.assertEqual(controle, {'Status': 'Planejada', 'Produção': 20})
+        self.assertFalse(hasattr(controle, '__dict__'))
+
+    def test_pickle(self):
+        """
+        Testa se os registros podem ser serializados.
+        """
+        controle = OrdemControle(estoque_atual=5, status='Pronta', aquisicao=3)
+        copia = pickle.loads(pickle.dumps(controle))
+        self.assertIsInstance(copia, OrdemControle)
+        self.assertEqual(copia, controle)
+
+
+class TestOrdensControle(unittest.TestCase):
+    """
+    Classe de teste dos índices das ordens de controle.
+    """
+
+    def setUp(self):
+        self.ordens = OrdensControle({
+            'ETF': {'Status': 'Planejada', 'Produção': 10, 'Aquisição': 0},
+            'JOKER': {'Status': 'Executada', 'Produção': 0, 'Aquisição': 5},
+            'DAQ': OrdemControle(status='Planejada', aquisicao=3),
+        })
+
+    def test_consultas(self):
+        """
+        Testa as consultas pelos índices de status e de tipo de ordem.
+        """
+        self.assertEqual(self.ordens.materiais('Planejada'), ['ETF', 'DAQ'])
+        self.assertEqual(self.ordens.materiais(tipo='Aquisição'), ['JOKER', 'DAQ'])
+        self.assertEqual(self.ordens.materiais(['Planejada', 'Executada'], 'Aquisição'), ['JOKER', 'DAQ'])
+        self.assertEqual(self.ordens.contar(['Planejada', 'Executada']), 3)
+        self.assertEqual(self.ordens.contar('Pronta'), 0)
+
+    def test_manutencao_dos_indices(self):
+        """
+        Testa se os índices acompanham as alterações das ordens.
+        """
+        self.ordens['DAQ']['Status'] = 'Pronta'
+        self.ordens['ETF']['Produção'] = 0
+        del self.ordens['JOKER']['Aquisição']
+        self.assertEqual(self.ordens.materiais('Pronta'), ['DAQ'])
+        self.assertEqual(self.ordens.materiais(tipo='Produção'), [])
+        self.assertEqual(self.ordens.materiais(tipo='Aquisição'), ['DAQ'])
+
+        # Uma ordem substituída ou removida deixa de atualizar os índices
+        antiga = self.ordens['ETF']
+        self.ordens['ETF'] = {'Status': 'Executada', 'Produção': 7}
+        antiga['Status'] = 'Pronta'
+        del self.ordens['DAQ']
+        self.assertEqual(self.ordens.materiais('Executada'), ['ETF', 'JOKER'])
+        self.assertEqual(self.ordens.contar('Pronta'), 0)
+
+        copia = pickle.loads(pickle.dumps(self.ordens))
+        self.assertEqual(copia, self.ordens)
+        copia['JOKER']['Status'] = 'Pronta'
+        self.assertEqual(copia.materiais('Pronta'), ['JOKER'])
+
+
+class TestDiarioOrdens(unittest.TestCase):
+    """
+    Classe de teste do diário de eventos das ordens.
+    """
+
+    def setUp(self):
+        self.pasta_testes = "test_data_diario"
+        if not os.path.exists(self.pasta_testes):
+            os.makedirs(self.pasta_testes)
+        self.caminho = os.path.join(self.pasta_testes, "ordens")
+
+    def tearDown(self):
+        for arquivo in os.listdir(self.pasta_testes):
+            os.remove(os.path.join(self.pasta_testes, arquivo))
+        os.rmdir(self.pasta_testes)
+
+    def test_snapshot_e_eventos(self):
+        """
+        Testa se a recuperação lê o último snapshot e apenas os eventos posteriores.
+        """
+        diario = DiarioOrdens(self.caminho, intervalo_snapshot=3)
+        diario.gravar_snapshot({'versao_estado': 0})
+        self.assertFalse(diario.registrar('alteracao', material='ETF', campos={'Status': 'Executada'}))
+        self.assertFalse(diario.registrar('alteracao', material='ETI', campos={'Status': 'Executada'}))
+        self.assertTrue(diario.registrar('alteracao', material='ETF', campos={'Status': 'Pronta'}))
+        diario.gravar_snapshot({'versao_estado': 3})
+        diario.registrar('alteracao', material='ETI', campos={'Produção': 5})
+        diario.fechar()
+
+        recuperado = DiarioOrdens(self.caminho)
+        estado, eventos = recuperado.recuperar()
+        self.assertEqual(estado, {'versao_estado': 3})
+        self.assertEqual([(evento['seq'], evento['campos']) for evento in eventos], [(4, {'Produção': 5})])
+
+        # Novos eventos continuam a numeração
+        recuperado.registrar('alteracao', material='ETI', campos={'Status': 'Pronta'})
+        recuperado.fechar()
+        self.assertEqual([evento['seq'] for evento in DiarioOrdens(self.caminho).recuperar()[1]], [4, 5])
+
+    def test_gravacao_interrompida(self):
+        """
+        Testa se uma última linha incompleta é descartada sem perder os eventos seguintes.
+        """
+        diario = DiarioOrdens(self.caminho)
+        diario.gravar_snapshot({})
+        diario.registrar('alteracao', material='ETF', campos={'Status': 'Executada'})
+        diario.fechar()
+        with open(diario.caminho_diario, 'a', encoding='utf-8') as arquivo:
+            arquivo.write('{"seq": 2, "evento": "alter')
+
+        recuperado = DiarioOrdens(self.caminho)
+        self.assertEqual(len(recuperado.recuperar()[1]), 1)
+        recuperado.registrar('alteracao', material='ETF', campos={'Status': 'Pronta'})
+        recuperado.fechar()
+        eventos = DiarioOrdens(self.caminho).recuperar()[1]
+        self.assertEqual([evento['campos']['Status'] for evento in eventos], ['Executada', 'Pronta'])
+
+    def test_snapshot_adulterado(self):
+        """
+        Testa se um snapshot adulterado é ignorado sem executar código e se valores numpy são gravados em JSON.
+        """
+        diario = DiarioOrdens(self.caminho)
+        diario.gravar_snapshot({'estoque': {'ETF': np.int64(7)}})
+        diario.registrar('alteracao', material='ETF', campos={'Status': 'Executada'})
+        diario.fechar()
+        self.assertEqual(DiarioOrdens(self.caminho).recuperar()[0], {'estoque': {'ETF': 7}})
+
+        # Um pickle plantado no lugar do snapshot não é desserializado
+        marcador = os.path.join(self.pasta_testes, "executado")
+        with open(diario.caminho_snapshot, 'wb') as arquivo:
+            pickle.dump(_CargaMaliciosa(marcador), arquivo)
+        estado, eventos = DiarioOrdens(self.caminho).recuperar()
+        self.assertIsNone(estado)
+        self.assertEqual(len(eventos), 1)
+        self.assertFalse(os.path.exists(marcador))
+
+        # JSON válido com estrutura inesperada também é ignorado
+        with open(diario.caminho_snapshot, 'w', encoding='utf-8') as arquivo:
+            arquivo.write('{"versao": 2, "seq": "1", "estado": []}')
+        self.assertIsNone(DiarioOrdens(self.caminho).recuperar()[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
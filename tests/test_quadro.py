@@ -0,0 +1,120 @@
+import unittest
+import numpy as np
+import pandas as pd
+from datetime import date
+from quadro import QuadroPlanejamento, dia_ordinal, formatar_dias
+
+
+class TestQuadroPlanejamento(unittest.TestCase):
+    """
+    Classe de teste do quadro de planejamento colunar.
+    """
+
+    def setUp(self):
+        """
+        Monta um quadro a partir de um DataFrame no formato exportado pelo MRP.
+        """
+        self.df = pd.DataFrame([
+            ["ETF", 5, 100, 50, None, "obs"],
+            ["ETI", 10, 80, 0, 90, "obs"],
+        ], columns=["Material", "Estoque Atual", "2023-10-01", "2023-10-15", "2023-10-30", "Observação"])
+        self.quadro = QuadroPlanejamento.de_dataframe(self.df)
+
+    def test_datas(self):
+        """
+        Testa a conversão entre datas e dias ordinais.
+        """
+        dias = [dia_ordinal("2023-10-01"), dia_ordinal(date(2024, 2, 29))]
+        self.assertEqual(formatar_dias(dias), ["2023-10-01", "2024-02-29"])
+        with self.assertRaises(ValueError):
+            dia_ordinal("Observação")
+
+    def test_de_dataframe(self):
+        """
+        Testa se o quadro se comporta como o dicionário de planejamento que substitui.
+        """
+        self.assertEqual(list(self.quadro), ["ETF", "ETI"])
+        self.assertEqual(dict(self.quadro["ETF"]), {"Estoque Atual": 5, "2023-10-01": 100, "2023-10-15": 50})
+        self.assertEqual(self.quadro["ETI"]["2023-10-15"], 0)
+
+        # Apenas quantidades positivas
+        positivos = QuadroPlanejamento.de_dataframe(self.df, apenas_positivos=True)
+        self.assertNotIn("2023-10-15", positivos["ETI"])
+        self.assertEqual(positivos["ETI"].get("2023-10-30"), 90)
+
+    def test_lancar(self):
+        """
+        Testa o lançamento em lote, com inclusão de materiais e dias novos.
+        """
+        dia = dia_ordinal("2023-09-01")
+        self.quadro.lancar(["JOKER", "ETF", "JOKER"], np.array([dia, dia, dia]), [1, 2, 3],
+                           estoque_atual={"JOKER": 7})
+        # Prevalece o último lançamento de cada material e dia
+        self.assertEqual(dict(self.quadro["JOKER"]), {"Estoque Atual": 7, "2023-09-01": 3})
+        self.assertEqual(self.quadro["ETF"]["2023-09-01"], 2)
+        self.assertEqual(list(self.quadro.dias), sorted(self.quadro.dias))
+
+        self.quadro.remover("ETF", "2023-09-01")
+        self.assertNotIn("2023-09-01", self.quadro["ETF"])
+
+    def test_edicao(self):
+        """
+        Testa a edição do quadro pelas chaves de data.
+        """
+        self.quadro["ETF"]["2023-10-20"] = 1.5
+        del self.quadro["ETF"]["2023-10-01"]
+        self.assertEqual(dict(self.quadro["ETF"]), {"Estoque Atual": 5, "2023-10-15": 50, "2023-10-20": 1.5})
+        with self.assertRaises(KeyError):
+            del self.quadro["ETF"]["2023-10-01"]
+
+        self.quadro["DAQ"] = {"Estoque Atual": 3, "2023-10-01": 4}
+        self.assertEqual(dict(self.quadro["DAQ"]), {"Estoque Atual": 3, "2023-10-01": 4})
+        del self.quadro["ETI"]
+        self.assertEqual(list(self.quadro), ["ETF", "DAQ"])
+        self.assertEqual(self.quadro["DAQ"]["2023-10-01"], 4)
+
+    def test_linhas(self):
+        """
+        Testa a geração das linhas para impressão e exportação.
+        """
+        self.quadro["ETF"]["2023-10-20"] = 1.5
+        self.assertEqual(self.quadro.datas(), ["2023-10-01", "2023-10-15", "2023-10-20", "2023-10-30"])
+        self.assertEqual(list(self.quadro.linhas()), [
+            ["ETF", 5, 100, 50, 1.5, ""],
+            ["ETI", 10, 80, 0, "", 90],
+        ])
+        self.assertEqual(list(self.quadro.linhas(vazio=None, materiais=["ETI"])), [["ETI", 10, 80, 0, None, 90]])
+
+    def test_crescimento_incremental(self):
+        """
+        Testa a inclusão de materiais e dias um a um, com capacidade ampliada geometricamente.
+        """
+        quadro = QuadroPlanejamento()
+        inicio = dia_ordinal("2023-10-01")
+        esperado = {}
+        for i in range(40):
+            # Dias alternadamente posteriores e intercalados aos já existentes
+            dia = inicio + (2 * i if i % 2 == 0 else 2 * i - 41)
+            quadro.lancar([f"M{i}"], np.array([dia]), [i])
+            esperado[f"M{i}"] = {"Estoque Atual": 0, formatar_dias([dia])[0]: i}
+        # Poucas realocações: a capacidade cresce bem menos que o número de inclusões
+        self.assertLess(quadro._quantidades.shape[0], 80)
+        self.assertEqual(len(quadro.dias), 40)
+        self.assertEqual(list(quadro.dias), sorted(quadro.dias))
+        self.assertEqual({material: dict(quadro[material]) for material in quadro}, esperado)
+
+        # A cópia não acompanha as alterações do quadro original
+        copia = quadro.copiar()
+        data_m39 = formatar_dias([dia_ordinal("2023-10-01") + 37])[0]
+        quadro.remover("M39", data_m39)
+        self.assertNotIn(data_m39, quadro["M39"])
+        self.assertEqual(dict(copia["M39"]), esperado["M39"])
+
+        del quadro["M0"]
+        quadro["M40"] = {"2023-10-01": 1}
+        self.assertEqual(dict(quadro["M40"]), {"Estoque Atual": 0, "2023-10-01": 1})
+        self.assertEqual(dict(quadro["M38"]), esperado["M38"])
+
+
+if __name__ == '__main__':
+    unittest.main()
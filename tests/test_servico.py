@@ -0,0 +1,145 @@
+import unittest
+import asyncio
+import json
+import os
+import pandas as pd
+from mrp import MRP
+from crp import CRP
+from servico import ServicoPlanejamento
+
+
+class TestServicoPlanejamento(unittest.TestCase):
+    """
+    Classe de teste do serviço local de planejamento.
+    """
+
+    def setUp(self):
+        """
+        Cria os arquivos de entrada e um MRP inicializado.
+        """
+        self.pasta_testes = "test_data_servico"
+        if not os.path.exists(self.pasta_testes):
+            os.makedirs(self.pasta_testes)
+        pd.DataFrame([["ETF", 0, 5, 100, 0, 0, 5], ["JOKER", 10, 10, 10, 1, 5, 10], ["DAQ", 10, 10, 11, 2, 6, 11]],
+                     columns=["Material", "Em Estoque", "Minimo", "Custo Medio Unitario", "Imposto Medio Unitario",
+                              "Frete Medio Lote", "Leadtime Medio Lote"]
+                     ).to_csv(os.path.join(self.pasta_testes, "Estoque.csv"), index=False)
+        pd.DataFrame({"Material": ["JOKER", "DAQ"], "Quantidade": [1, 2]}).to_csv(
+            os.path.join(self.pasta_testes, "ETF_BOM.csv"), index=False)
+
+        self.mrp = MRP(self.pasta_testes)
+        self.mrp.inicializar_dados(usar_cache=False)
+
+    def tearDown(self):
+        """
+        Remove a pasta de testes.
+        """
+        for arquivo in os.listdir(self.pasta_testes):
+            os.remove(os.path.join(self.pasta_testes, arquivo))
+        os.rmdir(self.pasta_testes)
+
+    @staticmethod
+    async def requisitar(endereco, metodo, caminho, corpo=None):
+        """
+        Envia uma requisição HTTP ao serviço e devolve o status e o JSON da resposta.
+        """
+        reader, writer = await asyncio.open_connection(*endereco[:2])
+        dados = json.dumps(corpo).encode() if corpo is not None else b''
+        writer.write(f"{metodo} {caminho} HTTP/1.1\r\nContent-Length: {len(dados)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + dados)
+        await writer.drain()
+        resposta = await reader.read()
+        writer.close()
+        cabecalhos, _, corpo_resposta = resposta.partition(b'\r\n\r\n')
+        return int(cabecalhos.split()[1]), json.loads(corpo_resposta)
+
+    @staticmethod
+    async def requisitar_bruto(endereco, dados):
+        """
+        Envia bytes arbitrários ao serviço e devolve o status e o JSON da resposta.
+        """
+        reader, writer = await asyncio.open_connection(*endereco[:2])
+        writer.write(dados)
+        await writer.drain()
+        resposta = await reader.read()
+        writer.close()
+        cabecalhos, _, corpo_resposta = resposta.partition(b'\r\n\r\n')
+        return int(cabecalhos.split()[1]), json.loads(corpo_resposta)
+
+    def test_planejar_coalescido(self):
+        """
+        Testa se requisições idênticas simultâneas compartilham um único planejamento.
+        """
+        async def cenario():
+            servico = ServicoPlanejamento(self.mrp, max_workers=2)
+            try:
+                resultados = await asyncio.gather(*[servico.planejar({"ETF": 20}) for _ in range(5)],
+                                                  servico.planejar({"ETF": 30}))
+                return servico.planejamentos_executados, resultados
+            finally:
+                await servico.fechar()
+
+        executados, resultados = asyncio.run(cenario())
+        self.assertEqual(executados, 2)
+        self.assertEqual(resultados[0], resultados[4])
+        # ETF: 20 + 5 (mínimo) - 0 = 25; DAQ: 2 * 25 + 10 - 10 = 50
+        self.assertEqual(resultados[0]['ordens']['ETF']['Produção'], 25)
+        self.assertEqual(resultados[0]['ordens']['DAQ']['Aquisição'], 50)
+        self.assertEqual(resultados[5]['ordens']['ETF']['Produção'], 35)
+
+    def test_rotas(self):
+        """
+        Testa as rotas de planejamento, de ordens e de capacidade.
+        """
+        self.mrp.planejar_producao({"ETF": 20})
+        self.mrp.iniciar_execucao()
+        crp = CRP(self.pasta_testes)
+        crp.demanda_recursos = {"ETF": {"Montagem": 2}}
+        crp.capacidade_recursos = {"Bancada": {"Montagem": 480}, "Linha": {"Montagem": 240}}
+        crp.excecoes_capacidade = {"Linha": {"Montagem": {"2025-04-01": 240}}}
+
+        async def cenario():
+            servico = ServicoPlanejamento(self.mrp, crp)
+            await servico.iniciar(porta=0)
+            endereco = servico.endereco
+            try:
+                respostas = {
+                    'content_length': await self.requisitar_bruto(
+                        endereco, b"POST /planejar HTTP/1.1\r\nContent-Length: dez\r\n\r\n"),
+                    'corpo_grande': await self.requisitar_bruto(
+                        endereco, b"POST /planejar HTTP/1.1\r\nContent-Length: 1000000000\r\n\r\n"),
+                    'estado': await self.requisitar(endereco, "GET", "/estado"),
+                    'planejar': await self.requisitar(endereco, "POST", "/planejar", {"demanda": {"ETF": 20}}),
+                    'status': await self.requisitar(endereco, "POST", "/ordens/status",
+                                                    {"atualizacoes": [["JOKER", "Pronta"], ["XYZ", "Pronta"]]}),
+                    'prontas': await self.requisitar(endereco, "GET", "/ordens?status=Pronta"),
+                    'editar': await self.requisitar(endereco, "POST", "/ordens/editar",
+                                                    {"material": "JOKER", "tipo": "Aquisição", "quantidade": 1}),
+                    'capacidade': await self.requisitar(endereco, "GET", "/capacidade?data=2025-04-01"),
+                    'invalida': await self.requisitar(endereco, "POST", "/planejar", {"demanda": "ETF"}),
+                    'inexistente': await self.requisitar(endereco, "GET", "/nada"),
+                }
+            finally:
+                await servico.fechar()
+            return respostas
+
+        respostas = asyncio.run(cenario())
+        self.assertEqual(respostas['content_length'][0], 400)
+        self.assertEqual(respostas['corpo_grande'][0], 413)
+        # O serviço não altera o modo do MRP nem o quadro do CRP recebidos
+        self.assertIsNone(self.mrp.travas)
+        self.assertEqual(crp.planejamento_mrp, {})
+        self.assertEqual(respostas['estado'], (200, {'estado': "Em Execução", 'ordens': 3,
+                                                      'planejamentos_executados': 0}))
+        self.assertEqual(respostas['planejar'][1]['ordens']['ETF']['Produção'], 25)
+        self.assertEqual([linha['sucesso'] for linha in respostas['status'][1]['linhas']], [True, False])
+        self.assertEqual(respostas['prontas'], (200, {'materiais': ["JOKER"]}))
+        # Ordens prontas não podem ser editadas
+        self.assertEqual(respostas['editar'][0], 409)
+        self.assertEqual(respostas['capacidade'][1]['operacoes'], {'Montagem': {'demanda': 50, 'capacidade': 480}})
+        self.assertEqual(respostas['invalida'][0], 400)
+        self.assertEqual(respostas['inexistente'][0], 404)
+
+
+if __name__ == '__main__':
+    unittest.main()